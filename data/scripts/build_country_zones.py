@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Build the compact country zone file used by country_zones.py.
+
+Reads a Natural Earth admin-0 countries GeoJSON (any scale; 1:10m gives the
+most coastline detail) and writes data/reference/country_zones.json: one
+entry per polygon with its ISO alpha-2 code and its rings quantized to
+1/SCALE degree and delta-encoded.
+
+Small islands that are missing from coarse inputs, or that lie far from
+their country's mainland, are added as rectangles from ISLAND_BOXES so
+offshore dive sites still resolve to the right country. The same table
+holds a few coastlines too short to survive at 1:110m (e.g. Eilat).
+
+Usage:
+    python3 build_country_zones.py <admin0_geojson> [output_json]
+
+Example:
+    python3 data/scripts/build_country_zones.py ne_10m_admin_0_countries.geojson
+
+The country code is read from the first valid ISO_A2_EH, ISO_A2 or iso_a2
+property ("-99" is skipped); features without one are dropped.
+"""
+
+import sys
+import json
+from pathlib import Path
+from datetime import datetime, timezone
+
+DEFAULT_OUTPUT = Path(__file__).resolve().parents[1] / "reference" / "country_zones.json"
+SCALE = 1000  # quantization steps per degree (~110 m)
+CODE_PROPERTIES = ("ISO_A2_EH", "ISO_A2", "iso_a2")
+
+# Island groups as (min_lat, max_lat, min_lon, max_lon, country_code)
+ISLAND_BOXES = [
+    # Indian Ocean
+    (-0.75, 7.15, 72.55, 73.80, "MV"),      # Maldives
+    (-4.85, -3.70, 55.20, 56.00, "SC"),     # Seychelles (inner islands)
+    (-6.30, -4.80, 52.70, 53.80, "SC"),     # Seychelles (Amirantes)
+    (-9.60, -9.00, 46.10, 47.60, "SC"),     # Seychelles (Aldabra group)
+    (-20.55, -19.95, 57.30, 57.82, "MU"),   # Mauritius
+    (-19.78, -19.65, 63.30, 63.50, "MU"),   # Rodrigues
+    (-21.40, -20.85, 55.20, 55.85, "RE"),   # Reunion
+    (-12.45, -11.33, 43.20, 44.55, "KM"),   # Comoros
+    (-13.05, -12.60, 44.95, 45.35, "YT"),   # Mayotte
+    (10.50, 13.70, 92.15, 93.10, "IN"),     # Andaman Islands
+    (6.70, 9.30, 92.65, 93.95, "IN"),       # Nicobar Islands
+    (8.20, 12.40, 71.60, 74.00, "IN"),      # Lakshadweep
+    (-10.58, -10.40, 105.52, 105.72, "AU"), # Christmas Island
+
+    # Middle East / Southeast Asia
+    (29.50, 29.56, 34.91, 34.97, "IL"),     # Eilat coast
+    (25.78, 26.30, 50.35, 50.85, "BH"),     # Bahrain
+    (1.15, 1.45, 103.60, 104.05, "SG"),     # Singapore
+
+    # Japan
+    (26.05, 26.90, 127.60, 128.35, "JP"),   # Okinawa
+    (26.10, 26.30, 127.20, 127.45, "JP"),   # Kerama Islands
+    (24.70, 24.95, 125.10, 125.50, "JP"),   # Miyako
+    (24.00, 24.65, 123.60, 124.35, "JP"),   # Yaeyama (Ishigaki, Iriomote)
+    (24.40, 24.50, 122.90, 123.05, "JP"),   # Yonaguni
+    (27.85, 28.55, 128.90, 129.75, "JP"),   # Amami
+    (26.50, 27.75, 142.05, 142.25, "JP"),   # Ogasawara
+
+    # Pacific Islands
+    (6.85, 8.20, 134.05, 134.75, "PW"),     # Palau
+    (7.10, 7.65, 151.55, 152.05, "FM"),     # Chuuk
+    (6.75, 7.05, 158.05, 158.35, "FM"),     # Pohnpei
+    (9.40, 9.65, 138.05, 138.25, "FM"),     # Yap
+    (5.25, 5.40, 162.90, 163.05, "FM"),     # Kosrae
+    (7.05, 7.25, 171.00, 171.40, "MH"),     # Majuro
+    (8.60, 9.30, 167.00, 167.80, "MH"),     # Kwajalein
+    (11.45, 11.70, 165.20, 165.60, "MH"),   # Bikini
+    (13.23, 13.66, 144.61, 144.96, "GU"),   # Guam
+    (14.90, 15.30, 145.55, 145.85, "MP"),   # Saipan, Tinian
+    (-14.10, -13.42, -172.82, -171.38, "WS"), # Samoa
+    (-17.90, -17.45, -150.00, -149.10, "PF"), # Tahiti, Moorea
+    (-16.60, -14.80, -148.00, -145.20, "PF"), # Tuamotu (Rangiroa, Fakarava)
+    (-16.80, -16.35, -151.80, -151.30, "PF"), # Bora Bora, Raiatea
+    (-18.85, -18.55, -174.15, -173.85, "TO"), # Vava'u
+    (-20.00, -19.60, -174.50, -174.25, "TO"), # Ha'apai
+    (-21.30, -21.05, -175.40, -175.00, "TO"), # Tongatapu
+    (-21.28, -21.18, -159.85, -159.72, "CK"), # Rarotonga
+    (-18.95, -18.80, -159.85, -159.72, "CK"), # Aitutaki
+    (-31.62, -31.48, 159.03, 159.12, "AU"), # Lord Howe Island
+
+    # Caribbean
+    (12.40, 12.63, -70.07, -69.86, "AW"),   # Aruba
+    (11.97, 12.40, -69.17, -68.62, "CW"),   # Curacao
+    (12.02, 12.32, -68.43, -68.19, "BQ"),   # Bonaire
+    (17.45, 17.65, -63.30, -62.93, "BQ"),   # Saba, St. Eustatius
+    (13.04, 13.34, -59.66, -59.42, "BB"),   # Barbados
+    (19.25, 19.40, -81.43, -81.08, "KY"),   # Grand Cayman
+    (19.64, 19.77, -80.13, -79.72, "KY"),   # Little Cayman, Cayman Brac
+    (18.30, 18.76, -64.85, -64.26, "VG"),   # British Virgin Islands
+    (18.28, 18.40, -65.05, -64.66, "VI"),   # St. Thomas, St. John
+    (17.67, 17.80, -64.90, -64.56, "VI"),   # St. Croix
+    (13.70, 14.12, -61.09, -60.86, "LC"),   # St. Lucia
+    (12.58, 13.39, -61.50, -61.10, "VC"),   # St. Vincent and the Grenadines
+    (11.98, 12.25, -61.81, -61.58, "GD"),   # Grenada
+    (15.20, 15.64, -61.49, -61.24, "DM"),   # Dominica
+    (14.38, 14.88, -61.24, -60.80, "MQ"),   # Martinique
+    (15.85, 16.52, -61.81, -61.00, "GP"),   # Guadeloupe
+    (16.98, 17.73, -61.91, -61.66, "AG"),   # Antigua and Barbuda
+    (17.09, 17.42, -62.87, -62.53, "KN"),   # St. Kitts and Nevis
+    (21.18, 21.98, -72.50, -71.08, "TC"),   # Turks and Caicos
+    (32.24, 32.40, -64.90, -64.64, "BM"),   # Bermuda
+
+    # Eastern Pacific
+    (-1.50, 0.70, -92.10, -89.20, "EC"),    # Galapagos
+    (5.48, 5.57, -87.11, -87.00, "CR"),     # Cocos Island
+    (18.30, 19.40, -114.80, -110.70, "MX"), # Revillagigedo
+
+    # Atlantic / Mediterranean
+    (27.60, 29.45, -18.20, -13.40, "ES"),   # Canary Islands
+    (38.60, 40.10, 1.15, 4.35, "ES"),       # Balearic Islands
+    (32.38, 33.13, -17.30, -16.25, "PT"),   # Madeira
+    (36.90, 39.75, -31.30, -24.75, "PT"),   # Azores
+    (14.80, 17.20, -25.40, -22.65, "CV"),   # Cape Verde
+    (35.78, 36.10, 14.17, 14.58, "MT"),     # Malta
+    (-0.05, 1.75, 6.45, 7.50, "ST"),        # Sao Tome and Principe
+]
+
+
+def feature_code(properties: dict) -> str | None:
+    for key in CODE_PROPERTIES:
+        value = properties.get(key)
+        if value and value != "-99":
+            return value
+    return None
+
+
+def encode_ring(ring: list) -> list[int] | None:
+    """Quantize and delta-encode a ring as [x0, y0, dx1, dy1, ...] (lon, lat).
+
+    Consecutive points that quantize to the same value are dropped, as is
+    the closing point. Returns None for rings left with fewer than 3 points.
+    """
+    points = []
+    for lon, lat in ring:
+        point = (round(lon * SCALE), round(lat * SCALE))
+        if not points or point != points[-1]:
+            points.append(point)
+    if len(points) > 1 and points[0] == points[-1]:
+        points.pop()
+    if len(points) < 3:
+        return None
+
+    encoded = list(points[0])
+    for (x0, y0), (x1, y1) in zip(points, points[1:]):
+        encoded.extend((x1 - x0, y1 - y0))
+    return encoded
+
+
+def box_ring(min_lat, max_lat, min_lon, max_lon):
+    return [(min_lon, min_lat), (max_lon, min_lat), (max_lon, max_lat), (min_lon, max_lat)]
+
+
+def build_zones(geojson: dict) -> list[dict]:
+    zones = []
+    skipped = 0
+    for feature in geojson.get("features", []):
+        code = feature_code(feature.get("properties") or {})
+        geometry = feature.get("geometry") or {}
+        if not code or geometry.get("type") not in ("Polygon", "MultiPolygon"):
+            skipped += 1
+            continue
+        polygons = geometry["coordinates"] if geometry["type"] == "MultiPolygon" else [geometry["coordinates"]]
+        for polygon in polygons:
+            outer = encode_ring(polygon[0])
+            if outer is None:
+                continue
+            holes = [hole for hole in (encode_ring(ring) for ring in polygon[1:]) if hole is not None]
+            zones.append({"code": code, "rings": [outer] + holes})
+
+    if skipped:
+        print(f"  Skipped {skipped} features without an ISO code or polygon geometry")
+
+    for min_lat, max_lat, min_lon, max_lon, code in ISLAND_BOXES:
+        zones.append({"code": code, "rings": [encode_ring(box_ring(min_lat, max_lat, min_lon, max_lon))]})
+    return zones
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        print(__doc__)
+        sys.exit(1)
+
+    input_path = Path(sys.argv[1])
+    output_path = Path(sys.argv[2]) if len(sys.argv) == 3 else DEFAULT_OUTPUT
+
+    print(f"Loading polygons: {input_path}")
+    with open(input_path, encoding="utf-8") as f:
+        geojson = json.load(f)
+
+    zones = build_zones(geojson)
+    vertices = sum(len(ring) // 2 for zone in zones for ring in zone["rings"])
+    countries = len({zone["code"] for zone in zones})
+
+    output = {
+        "source": input_path.name,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "scale": SCALE,
+        "zones": zones,
+    }
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(output, f, separators=(",", ":"))
+
+    print(f"  {len(zones)} zones, {countries} countries, {vertices} vertices")
+    print(f"Output written to: {output_path} ({output_path.stat().st_size // 1024} KB)")
+
+
+if __name__ == "__main__":
+    main()
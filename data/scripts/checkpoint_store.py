@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Append-only checkpoint journal shared by the long-running enrichment scripts.
+
+Each completed item is appended to a JSONL file as one line,
+{"id": ..., "result": ...}, and flushed straight away, so recording an item
+costs the size of that item rather than a rewrite of everything collected
+so far, and a crash loses at most the item being written. On open the
+journal is replayed into a dict (later lines win), giving O(1) "already
+done?" lookups for resume. A line torn by a crash is dropped and the file
+truncated back to the last complete line.
+
+compact() rewrites the journal with one line per id; scripts call it once
+at the end of a run.
+
+A checkpoint in the old single-JSON format ({"processed_ids": [...],
+"results": {...}}) found at `legacy_path` is imported into a new journal
+the first time, then removed.
+
+Scripts in this directory import it directly
+(`from checkpoint_store import CheckpointStore`).
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+
+class CheckpointStore:
+    """id -> result journal. Use as a context manager (or call close())."""
+
+    def __init__(self, path: Path, legacy_path: Optional[Path] = None):
+        self.path = Path(path)
+        self.results: dict = {}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if not self.path.exists() and legacy_path is not None and Path(legacy_path).exists():
+            self._import_legacy(Path(legacy_path))
+        elif self.path.exists():
+            self._replay()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def __enter__(self) -> "CheckpointStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __contains__(self, item_id) -> bool:
+        return item_id in self.results
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+    def __iter__(self) -> Iterator:
+        return iter(self.results)
+
+    def _replay(self):
+        good_end = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn final write
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"Warning: skipping corrupt checkpoint line in {self.path}")
+                else:
+                    self.results[entry["id"]] = entry["result"]
+                good_end += len(line)
+        if good_end < self.path.stat().st_size:
+            print(f"Warning: dropping incomplete last entry of {self.path}")
+            with open(self.path, "r+b") as f:
+                f.truncate(good_end)
+
+    def _import_legacy(self, legacy_path: Path):
+        with open(legacy_path, "r", encoding="utf-8") as f:
+            self.results = dict(json.load(f).get("results", {}))
+        self._write_all()
+        legacy_path.unlink()
+        print(f"Migrated {len(self.results)} checkpoint entries from {legacy_path.name} to {self.path.name}")
+
+    def _write_all(self):
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for item_id, result in self.results.items():
+                f.write(json.dumps({"id": item_id, "result": result}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def get(self, item_id, default=None) -> Any:
+        return self.results.get(item_id, default)
+
+    def record(self, item_id, result: Any):
+        """Store the result for `item_id` and append it to the journal."""
+        self.results[item_id] = result
+        self._file.write(json.dumps({"id": item_id, "result": result}, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def compact(self):
+        """Rewrite the journal with only the latest entry per id."""
+        self._file.close()
+        self._write_all()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Batch reverse geocoder: coordinates -> ISO country code.
+
+Country polygons come from the bundled data/reference/country_zones.json
+(built by build_country_zones.py) and are indexed with an STR-tree. A
+lookup resolves a whole batch of points in two vectorized passes:
+
+1. Containment: a point inside a country polygon (or island box) takes that
+   country. Where zones overlap, the one with the smallest bounding box
+   wins, so an island box beats a neighbouring mainland.
+2. Offshore: remaining points take the country with the nearest coastline
+   within MAX_OFFSHORE_KM (200 nautical miles, the EEZ limit). Nearest
+   coastline is the median-line rule that settles most overlapping EEZ
+   claims, e.g. Egypt / Israel / Jordan in the Gulf of Aqaba.
+
+Points with no zone in range resolve to None.
+
+Usage:
+    from country_zones import CountryZones
+    codes = CountryZones().lookup(lats, lons)
+"""
+
+import sys
+import json
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+from geo_utils import EARTH_RADIUS_KM, STRTree  # noqa: E402
+
+ZONES_PATH = Path(__file__).resolve().parents[1] / "reference" / "country_zones.json"
+MAX_OFFSHORE_KM = 370.4  # 200 nautical miles
+KM_PER_DEGREE = EARTH_RADIUS_KM * np.pi / 180
+
+# Bound on points x edges evaluated at once
+PAIR_CHUNK = 2_000_000
+# Average edges per latitude band in the containment index
+EDGES_PER_BAND = 8
+
+
+def decode_ring(encoded: list[int], scale: float) -> np.ndarray:
+    """Inverse of build_country_zones.encode_ring: (n, 2) array of lon, lat."""
+    return np.cumsum(np.asarray(encoded, dtype=np.int64).reshape(-1, 2), axis=0) / scale
+
+
+def wrap_lon(delta: np.ndarray) -> np.ndarray:
+    return (delta + 180.0) % 360.0 - 180.0
+
+
+class CountryZones:
+    """Country polygons with an STR-tree over their bounding boxes."""
+
+    def __init__(self, path: Path = ZONES_PATH, max_offshore_km: float = MAX_OFFSHORE_KM):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        scale = data["scale"]
+        self.max_offshore_km = max_offshore_km
+        self.codes = []
+        self.edges = []  # per zone: (E, 4) array of x1, y1, x2, y2 over all rings
+        self.bands = []  # per zone: (min_y, band_height, (B, K) edge indices per band)
+        boxes = []
+        for zone in data["zones"]:
+            rings = [decode_ring(ring, scale) for ring in zone["rings"]]
+            edges = np.vstack([np.hstack([ring, np.roll(ring, -1, axis=0)]) for ring in rings])
+            self.codes.append(zone["code"])
+            self.edges.append(edges)
+            self.bands.append(self._band_index(edges))
+            outer = rings[0]
+            boxes.append((outer[:, 0].min(), outer[:, 1].min(), outer[:, 0].max(), outer[:, 1].max()))
+        self.boxes = np.asarray(boxes)
+        self.box_area = (self.boxes[:, 2] - self.boxes[:, 0]) * (self.boxes[:, 3] - self.boxes[:, 1])
+        self.tree = STRTree(self.boxes)
+
+    @staticmethod
+    def _band_index(edges: np.ndarray):
+        """Split the zone into horizontal bands listing the edges that overlap each.
+
+        A ray cast from a point only crosses edges spanning the point's
+        latitude, so containment tests need just the edges of its band.
+        Rows are padded with index E, a sentinel edge that never spans.
+        """
+        low = np.minimum(edges[:, 1], edges[:, 3])
+        high = np.maximum(edges[:, 1], edges[:, 3])
+        count = max(1, len(edges) // EDGES_PER_BAND)
+        min_y = low.min()
+        height = max((high.max() - min_y) / count, 1e-9)
+        first = np.clip(((low - min_y) / height).astype(np.int64), 0, count - 1)
+        last = np.clip(((high - min_y) / height).astype(np.int64), 0, count - 1)
+        members = [[] for _ in range(count)]
+        for edge, (a, b) in enumerate(zip(first.tolist(), last.tolist())):
+            for band in range(a, b + 1):
+                members[band].append(edge)
+        width = max(len(band) for band in members)
+        table = np.full((count, width), len(edges), dtype=np.int64)
+        for band, indices in enumerate(members):
+            table[band, :len(indices)] = indices
+        return min_y, height, table
+
+    def lookup(self, lats, lons) -> list[str | None]:
+        """Country code (or None) for each (lat, lon); None/NaN coordinates give None."""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        zone = np.full(len(lats), -1, dtype=np.int64)
+        valid = np.nonzero(np.isfinite(lats) & np.isfinite(lons))[0]
+
+        inside = self._containing_zone(lats[valid], lons[valid])
+        zone[valid] = inside
+        offshore = valid[inside < 0]
+        zone[offshore] = self._nearest_zone(lats[offshore], lons[offshore])
+        return [self.codes[z] if z >= 0 else None for z in zone]
+
+    def _containing_zone(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        """Index of the smallest zone containing each point, or -1."""
+        result = np.full(len(lats), -1, dtype=np.int64)
+        points = np.column_stack([lons, lats, lons, lats])
+        query, items = self.tree.query(points)
+        for z in np.unique(items):
+            candidates = query[items == z]
+            hit = candidates[self._contains(z, lons[candidates], lats[candidates])]
+            current = result[hit]
+            better = (current < 0) | (self.box_area[z] < self.box_area[np.maximum(current, 0)])
+            result[hit[better]] = z
+        return result
+
+    def _contains(self, z: int, px: np.ndarray, py: np.ndarray) -> np.ndarray:
+        """Even-odd ray casting of points against the rings of zone z, using its band index."""
+        min_y, height, table = self.bands[z]
+        # Sentinel row for padded slots: y1 == y2 never spans a point
+        edges = np.vstack([self.edges[z], [0.0, np.inf, 0.0, np.inf]])
+        band = np.clip(((py - min_y) / height).astype(np.int64), 0, len(table) - 1)
+        inside = np.zeros(len(px), dtype=bool)
+        step = max(1, PAIR_CHUNK // table.shape[1])
+        for start in range(0, len(px), step):
+            x = px[start:start + step, None]
+            y = py[start:start + step, None]
+            candidate = edges[table[band[start:start + step]]]
+            x1, y1, x2, y2 = (candidate[..., i] for i in range(4))
+            spans = (y1 > y) != (y2 > y)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                cross_x = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+            crossings = np.count_nonzero(spans & (x < cross_x), axis=1)
+            inside[start:start + step] = crossings % 2 == 1
+        return inside
+
+    def _nearest_zone(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        """Zone with the nearest edge within max_offshore_km of each point, or -1."""
+        result = np.full(len(lats), -1, dtype=np.int64)
+        if not len(lats):
+            return result
+        best = np.full(len(lats), np.inf)
+
+        dlat = self.max_offshore_km / KM_PER_DEGREE
+        cos_lat = np.maximum(np.cos(np.radians(lats)), 1e-6)
+        dlon = np.minimum(dlat / cos_lat, 180.0)
+        boxes = np.column_stack([lons - dlon, lats - dlat, lons + dlon, lats + dlat])
+        # Search boxes crossing the antimeridian are repeated shifted by 360 degrees
+        point = np.arange(len(lats))
+        west = np.nonzero(boxes[:, 0] < -180)[0]
+        east = np.nonzero(boxes[:, 2] > 180)[0]
+        boxes = np.vstack([boxes, boxes[west] + [360, 0, 360, 0], boxes[east] - [360, 0, 360, 0]])
+        point = np.concatenate([point, west, east])
+
+        query, items = self.tree.query(boxes)
+        query = point[query]
+        for z in np.unique(items):
+            candidates = np.unique(query[items == z])
+            distance = self._edge_distance_km(z, lats[candidates], lons[candidates], cos_lat[candidates])
+            closer = (distance <= self.max_offshore_km) & (distance < best[candidates])
+            best[candidates[closer]] = distance[closer]
+            result[candidates[closer]] = z
+        return result
+
+    def _edge_distance_km(self, z: int, lats: np.ndarray, lons: np.ndarray, cos_lat: np.ndarray) -> np.ndarray:
+        """Distance from each point to the nearest edge of zone z, in a local equirectangular frame."""
+        edges = self.edges[z]
+        distance = np.empty(len(lats))
+        step = max(1, PAIR_CHUNK // len(edges))
+        for start in range(0, len(lats), step):
+            stop = start + step
+            scale = cos_lat[start:stop, None]
+            ax = wrap_lon(edges[None, :, 0] - lons[start:stop, None]) * scale
+            ay = edges[None, :, 1] - lats[start:stop, None]
+            dx = wrap_lon(edges[None, :, 2] - edges[None, :, 0]) * scale
+            dy = edges[None, :, 3] - edges[None, :, 1]
+            length_sq = dx * dx + dy * dy
+            with np.errstate(divide="ignore", invalid="ignore"):
+                t = np.where(length_sq > 0, -(ax * dx + ay * dy) / length_sq, 0.0)
+            t = np.clip(t, 0.0, 1.0)
+            cx = ax + t * dx
+            cy = ay + t * dy
+            distance[start:stop] = np.sqrt(cx * cx + cy * cy).min(axis=1) * KM_PER_DEGREE
+        return distance
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Persistent HTTP response cache shared by the enrichment scripts.
+
+Responses are stored in one SQLite file (data/stage/http_cache.sqlite by
+default), keyed by method + URL with the query parameters sorted, so the
+same lookup made by different scripts (e.g. Wikipedia extracts for both
+species and sites) is fetched once.
+
+- Fresh entries (younger than their TTL) are served without a request.
+- Stale entries are revalidated with If-None-Match / If-Modified-Since when
+  the server sent an ETag or Last-Modified; a 304 renews the entry. If the
+  revalidation request fails (network error or 5xx), the stale body is
+  served.
+- 200 and 404 responses are cached; other errors are raised and not stored,
+  so a rerun tries again. A cached 404 is re-raised as HTTPError.
+- When the stored bodies exceed max_bytes, least-recently-used entries are
+  evicted down to EVICT_TARGET of the budget (lru_store.py).
+
+Set UMILOG_HTTP_CACHE to a path to use a different file, or to "off" to
+bypass the cache. Scripts in this directory import it directly
+(`from http_cache import cached_get_json`).
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import zlib
+from email.message import Message
+from pathlib import Path
+from typing import Optional
+
+from lru_store import LRUStore
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parents[1] / "stage" / "http_cache.sqlite"
+DEFAULT_TTL = 30 * 24 * 3600  # seconds
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+CACHEABLE_STATUSES = (200, 404)
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def canonical_url(url: str, params: Optional[dict] = None) -> str:
+    """URL with its query string and `params` merged and sorted."""
+    parts = urllib.parse.urlsplit(url)
+    query = urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        query.extend((str(key), str(value)) for key, value in params.items())
+    query.sort()
+    return urllib.parse.urlunsplit(
+        (parts.scheme, parts.netloc, parts.path, urllib.parse.urlencode(query), "")
+    )
+
+
+def cache_key(method: str, url: str) -> str:
+    return hashlib.sha256(f"{method.upper()} {url}".encode("utf-8")).hexdigest()
+
+
+class HttpCache(LRUStore):
+    """SQLite store of HTTP responses with TTL, revalidation and LRU eviction.
+
+    Safe to share between threads. Several processes may use the same file;
+    SQLite's WAL mode serializes their writes.
+    """
+
+    def __init__(self, path: Path = DEFAULT_CACHE_PATH, ttl: float = DEFAULT_TTL,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        super().__init__(path, "responses", [
+            "method TEXT NOT NULL",
+            "url TEXT NOT NULL",
+            "status INTEGER NOT NULL",
+            "body BLOB NOT NULL",
+            "etag TEXT",
+            "last_modified TEXT",
+            "fetched_at REAL NOT NULL",
+            "expires_at REAL NOT NULL",
+        ], max_bytes)
+        self.ttl = ttl
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def _lookup(self, key: str):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT status, body, etag, last_modified, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+    def _touch(self, key: str, expires_at: Optional[float] = None):
+        now = time.time()
+        with self.lock:
+            if expires_at is None:
+                self.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            else:
+                self.conn.execute(
+                    "UPDATE responses SET accessed_at = ?, fetched_at = ?, expires_at = ? WHERE key = ?",
+                    (now, now, expires_at, key)
+                )
+            self.conn.commit()
+
+    def _store(self, key: str, method: str, url: str, status: int, body: bytes,
+               etag: Optional[str], last_modified: Optional[str], ttl: float):
+        now = time.time()
+        packed = zlib.compress(body)
+        self._put(key, (method, url, status, packed, etag, last_modified, now, now + ttl), len(packed))
+
+    def get(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None,
+            timeout: float = 30, ttl: Optional[float] = None, delay: float = 0,
+            limiter=None) -> bytes:
+        """GET `url` with `params`, returning the response body.
+
+        `delay` seconds are slept after each network request (not after a
+        cache hit) so callers keep their rate limit only when it matters;
+        `limiter` (an http_utils.TokenBucket) is acquired before each network
+        request instead, for callers sharing a rate limit between threads.
+        Raises urllib.error.HTTPError / URLError like urlopen.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        url = canonical_url(url, params)
+        key = cache_key("GET", url)
+        headers = dict(headers or {})
+
+        cached = self._lookup(key)
+        if cached is not None:
+            status, packed, etag, last_modified, expires_at = cached
+            if expires_at > time.time():
+                self._touch(key)
+                self.hits += 1
+                return self._result(url, status, packed)
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            request = urllib.request.Request(url, headers=headers)
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                body = response.read()
+                status = response.status
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and cached is not None:
+                self._touch(key, time.time() + ttl)
+                self.revalidated += 1
+                return self._result(url, cached[0], cached[1])
+            if e.code not in CACHEABLE_STATUSES:
+                if cached is not None and e.code >= 500:
+                    # Serve the stale copy rather than fail on a server error
+                    self._touch(key)
+                    self.hits += 1
+                    return self._result(url, cached[0], cached[1])
+                raise
+            body = b""
+            status = e.code
+            etag = last_modified = None
+        except OSError:
+            if cached is None:
+                raise
+            # Serve the stale copy rather than fail on a transient error
+            self._touch(key)
+            self.hits += 1
+            return self._result(url, cached[0], cached[1])
+        finally:
+            if delay:
+                time.sleep(delay)
+
+        self.misses += 1
+        if status in CACHEABLE_STATUSES:
+            self._store(key, "GET", url, status, body, etag, last_modified, ttl)
+        if status != 200:
+            raise urllib.error.HTTPError(url, status, "error response", Message(), None)
+        return body
+
+    def get_json(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None,
+                 timeout: float = 30, ttl: Optional[float] = None, delay: float = 0, limiter=None):
+        return json.loads(self.get(url, params, headers, timeout, ttl, delay, limiter).decode("utf-8"))
+
+    @staticmethod
+    def _result(url: str, status: int, packed: bytes) -> bytes:
+        """Body of a cached response; cached error statuses are re-raised."""
+        if status != 200:
+            raise urllib.error.HTTPError(url, status, "cached error response", Message(), None)
+        return zlib.decompress(packed)
+
+
+class _NoCache(HttpCache):
+    """Pass-through used when UMILOG_HTTP_CACHE=off."""
+
+    def __init__(self):
+        self.hits = self.revalidated = self.misses = 0
+
+    def get(self, url, params=None, headers=None, timeout=30, ttl=None, delay=0, limiter=None):
+        url = canonical_url(url, params)
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            request = urllib.request.Request(url, headers=dict(headers or {}))
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                self.misses += 1
+                return response.read()
+        finally:
+            if delay:
+                time.sleep(delay)
+
+    def close(self):
+        pass
+
+
+def get_cache() -> HttpCache:
+    """Process-wide cache, opened on first use."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            setting = os.environ.get("UMILOG_HTTP_CACHE", "")
+            if setting.lower() == "off":
+                _shared = _NoCache()
+            else:
+                _shared = HttpCache(Path(setting) if setting else DEFAULT_CACHE_PATH)
+        return _shared
+
+
+def cached_get(url: str, params: Optional[dict] = None, headers: Optional[dict] = None,
+               timeout: float = 30, ttl: Optional[float] = None, delay: float = 0, limiter=None) -> bytes:
+    return get_cache().get(url, params, headers, timeout, ttl, delay, limiter)
+
+
+def cached_get_json(url: str, params: Optional[dict] = None, headers: Optional[dict] = None,
+                    timeout: float = 30, ttl: Optional[float] = None, delay: float = 0, limiter=None):
+    return get_cache().get_json(url, params, headers, timeout, ttl, delay, limiter)
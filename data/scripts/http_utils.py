@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP helpers for the data pipeline scripts.
+
+- TokenBucket: thread-safe rate limiter, one per remote API
+- make_session: keep-alive requests.Session with retry/backoff on 429/5xx
+
+Scripts in this directory import it directly (`from http_utils import ...`).
+Only make_session needs requests, so the stdlib-only scripts can share
+TokenBucket without it.
+"""
+
+import threading
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import requests
+
+USER_AGENT = "UmiLogBot/1.0 (dive logging app; data pipeline)"
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """Allow `rate` acquisitions per second on average, bursting up to `capacity`.
+
+    Safe to share between threads; acquire() blocks until a token is free.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def make_session(pool_size: int = 10, retries: int = 4, backoff: float = 1.0,
+                 user_agent: str = USER_AGENT) -> "requests.Session":
+    """Keep-alive session that retries idempotent requests with exponential backoff.
+
+    Retries honour Retry-After on 429/503. The connection pool holds
+    `pool_size` connections per host so a worker pool can share one session.
+    """
+    try:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+    except ImportError:
+        raise ImportError("requests is required. Install with: pip install requests")
+
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = user_agent
+    return session
@@ -9,6 +9,10 @@ This script:
 4. Updates sites with country_id, region_id
 5. Outputs linked sites file
 
+Coordinates are reverse geocoded for all sites in one batch against the
+bundled country polygons (see country_zones.py): inside a polygon, else
+the nearest coastline within 200 nautical miles.
+
 Usage:
     python3 link_sites_to_hierarchy.py <sites_json> <output_json>
 
@@ -24,95 +28,29 @@ from pathlib import Path
 from datetime import datetime, timezone
 from collections import defaultdict
 
-
-# Country bounding boxes for reverse geocoding
-# Format: (min_lat, max_lat, min_lon, max_lon, country_code)
-COUNTRY_BOXES = [
-    # Red Sea
-    (22, 32, 32, 36, "EG"),  # Egypt
-    (14, 22, 36, 44, "SA"),  # Saudi Arabia
-    (11, 14, 42, 44, "DJ"),  # Djibouti
-    (27, 34, 34, 36, "IL"),  # Israel
-    (29, 33, 34, 40, "JO"),  # Jordan
-    (15, 23, 36, 44, "SD"),  # Sudan
-
-    # Indian Ocean
-    (-1, 8, 72, 74, "MV"),   # Maldives
-    (-5, -3, 55, 56, "SC"),  # Seychelles
-    (-21, -19, 55, 58, "MU"), # Mauritius
-    (5, 10, 79, 82, "LK"),   # Sri Lanka
-
-    # Southeast Asia
-    (5, 21, 97, 106, "TH"),  # Thailand
-    (0, 8, 99, 120, "MY"),   # Malaysia
-    (-11, 6, 95, 141, "ID"), # Indonesia
-    (4, 21, 117, 127, "PH"), # Philippines
-    (8, 24, 102, 110, "VN"), # Vietnam
-    (11, 23, 97, 107, "MM"), # Myanmar
-
-    # Japan
-    (24, 46, 122, 146, "JP"),
-
-    # Australia
-    (-44, -10, 113, 154, "AU"),
-
-    # New Zealand
-    (-48, -34, 166, 179, "NZ"),
-
-    # Pacific Islands
-    (-22, -12, 176, 180, "FJ"), # Fiji
-    (-18, -8, 177, -177, "FJ"), # Fiji (crosses date line)
-    (5, 10, 132, 135, "PW"),    # Palau
-    (-6, 0, 146, 156, "PG"),    # Papua New Guinea
-
-    # Caribbean
-    (21, 27, -80, -72, "BS"),   # Bahamas
-    (17, 20, -73, -68, "DO"),   # Dominican Republic
-    (17, 20, -78, -74, "JM"),   # Jamaica
-    (19, 24, -85, -74, "CU"),   # Cuba
-    (17, 20, -67, -65, "PR"),   # Puerto Rico
-    (19, 20, -82, -79, "KY"),   # Cayman Islands
-    (18, 19, -65, -64, "VG"),   # British Virgin Islands
-    (12, 14, -62, -60, "BB"),   # Barbados
-    (11, 13, -70, -68, "CW"),   # Curacao
-    (12, 13, -69, -68, "BQ"),   # Bonaire
-    (12, 13, -70, -69, "AW"),   # Aruba
-
-    # Central America
-    (7, 10, -83, -77, "PA"),    # Panama
-    (8, 12, -86, -82, "CR"),    # Costa Rica
-    (15, 17, -89, -87, "BZ"),   # Belize
-    (13, 17, -90, -83, "HN"),   # Honduras
-    (14, 33, -118, -86, "MX"),  # Mexico
-
-    # Mediterranean
-    (35, 44, -10, 5, "ES"),     # Spain
-    (36, 47, 6, 19, "IT"),      # Italy
-    (34, 42, 19, 30, "GR"),     # Greece
-    (42, 46, 13, 20, "HR"),     # Croatia
-    (35, 36, 14, 15, "MT"),     # Malta
-    (34, 36, 32, 35, "CY"),     # Cyprus
-    (36, 42, 26, 45, "TR"),     # Turkey
-    (36, 44, -10, 0, "PT"),     # Portugal
-    (41, 51, -6, 10, "FR"),     # France
-
-    # Atlantic/UK
-    (49, 61, -11, 2, "GB"),     # United Kingdom
-    (51, 56, -11, -5, "IE"),    # Ireland
-    (57, 72, 4, 32, "NO"),      # Norway
-    (63, 67, -25, -13, "IS"),   # Iceland
-
-    # South America
-    (-34, 6, -74, -34, "BR"),   # Brazil
-    (-5, 13, -82, -66, "CO"),   # Colombia
-    (1, 12, -73, -60, "VE"),    # Venezuela
-    (-5, 2, -81, -75, "EC"),    # Ecuador
-
-    # Africa
-    (-35, -22, 16, 33, "ZA"),   # South Africa
-    (-12, -1, 39, 41, "TZ"),    # Tanzania
-    (-5, 5, 39, 42, "KE"),      # Kenya
-    (-27, -10, 32, 41, "MZ"),   # Mozambique
+import numpy as np
+
+from country_zones import CountryZones
+
+_zones = None
+
+
+# Diving region boxes for sites no country resolves, checked in order (first match wins)
+# Format: (min_lat, max_lat, min_lon, max_lon, region_id)
+REGION_BOXES = [
+    (12, 30, 32, 44, "red-sea"),
+    (-10, 10, 95, 145, "southeast-asia"),
+    (-90, 20, 95, 120, "southeast-asia"),
+    (24, 46, 122, 146, "japan"),
+    (-30, 0, 110, 160, "australia"),
+    (10, 28, -90, -60, "caribbean"),
+    (7, 25, -120, -80, "central-america"),
+    (30, 46, -6, 36, "mediterranean"),
+    (-2, 10, 71, 82, "indian-ocean"),
+    (-30, 10, 130, 180, "pacific-islands"),
+    (45, 72, -25, 35, "atlantic"),
+    (-35, 10, -80, -30, "south-america"),
+    (-35, 10, 15, 55, "africa"),
 ]
 
 # Region definitions from geographic_hierarchy.py
@@ -241,51 +179,47 @@ COUNTRY_NAME_TO_CODE = {
 }
 
 
+def get_zones() -> CountryZones:
+    """Shared reverse geocoder, loaded on first use."""
+    global _zones
+    if _zones is None:
+        _zones = CountryZones()
+    return _zones
+
+
+def as_coord_array(values) -> np.ndarray:
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+
+def detect_countries_from_coords(lats, lons) -> list[str | None]:
+    """Detect countries for a batch of coordinates (None where unknown)."""
+    return get_zones().lookup(as_coord_array(lats), as_coord_array(lons))
+
+
 def detect_country_from_coords(lat: float, lon: float) -> str | None:
-    """Detect country from coordinates using bounding boxes."""
+    """Detect country from coordinates using the country polygons."""
     if lat is None or lon is None:
         return None
+    return detect_countries_from_coords([lat], [lon])[0]
 
-    for min_lat, max_lat, min_lon, max_lon, country_code in COUNTRY_BOXES:
-        if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon:
-            return country_code
 
-    return None
+def detect_regions_from_coords(lats, lons) -> list[str]:
+    """Determine diving regions for a batch of coordinates (fallback)."""
+    lats = as_coord_array(lats)
+    lons = as_coord_array(lons)
+    regions = np.full(len(lats), "global", dtype=object)
+    # Apply boxes last-to-first so the first matching box wins
+    for min_lat, max_lat, min_lon, max_lon, region_id in reversed(REGION_BOXES):
+        match = (min_lat <= lats) & (lats <= max_lat) & (min_lon <= lons) & (lons <= max_lon)
+        regions[match] = region_id
+    return regions.tolist()
 
 
 def detect_region_from_coords(lat: float, lon: float) -> str:
     """Determine diving region from coordinates (fallback)."""
     if lat is None or lon is None:
         return "global"
-
-    if 12 <= lat <= 30 and 32 <= lon <= 44:
-        return "red-sea"
-    if -10 <= lat <= 10 and 95 <= lon <= 145:
-        return "southeast-asia"
-    if lat <= 20 and 95 <= lon <= 120:
-        return "southeast-asia"
-    if 24 <= lat <= 46 and 122 <= lon <= 146:
-        return "japan"
-    if -30 <= lat <= 0 and 110 <= lon <= 160:
-        return "australia"
-    if 10 <= lat <= 28 and -90 <= lon <= -60:
-        return "caribbean"
-    if 7 <= lat <= 25 and -120 <= lon <= -80:
-        return "central-america"
-    if 30 <= lat <= 46 and -6 <= lon <= 36:
-        return "mediterranean"
-    if -2 <= lat <= 10 and 71 <= lon <= 82:
-        return "indian-ocean"
-    if -30 <= lat <= 10 and 130 <= lon <= 180:
-        return "pacific-islands"
-    if 45 <= lat <= 72 and -25 <= lon <= 35:
-        return "atlantic"
-    if -35 <= lat <= 10 and -80 <= lon <= -30:
-        return "south-america"
-    if -35 <= lat <= 10 and 15 <= lon <= 55:
-        return "africa"
-
-    return "global"
+    return detect_regions_from_coords([lat], [lon])[0]
 
 
 def get_country_from_name(country_name: str) -> str | None:
@@ -296,8 +230,13 @@ def get_country_from_name(country_name: str) -> str | None:
     return COUNTRY_NAME_TO_CODE.get(normalized)
 
 
-def link_site(site: dict) -> dict:
-    """Link a single site to the geographic hierarchy."""
+def link_site(site: dict, coord_country: str | None = None, coord_region: str | None = None) -> dict:
+    """Link a single site to the geographic hierarchy.
+
+    coord_country / coord_region are the coordinate lookups for the site
+    when already resolved in a batch (see link_sites); otherwise they are
+    computed here.
+    """
     lat = site.get("latitude")
     lon = site.get("longitude")
 
@@ -310,7 +249,7 @@ def link_site(site: dict) -> dict:
 
     # 2. Try coordinate-based detection
     if not country_code:
-        country_code = detect_country_from_coords(lat, lon)
+        country_code = coord_country or detect_country_from_coords(lat, lon)
 
     # 3. Parse location field
     if not country_code and site.get("location"):
@@ -319,11 +258,10 @@ def link_site(site: dict) -> dict:
             country_name = parts[-1].strip()
             country_code = get_country_from_name(country_name)
 
-    # Get region from country or coordinates
-    if country_code:
-        region_id = COUNTRY_TO_REGION.get(country_code, "global")
-    else:
-        region_id = detect_region_from_coords(lat, lon)
+    # Get region from country, else coordinates (also for countries outside REGION_DEFS)
+    region_id = COUNTRY_TO_REGION.get(country_code) if country_code else None
+    if not region_id:
+        region_id = coord_region or detect_region_from_coords(lat, lon)
 
     # Update site
     site["country_id"] = country_code
@@ -333,6 +271,17 @@ def link_site(site: dict) -> dict:
     return site
 
 
+def link_sites(sites: list[dict]) -> list[dict]:
+    """Link every site, resolving all coordinates in one batch."""
+    lats = [site.get("latitude") for site in sites]
+    lons = [site.get("longitude") for site in sites]
+    countries = detect_countries_from_coords(lats, lons)
+    regions = detect_regions_from_coords(lats, lons)
+    for site, country_code, region_id in zip(sites, countries, regions):
+        link_site(site, country_code, region_id)
+    return sites
+
+
 def main():
     if len(sys.argv) != 3:
         print(__doc__)
@@ -351,8 +300,7 @@ def main():
 
     # Link each site
     print("\nLinking sites to hierarchy...")
-    for site in sites:
-        link_site(site)
+    link_sites(sites)
 
     # Stats
     with_country = sum(1 for s in sites if s.get("country_id"))
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache of LLM results shared by the description scripts.
+
+Results are stored in one SQLite file (data/stage/llm_cache.sqlite by
+default), keyed by a hash of (model, system prompt, rendered prompt). A
+rerun therefore skips every item whose prompt inputs are unchanged and
+regenerates exactly the items whose inputs changed, whatever their ids.
+Only results that passed validation are stored.
+
+- Values are the parsed JSON object for one item, zlib-compressed.
+- When the stored values exceed max_bytes, least-recently-used entries are
+  evicted down to EVICT_TARGET of the budget (lru_store.py).
+
+Set UMILOG_LLM_CACHE to a path to use a different file, or to "off" to
+regenerate everything. Scripts in this directory import it directly
+(`from llm_cache import get_llm_cache`).
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Iterable, Optional
+
+from lru_store import LRUStore
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parents[1] / "stage" / "llm_cache.sqlite"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+LOOKUP_CHUNK = 500  # keys per SELECT, under SQLite's variable limit
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def prompt_key(model: str, system_prompt: str, prompt: str) -> str:
+    payload = json.dumps([model, system_prompt, prompt], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache(LRUStore):
+    """SQLite store of generated results with LRU eviction.
+
+    Safe to share between threads. Several processes may use the same file;
+    SQLite's WAL mode serializes their writes.
+    """
+
+    def __init__(self, path: Path = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        super().__init__(path, "results", ["model TEXT NOT NULL", "value BLOB NOT NULL", "created_at REAL NOT NULL"],
+                         max_bytes)
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys: Iterable[str]) -> dict:
+        """key -> cached result for every key present; refreshes their LRU position."""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self.lock:
+            for i in range(0, len(keys), LOOKUP_CHUNK):
+                chunk = keys[i:i + LOOKUP_CHUNK]
+                rows = self.conn.execute(
+                    f"SELECT key, value FROM results WHERE key IN ({', '.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update((key, json.loads(zlib.decompress(value))) for key, value in rows)
+            if found:
+                now = time.time()
+                self.conn.executemany("UPDATE results SET accessed_at = ? WHERE key = ?",
+                                      ((now, key) for key in found))
+                self.conn.commit()
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key: str):
+        return self.get_many([key]).get(key)
+
+    def put(self, key: str, model: str, result):
+        packed = zlib.compress(json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        self._put(key, (model, packed, time.time()), len(packed))
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """Process-wide cache, opened on first use; None when UMILOG_LLM_CACHE=off."""
+    global _shared
+    with _shared_lock:
+        setting = os.environ.get("UMILOG_LLM_CACHE", "")
+        if setting.lower() == "off":
+            return None
+        if _shared is None:
+            _shared = LLMCache(Path(setting) if setting else DEFAULT_CACHE_PATH)
+        return _shared
@@ -0,0 +1,628 @@
+#!/usr/bin/env python3
+"""
+Shared async Gemini generation engine for the LLM description scripts.
+
+- GenerationEngine: runs a whole backlog of prompts through a pool of
+  concurrent workers; two token buckets cap requests per minute and tokens
+  per minute (prompt estimate + max_output_tokens, settled against the
+  response's usage metadata)
+- 429 / RESOURCE_EXHAUSTED: the failed request is retried after the server's
+  retry delay (or exponential backoff), every worker pauses for that long,
+  and the request rate is halved; it climbs back by RATE_RECOVERY_STEP per
+  success
+- Batching: run_items() can pack up to `batch_size` items into one request
+  and parse a JSON array keyed by item id. Items missing from the answer
+  or failing validation are split off into smaller batches and retried;
+  a lone failing item falls back to its own single-item prompt
+- Caching: with an LLMCache (llm_cache.py), run_items() answers items whose
+  (model, system prompt, rendered prompt) hash is already stored without a
+  request, and stores every new valid result
+- FakeClient: offline stand-in for genai.Client (same aio.models.generate_content
+  interface) with simulated latency and an optional server-side quota, so
+  throughput and backoff can be tested without an API key. Scripts run
+  with --fake write to fake_path() variants of their checkpoint and output
+  files, and is_placeholder() spots fake answers already on disk
+
+Scripts in this directory import it directly (`from llm_engine import ...`).
+
+Usage (offline throughput test):
+    python3 data/scripts/llm_engine.py [--items 200] [--concurrency 8] [--rpm 600]
+        [--tpm 1000000] [--latency 0.5] [--quota-rpm 300] [--batch-size 16] [--drop-rate 0.05]
+        [--max-output-tokens 512] [--output-tokens N]
+
+The benchmark exits with status 1 if it used more tokens than --tpm allows.
+--output-tokens makes every fake response report that many output tokens,
+e.g. --max-output-tokens 2000 --output-tokens 2000 spends each reservation
+in full.
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Iterable, Optional
+
+from llm_cache import get_llm_cache, prompt_key
+
+DEFAULT_CONCURRENCY = 8
+TPM_TOLERANCE = 1.05  # slack for the benchmark's tokens-per-minute check
+CHARS_PER_TOKEN = 4
+MAX_RETRIES = 6
+BACKOFF_BASE = 2.0  # seconds, doubled per retry
+BACKOFF_MAX = 120.0
+MIN_RATE_FRACTION = 1 / 16
+RATE_RECOVERY_STEP = 0.05
+PROGRESS_INTERVAL = 25
+MAX_OUTPUT_TOKENS = 8192  # per response, gemini-2.0-flash
+PLACEHOLDER_PREFIX = "Offline placeholder for "
+
+BATCH_ITEM_HEADER = "### Item id: "
+BATCH_ITEM_RE = re.compile(r"^### Item id: (.+)$", re.MULTILINE)
+BATCH_INSTRUCTIONS = """Handle each of the {count} items below separately, as described above.
+Respond with only a JSON array holding one object per item. Each object has an
+"id" field set to the item's id, plus the fields you would return for that item alone."""
+
+RETRY_DELAY_RE = re.compile(r"retry(?:_delay|Delay)['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s")
+
+
+def get_genai():
+    """Lazy import google.genai."""
+    try:
+        from google import genai
+    except ImportError:
+        raise ImportError(
+            "google-genai is required. Install with: pip install google-genai"
+        )
+    return genai
+
+
+class AsyncTokenBucket:
+    """Allow `rate` tokens per second on average, bursting up to `capacity`.
+
+    Waiters are served in FIFO order. The balance may go negative: a
+    request costing more than `capacity` waits for a full bucket and then
+    takes its whole cost, and a request may turn out to cost more than was
+    reserved (see settle()). Later callers wait until the debt is repaid,
+    so the average rate holds either way.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def set_rate(self, rate: float):
+        self._refill()
+        self.rate = rate
+
+    async def acquire(self, tokens: float = 1.0):
+        needed = min(tokens, self.capacity)
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.tokens >= needed:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((needed - self.tokens) / self.rate)
+
+    def settle(self, reserved: float, actual: float):
+        """Correct an earlier acquire(reserved) once the real cost is known."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + reserved - actual)
+
+
+def is_rate_limited(error: Exception) -> bool:
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    return code == 429 or "429" in str(error) or "RESOURCE_EXHAUSTED" in str(error)
+
+
+def is_transient(error: Exception) -> bool:
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    return (isinstance(code, int) and 500 <= code < 600) or isinstance(error, (asyncio.TimeoutError, ConnectionError))
+
+
+def retry_delay(error: Exception, attempt: int) -> float:
+    """Server-suggested retry delay if the error carries one, else exponential backoff."""
+    match = RETRY_DELAY_RE.search(str(error))
+    if match:
+        return float(match.group(1))
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.8, 1.2)
+
+
+def build_contents(system_prompt: str, acknowledgement: str, prompt: str) -> list:
+    """System prompt, model acknowledgement and user prompt as Gemini chat turns."""
+    return [
+        {"role": "user", "parts": [{"text": system_prompt}]},
+        {"role": "model", "parts": [{"text": acknowledgement}]},
+        {"role": "user", "parts": [{"text": prompt}]},
+    ]
+
+
+def parse_json_response(text: str):
+    """JSON payload of a response, with any markdown code fence stripped."""
+    text = text.strip()
+    if "```json" in text:
+        text = text.split("```json")[1].split("```")[0].strip()
+    elif "```" in text:
+        text = text.split("```")[1].split("```")[0].strip()
+    return json.loads(text)
+
+
+def build_batch_prompt(items: list) -> str:
+    """One prompt covering several (key, prompt) items, answered as a keyed JSON array."""
+    sections = [BATCH_INSTRUCTIONS.format(count=len(items))]
+    sections.extend(f"{BATCH_ITEM_HEADER}{key}\n{prompt}" for key, prompt in items)
+    return "\n\n".join(sections)
+
+
+def parse_batch_response(text: str) -> dict:
+    """Objects of a batched response keyed by their "id" (as a string), id removed."""
+    payload = parse_json_response(text)
+    if isinstance(payload, dict):
+        # Tolerate the array being wrapped, e.g. {"items": [...]}
+        payload = next((value for value in payload.values() if isinstance(value, list)), [])
+    answers = {}
+    for entry in payload if isinstance(payload, list) else []:
+        if isinstance(entry, dict) and "id" in entry:
+            answers[str(entry.pop("id"))] = entry
+    return answers
+
+
+def is_valid(result, required_fields: tuple) -> bool:
+    return isinstance(result, dict) and all(result.get(field) for field in required_fields)
+
+
+def estimate_tokens(contents: list, config: dict) -> int:
+    chars = sum(len(part.get("text", "")) for turn in contents for part in turn.get("parts", []))
+    return chars // CHARS_PER_TOKEN + int(config.get("max_output_tokens", 0))
+
+
+class GenerationEngine:
+    """Concurrent, rate-limited generate_content calls for one model.
+
+    run() takes (key, contents, config) jobs and calls on_result(key, text,
+    error) as each finishes -- text is None when the job failed after
+    retries. Callbacks run on the event loop thread, one at a time, so they
+    can update plain dicts and write checkpoints without locking.
+    """
+
+    def __init__(self, client, model: str, concurrency: int = DEFAULT_CONCURRENCY,
+                 requests_per_minute: float = 15, tokens_per_minute: float = 1_000_000,
+                 max_retries: int = MAX_RETRIES, batch_size: int = 1, cache=None):
+        self.client = client
+        self.model = model
+        self.concurrency = max(1, concurrency)
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.batch_size = max(1, batch_size)
+        self.cache = cache
+        self.fake = isinstance(client, FakeClient)
+        # Fake answers must never be served to a real run
+        self.cache_model = f"fake/{model}" if self.fake else model
+        self.rate_fraction = 1.0
+        self.resume_at = 0.0
+        self.stats = {
+            "jobs": 0, "succeeded": 0, "cached": 0, "failed": 0, "requests": 0,
+            "retries": 0, "rate_limited": 0, "batch_retries": 0, "tokens": 0, "elapsed": 0.0,
+            "largest_request": 0,
+        }
+
+    def _adjust_rate(self, fraction: float):
+        self.rate_fraction = min(1.0, max(MIN_RATE_FRACTION, fraction))
+        self.request_bucket.set_rate(self.requests_per_minute / 60 * self.rate_fraction)
+        self.token_bucket.set_rate(self.tokens_per_minute / 60 * self.rate_fraction)
+
+    async def _wait_for_cooldown(self):
+        while True:
+            wait = self.resume_at - time.monotonic()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    async def generate(self, contents: list, config: dict) -> str:
+        """One generate_content call, retried on 429 and transient errors."""
+        reserved = estimate_tokens(contents, config)
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_cooldown()
+            await self.request_bucket.acquire()
+            await self.token_bucket.acquire(reserved)
+            self.stats["requests"] += 1
+            try:
+                response = await self.client.aio.models.generate_content(
+                    model=self.model, contents=contents, config=config
+                )
+            except Exception as e:
+                self.token_bucket.settle(reserved, 0)
+                if attempt == self.max_retries or not (is_rate_limited(e) or is_transient(e)):
+                    raise
+                delay = retry_delay(e, attempt)
+                self.stats["retries"] += 1
+                if is_rate_limited(e):
+                    self.stats["rate_limited"] += 1
+                    self.resume_at = max(self.resume_at, time.monotonic() + delay)
+                    self._adjust_rate(self.rate_fraction / 2)
+                else:
+                    await asyncio.sleep(delay)
+                continue
+
+            usage = getattr(response, "usage_metadata", None)
+            actual = getattr(usage, "total_token_count", None) or reserved
+            self.token_bucket.settle(reserved, actual)
+            self.stats["tokens"] += actual
+            self.stats["largest_request"] = max(self.stats["largest_request"], actual)
+            if self.rate_fraction < 1.0:
+                self._adjust_rate(self.rate_fraction + RATE_RECOVERY_STEP)
+            return response.text or ""
+
+    async def _drain(self, jobs: list, process: Callable):
+        """Run `process(job, enqueue)` for every job, including ones enqueued on the way."""
+        # Buckets hold at most one second of budget so a cold start cannot
+        # burst past the per-minute limits
+        self.request_bucket = AsyncTokenBucket(self.requests_per_minute / 60, max(1.0, self.requests_per_minute / 60))
+        self.token_bucket = AsyncTokenBucket(self.tokens_per_minute / 60, max(1.0, self.tokens_per_minute / 60))
+        self._adjust_rate(self.rate_fraction)
+        queue = asyncio.Queue()
+        for job in jobs:
+            queue.put_nowait(job)
+
+        async def worker():
+            while True:
+                job = await queue.get()
+                try:
+                    await process(job, queue.put_nowait)
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        drained = asyncio.create_task(queue.join())
+        try:
+            # A worker only finishes by raising (e.g. from a result callback)
+            await asyncio.wait([drained, *workers], return_when=asyncio.FIRST_COMPLETED)
+            for task in workers:
+                if task.done():
+                    task.result()
+        finally:
+            for task in (drained, *workers):
+                task.cancel()
+            await asyncio.gather(drained, *workers, return_exceptions=True)
+
+    def _execute(self, jobs: list, process: Callable):
+        started = time.monotonic()
+        try:
+            asyncio.run(self._drain(jobs, process))
+        finally:
+            self.stats["elapsed"] += time.monotonic() - started
+
+    def run(self, jobs: Iterable[tuple], on_result: Callable[[str, Optional[str], Optional[Exception]], None]) -> dict:
+        """Process every (key, contents, config) job; returns the engine stats."""
+        jobs = list(jobs)
+        self.stats["jobs"] += len(jobs)
+
+        async def process(job, enqueue):
+            key, contents, config = job
+            try:
+                text = await self.generate(contents, config)
+            except Exception as e:
+                self.stats["failed"] += 1
+                on_result(key, None, e)
+            else:
+                self.stats["succeeded"] += 1
+                on_result(key, text, None)
+
+        self._execute(jobs, process)
+        return self.stats
+
+    def item_key(self, system_prompt: str, acknowledgement: str, prompt: str) -> str:
+        """Cache key of one item's prompt; changes whenever the model, system prompt or prompt does."""
+        return prompt_key(self.cache_model, f"{system_prompt}\n\n{acknowledgement}", prompt)
+
+    def run_items(self, items: Iterable[tuple], system_prompt: str, acknowledgement: str, config: dict,
+                  on_result: Callable[[str, Optional[dict], Optional[Exception]], None],
+                  required_fields: tuple = (), batch_size: Optional[int] = None) -> dict:
+        """Generate one JSON object per (key, prompt) item; returns the engine stats.
+
+        on_result(key, result, error) receives the parsed object, or None and
+        the reason once the item has failed. With batch_size > 1, items are
+        packed into batched requests (max_output_tokens scales with the batch,
+        up to MAX_OUTPUT_TOKENS); items a batch gets wrong are split off and
+        retried, ending with a single-item request of their own. A request
+        that fails outright (after generate()'s retries) fails its whole batch. An object is
+        valid when every one of `required_fields` is present and non-empty.
+        Items found in the cache are reported first, without a request.
+        """
+        prompts = {str(key): prompt for key, prompt in items}
+        self.stats["jobs"] += len(prompts)
+
+        cache_keys = {}
+        if self.cache is not None:
+            cache_keys = {key: self.item_key(system_prompt, acknowledgement, prompt) for key, prompt in prompts.items()}
+            hits = self.cache.get_many(cache_keys.values())
+            for key in [key for key in prompts if cache_keys[key] in hits]:
+                del prompts[key]
+                self.stats["cached"] += 1
+                self.stats["succeeded"] += 1
+                on_result(key, hits[cache_keys[key]], None)
+
+        batch_size = max(1, self.batch_size if batch_size is None else batch_size)
+        keys = list(prompts)
+        batches = [keys[i:i + batch_size] for i in range(0, len(keys), batch_size)]
+
+        def finish(key, result, error):
+            if result is not None:
+                self.stats["succeeded"] += 1
+                if self.cache is not None:
+                    self.cache.put(cache_keys[key], self.cache_model, result)
+            else:
+                self.stats["failed"] += 1
+            on_result(key, result, error)
+
+        async def process(batch, enqueue):
+            if len(batch) == 1:
+                key = batch[0]
+                contents = build_contents(system_prompt, acknowledgement, prompts[key])
+                try:
+                    result = parse_json_response(await self.generate(contents, config))
+                except Exception as e:
+                    finish(key, None, e)
+                    return
+                if is_valid(result, required_fields):
+                    finish(key, result, None)
+                else:
+                    finish(key, None, ValueError(f"response is missing {', '.join(required_fields)}"))
+                return
+
+            contents = build_contents(
+                system_prompt, acknowledgement, build_batch_prompt([(key, prompts[key]) for key in batch])
+            )
+            batch_config = {
+                **config,
+                "max_output_tokens": min(MAX_OUTPUT_TOKENS, int(config.get("max_output_tokens", 512)) * len(batch)),
+            }
+            try:
+                text = await self.generate(contents, batch_config)
+            except Exception as e:
+                # generate() already retried what a retry can fix; splitting
+                # the batch would only repeat the failure per item
+                for key in batch:
+                    finish(key, None, e)
+                return
+            try:
+                answers = parse_batch_response(text)
+            except ValueError:
+                answers = {}
+
+            failed = []
+            for key in batch:
+                if is_valid(answers.get(key), required_fields):
+                    finish(key, answers[key], None)
+                else:
+                    failed.append(key)
+            if failed:
+                self.stats["batch_retries"] += len(failed)
+                middle = (len(failed) + 1) // 2
+                enqueue(failed[:middle])
+                if failed[middle:]:
+                    enqueue(failed[middle:])
+
+        self._execute(batches, process)
+        return self.stats
+
+    def summary(self) -> str:
+        s = self.stats
+        generated = s["succeeded"] - s["cached"]
+        per_minute = generated / s["elapsed"] * 60 if s["elapsed"] else 0.0
+        return (
+            f"{s['succeeded']}/{s['jobs']} ok ({s['cached']} cached), {s['failed']} failed, {s['requests']} requests, "
+            f"{s['retries']} retries ({s['rate_limited']} rate limited), "
+            f"{s['batch_retries']} items re-batched, {s['tokens']} tokens, "
+            f"{s['elapsed']:.1f}s ({per_minute:.1f} items/min)"
+        )
+
+
+class FakeRateLimitError(Exception):
+    code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"429 RESOURCE_EXHAUSTED (fake quota). {{'retryDelay': '{retry_after:.0f}s'}}")
+
+
+class _FakeResponse:
+    def __init__(self, text: str, prompt_tokens: int, output_tokens: int):
+        self.text = text
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=output_tokens,
+            total_token_count=prompt_tokens + output_tokens,
+        )
+
+
+class _FakeModels:
+    def __init__(self, client: "FakeClient"):
+        self.client = client
+
+    async def generate_content(self, model: str, contents: list, config: Optional[dict] = None):
+        fake = self.client
+        now = time.monotonic()
+        if fake.quota_rpm:
+            window = fake.request_times
+            while window and now - window[0] >= 60:
+                window.pop(0)
+            if len(window) >= fake.quota_rpm:
+                raise FakeRateLimitError(max(1.0, 60 - (now - window[0])))
+            window.append(now)
+        fake.calls += 1
+        await asyncio.sleep(fake.latency * random.uniform(0.5, 1.5))
+        prompt = contents[-1]["parts"][0]["text"]
+        text = fake.respond(prompt)
+        prompt_tokens = estimate_tokens(contents, {})
+        output_tokens = fake.output_tokens or len(text) // CHARS_PER_TOKEN
+        return _FakeResponse(text, prompt_tokens, output_tokens)
+
+
+class FakeClient:
+    """Offline genai.Client stand-in: answers every prompt after `latency` seconds.
+
+    `quota_rpm` makes it reject requests past that many per rolling minute
+    with a 429, like the real API. `respond(prompt)` builds the response text;
+    the default returns `sample` plus a description quoting the prompt's
+    first line, or for a batched prompt an array of those keyed by item id,
+    leaving out each item with probability `drop_rate`. `output_tokens`
+    overrides the output token count reported in usage_metadata, which
+    otherwise follows the response length.
+    """
+
+    def __init__(self, latency: float = 0.5, quota_rpm: Optional[int] = None,
+                 respond: Optional[Callable[[str], str]] = None, drop_rate: float = 0.0,
+                 sample: Optional[dict] = None, output_tokens: Optional[int] = None):
+        self.latency = latency
+        self.output_tokens = output_tokens
+        self.quota_rpm = quota_rpm
+        self.drop_rate = drop_rate
+        self.sample = sample or {"highlights": []}
+        self.respond = respond or self.placeholder_response
+        self.request_times = []
+        self.calls = 0
+        # genai.Client exposes its async API as client.aio.models
+        self.models = _FakeModels(self)
+        self.aio = self
+
+    def placeholder_response(self, prompt: str) -> str:
+        def placeholder(text):
+            first_line = text.strip().splitlines()[0] if text.strip() else "item"
+            return {**self.sample, "description": f"{PLACEHOLDER_PREFIX}{first_line}"}
+
+        sections = BATCH_ITEM_RE.split(prompt)
+        if len(sections) == 1:
+            return json.dumps(placeholder(prompt))
+        # split() yields [instructions, id, body, id, body, ...]
+        return json.dumps([
+            {"id": key.strip(), **placeholder(body)}
+            for key, body in zip(sections[1::2], sections[2::2])
+            if random.random() >= self.drop_rate
+        ])
+
+
+def fake_path(path: Path) -> Path:
+    """Where a --fake run writes instead of path: out.json -> out.fake.json."""
+    return path.with_name(f"{path.stem}.fake{path.suffix}")
+
+
+def is_placeholder(result: Optional[dict]) -> bool:
+    """Whether a generated result came from FakeClient rather than the model."""
+    return str((result or {}).get("description", "")).startswith(PLACEHOLDER_PREFIX)
+
+
+def pop_option(args: list, name: str, cast=str, default=None):
+    """Remove `--name value` / `--name=value` from args; returns the value or default."""
+    for i, arg in enumerate(args):
+        if arg == name and i + 1 < len(args):
+            value = args[i + 1]
+            del args[i:i + 2]
+            return cast(value)
+        if arg.startswith(name + "="):
+            del args[i]
+            return cast(arg.split("=", 1)[1])
+    return default
+
+
+def pop_flag(args: list, name: str) -> bool:
+    if name in args:
+        args.remove(name)
+        return True
+    return False
+
+
+def engine_from_args(args: list, model: str, requests_per_minute: float,
+                     tokens_per_minute: float, batch_size: int = 1,
+                     fake_sample: Optional[dict] = None) -> GenerationEngine:
+    """Build an engine from (and strip) the shared command-line options.
+
+    --fake uses FakeClient (answering with `fake_sample` fields) and needs
+    no API key; callers then write to fake_path() files. Otherwise GEMINI_API_KEY must be set. --concurrency, --rpm,
+    --tpm and --batch-size override the defaults. Results are cached through
+    get_llm_cache() (UMILOG_LLM_CACHE); --no-cache bypasses it. Exits with a
+    message when the key is missing.
+    """
+    fake = pop_flag(args, "--fake")
+    use_cache = not pop_flag(args, "--no-cache")
+    concurrency = pop_option(args, "--concurrency", int, DEFAULT_CONCURRENCY)
+    batch_size = pop_option(args, "--batch-size", int, batch_size)
+    requests_per_minute = pop_option(args, "--rpm", float, requests_per_minute)
+    tokens_per_minute = pop_option(args, "--tpm", float, tokens_per_minute)
+
+    if fake:
+        client = FakeClient(sample=fake_sample)
+    else:
+        api_key = os.environ.get("GEMINI_API_KEY")
+        if not api_key:
+            print("Error: GEMINI_API_KEY environment variable not set (or pass --fake)")
+            sys.exit(1)
+        client = get_genai().Client(api_key=api_key)
+
+    return GenerationEngine(client, model, concurrency, requests_per_minute, tokens_per_minute,
+                            batch_size=batch_size, cache=get_llm_cache() if use_cache else None)
+
+
+def main():
+    args = sys.argv[1:]
+    items = pop_option(args, "--items", int, 200)
+    concurrency = pop_option(args, "--concurrency", int, DEFAULT_CONCURRENCY)
+    requests_per_minute = pop_option(args, "--rpm", float, 600)
+    tokens_per_minute = pop_option(args, "--tpm", float, 1_000_000)
+    latency = pop_option(args, "--latency", float, 0.5)
+    quota_rpm = pop_option(args, "--quota-rpm", int, None)
+    batch_size = pop_option(args, "--batch-size", int, 1)
+    drop_rate = pop_option(args, "--drop-rate", float, 0.0)
+    max_output_tokens = pop_option(args, "--max-output-tokens", int, 512)
+    output_tokens = pop_option(args, "--output-tokens", int, None)
+    if args:
+        print(f"Unknown arguments: {' '.join(args)}")
+        sys.exit(1)
+
+    client = FakeClient(latency=latency, quota_rpm=quota_rpm, drop_rate=drop_rate,
+                        output_tokens=output_tokens)
+    engine = GenerationEngine(client, "fake", concurrency, requests_per_minute, tokens_per_minute,
+                              batch_size=batch_size)
+    config = {"temperature": 0.4, "max_output_tokens": max_output_tokens}
+    jobs = [(str(i), f"Item {i}\n" + "x" * 800) for i in range(items)]
+
+    done = 0
+
+    def on_result(key, text, error):
+        nonlocal done
+        done += 1
+        if done % PROGRESS_INTERVAL == 0:
+            print(f"  {done}/{items} (rate x{engine.rate_fraction:.2f})")
+
+    print(f"Fake model: {items} items, concurrency {concurrency}, {requests_per_minute:.0f} rpm, "
+          f"{tokens_per_minute:.0f} tpm, latency {latency}s, quota {quota_rpm or 'none'}, "
+          f"batch size {batch_size}, drop rate {drop_rate}")
+    engine.run_items(jobs, "System prompt", "OK", config, on_result, required_fields=("description",))
+    print(engine.summary())
+
+    # The bucket starts with one second of budget, and the last request may
+    # take its whole cost before the clock stops, so allow both on top
+    elapsed = engine.stats["elapsed"]
+    allowed = tokens_per_minute / 60 * (elapsed + 1) + engine.stats["largest_request"]
+    per_minute = engine.stats["tokens"] / elapsed * 60 if elapsed else 0.0
+    print(f"Tokens: {engine.stats['tokens']} in {elapsed:.1f}s ({per_minute:.0f}/min, limit {tokens_per_minute:.0f}/min)")
+    if engine.stats["tokens"] > allowed * TPM_TOLERANCE:
+        print("Error: token rate exceeded --tpm")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
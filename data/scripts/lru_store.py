@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+SQLite table with a byte budget and least-recently-used eviction, shared by
+the HTTP response cache (http_cache.py) and the LLM result cache
+(llm_cache.py).
+
+Every row carries key, accessed_at and size columns around the caller's
+own columns. When the stored sizes exceed max_bytes, least-recently-used
+rows are evicted down to EVICT_TARGET of the budget. The total is summed
+from the table (through an index on size) inside each write transaction,
+so processes sharing one file all evict from the same number.
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+EVICT_TARGET = 0.9
+
+
+class LRUStore:
+    """One SQLite table of (key, *columns, accessed_at, size) rows.
+
+    Safe to share between threads. Several processes may use the same file;
+    SQLite's WAL mode serializes their writes. Subclasses read through
+    self.conn while holding self.lock and write rows with _put().
+    """
+
+    def __init__(self, path: Path, table: str, columns: list, max_bytes: int):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.table = table
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        self._insert_sql = f"INSERT OR REPLACE INTO {table} VALUES ({', '.join('?' * (len(columns) + 3))})"
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode = WAL")
+            self.conn.execute("PRAGMA synchronous = NORMAL")
+            self.conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    key TEXT PRIMARY KEY,
+                    {', '.join(columns)},
+                    accessed_at REAL NOT NULL,
+                    size INTEGER NOT NULL
+                )
+            """)
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_accessed ON {table}(accessed_at)")
+            # Lets SUM(size) skip the value blobs
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_size ON {table}(size)")
+            self.conn.commit()
+
+    def total_bytes(self) -> int:
+        with self.lock:
+            return self._sum_sizes()
+
+    def _sum_sizes(self) -> int:
+        return self.conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+
+    def _put(self, key: str, values: tuple, size: int):
+        """Insert or replace one row, then evict if the table is over budget."""
+        with self.lock:
+            self.conn.execute(self._insert_sql, (key, *values, time.time(), size))
+            # Summed after the insert, in the same write transaction, so it
+            # includes rows other processes have stored
+            total = self._sum_sizes()
+            if total > self.max_bytes:
+                self._evict(total)
+            self.conn.commit()
+
+    def _evict(self, total: int):
+        """Drop least-recently-used rows until under EVICT_TARGET of the budget. Caller holds the lock."""
+        target = self.max_bytes * EVICT_TARGET
+        doomed = []
+        for key, size in self.conn.execute(f"SELECT key, size FROM {self.table} ORDER BY accessed_at"):
+            if total <= target:
+                break
+            doomed.append((key,))
+            total -= size
+        self.conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", doomed)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -4,6 +4,8 @@ Merge species images from multiple sources into a unified manifest.
 
 Consolidates images from iNaturalist, Wikimedia Commons, and FishBase,
 deduplicates by hash, ranks by source quality, and prepares for deployment.
+Reads the per-source manifests (species_images_{inaturalist,fishbase,wikimedia}.json)
+and the parallel harvester's species_images_harvest.json, whichever exist.
 
 Usage:
     python3 merge_species_images.py <images_dir> <output_manifest>
@@ -32,6 +34,9 @@ SOURCE_PRIORITY = {
 # Target images per species
 TARGET_IMAGES = 5
 
+# Written by species_images_harvest.py: {species_id: {source: entry}}
+HARVEST_MANIFEST = "species_images_harvest.json"
+
 
 def load_manifest(manifest_path: Path) -> dict:
     """Load a source manifest file."""
@@ -42,12 +47,35 @@ def load_manifest(manifest_path: Path) -> dict:
         return json.load(f)
 
 
+def add_harvest(manifest: dict, harvest: dict, source: str) -> dict:
+    """Add one source's entries from the harvest manifest to its per-source manifest.
+
+    Photos for a species found in both are concatenated; duplicates share a
+    sha256 and are dropped during the merge.
+    """
+    species = dict(manifest.get("species", {}))
+    for species_id, sources in harvest.get("species", {}).items():
+        entry = sources.get(source)
+        if not entry:
+            continue
+        if species_id in species:
+            existing = species[species_id]
+            species[species_id] = {**entry, **existing, "photos": existing.get("photos", []) + entry.get("photos", [])}
+        else:
+            species[species_id] = entry
+    return {**manifest, "species": species}
+
+
 def merge_species_images(images_dir: Path) -> dict:
     """Merge images from all sources."""
     # Load all manifests
-    inat_manifest = load_manifest(images_dir / "species_images_inaturalist.json")
-    wiki_manifest = load_manifest(images_dir / "species_images_wikimedia.json")
-    fishbase_manifest = load_manifest(images_dir / "species_images_fishbase.json")
+    harvest_manifest = load_manifest(images_dir / HARVEST_MANIFEST)
+    inat_manifest = add_harvest(load_manifest(images_dir / "species_images_inaturalist.json"),
+                                harvest_manifest, "inaturalist")
+    wiki_manifest = add_harvest(load_manifest(images_dir / "species_images_wikimedia.json"),
+                                harvest_manifest, "wikimedia")
+    fishbase_manifest = add_harvest(load_manifest(images_dir / "species_images_fishbase.json"),
+                                    harvest_manifest, "fishbase")
 
     # Collect all species IDs
     all_species_ids = set()
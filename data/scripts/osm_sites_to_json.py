@@ -3,16 +3,51 @@
 Parse OSM Overpass API JSON responses into UmiLog site seed format.
 Consolidates multiple regional OSM dumps into a single sites file.
 
-Usage: python3 osm_sites_to_json.py <raw_dir> <output_json>
+Usage: python3 osm_sites_to_json.py <raw_dir> <output_json> [--workers N]
 Example: python3 osm_sites_to_json.py raw/ export/sites_osm.json
+
+Dumps are parsed in a process pool, one region file per worker, and merged
+as they complete. Each file is streamed: elements are decoded one at a time
+from a READ_CHUNK-sized buffer, so memory stays bounded by the size of a
+single element plus the sites kept, not by the size of the dump. Duplicate
+coordinates keep the site from the first file in name order, so the output
+does not depend on which worker finishes first.
 """
 
-import sys
-import json
 import os
 import re
+import json
+import argparse
 from datetime import datetime
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+READ_CHUNK = 1 << 20  # characters read from a dump at a time
+
+_decoder = json.JSONDecoder()
+# Characters that may continue a number cut off at a chunk boundary
+_NUMBER_TAIL = frozenset('0123456789.eE+-')
+
+# Difficulty mapping (OSM uses 1-5 scale)
+DIFFICULTY_MAP = {'1': 'Beginner', '2': 'Easy', '3': 'Intermediate', '4': 'Advanced', '5': 'Expert'}
+
+# Dive type tags from scuba_diving:type:*
+DIVE_TYPE_TAGS = [
+    (f"scuba_diving:type:{dive_type}", label)
+    for dive_type, label in [
+        ("drift", "Drift Dive"),
+        ("wall", "Wall Dive"),
+        ("cave", "Cave Dive"),
+        ("cavern", "Cavern Dive"),
+        ("night", "Night Dive"),
+        ("wreck", "Wreck Dive"),
+        ("reef", "Reef Dive"),
+        ("muck", "Muck Dive"),
+        ("sharks", "Shark Dive"),
+        ("bigfish", "Big Fish"),
+        ("snorkeling", "Snorkeling"),
+    ]
+]
 
 # Region detection based on coordinates
 def detect_region(lat, lon):
@@ -65,190 +100,300 @@ def slugify(text):
     return text.strip('-')
 
 
-def parse_osm_json(filepath):
-    """Parse a single OSM Overpass JSON file."""
-    sites = []
-
+def parse_depth(val):
+    """Depth in metres from an OSM tag value; ranges like "5-27" give the max."""
+    if not val:
+        return None
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-    except Exception as e:
-        print(f"  Error loading {filepath}: {e}")
-        return sites
-
-    elements = data.get('elements', [])
-
-    for elem in elements:
-        # Get coordinates
-        lat = elem.get('lat')
-        lon = elem.get('lon')
-
-        # For ways, calculate centroid from nodes
-        if elem.get('type') == 'way' and 'center' in elem:
-            lat = elem['center'].get('lat')
-            lon = elem['center'].get('lon')
-
-        if lat is None or lon is None:
-            continue
-
-        tags = elem.get('tags', {})
-        osm_id = f"osm_{elem.get('type', 'n')}_{elem.get('id', 0)}"
-
-        # Get name
-        name = tags.get('name') or tags.get('name:en') or tags.get('alt_name')
-        if not name:
-            # Generate name from type
-            site_type = detect_site_type(tags)
-            name = f"Unnamed {site_type} Site"
-
-        # Detect region and type
-        region = detect_region(lat, lon)
-        site_type = detect_site_type(tags)
-
-        # Build location string
-        addr_parts = []
-        if tags.get('addr:city'):
-            addr_parts.append(tags['addr:city'])
-        if tags.get('addr:country'):
-            addr_parts.append(tags['addr:country'])
-        location = ', '.join(addr_parts) if addr_parts else region
-
-        # Extract additional metadata
-        description = tags.get('description') or tags.get('note') or ''
-
-        # Parse depth values
-        def parse_depth(val):
-            if not val:
-                return None
+        if '-' in str(val):
+            parts = str(val).replace('m', '').split('-')
+            return float(parts[-1].strip())  # Return max
+        return float(str(val).replace('m', '').strip())
+    except ValueError:
+        return None
+
+
+class _StreamReader:
+    """Text buffer over a file that decodes JSON values without loading it whole."""
+
+    def __init__(self, f, chunk_size=READ_CHUNK):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        """Read another chunk, dropping the consumed prefix. False at end of file."""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Next non-whitespace character (not consumed), or '' at end of file."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\n\r':
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, chars):
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"expected one of {chars!r}, found {char or 'end of file'!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decode the next JSON value.
+
+        A number ending at the buffer end may have been cut off by the chunk
+        boundary, so it is only accepted once a delimiter (or EOF) follows.
+        """
+        self.peek()
+        while True:
             try:
-                # Handle ranges like "5-27"
-                if '-' in str(val):
-                    parts = str(val).replace('m', '').split('-')
-                    return float(parts[-1].strip())  # Return max
-                return float(str(val).replace('m', '').strip())
-            except ValueError:
-                return None
-
-        # Extract dive-specific OSM tags
-        max_depth = parse_depth(tags.get('scuba_diving:maxdepth') or tags.get('depth'))
-        min_depth = parse_depth(tags.get('scuba_diving:mindepth'))
-
-        # Difficulty mapping (OSM uses 1-5 scale)
-        difficulty_map = {'1': 'Beginner', '2': 'Easy', '3': 'Intermediate', '4': 'Advanced', '5': 'Expert'}
-        osm_difficulty = tags.get('scuba_diving:difficulty', '')
-        difficulty = difficulty_map.get(str(osm_difficulty), 'Intermediate')
-
-        # Current strength (1-5)
-        current = tags.get('scuba_diving:current')
-
-        # Entry method
-        entry = tags.get('scuba_diving:entry') or ('boat' if tags.get('scuba_diving:entry:boat') else None)
-
-        # Dangers
-        dangers = tags.get('scuba_diving:dangers', '')
-
-        # Website/links
-        website = tags.get('website') or tags.get('url')
-        wikidata_id = tags.get('wikidata')
-        wikipedia = tags.get('wikipedia')
-
-        # Wreck-specific data
-        wreck_date = tags.get('wreck:date_sunk')
-        wreck_type = tags.get('wreck:type')
-
-        site = {
-            "id": osm_id,
-            "name": name,
-            "location": location,
-            "region": region,
-            "latitude": lat,
-            "longitude": lon,
-            "difficulty": difficulty,
-            "type": site_type.lower(),
-            "description": description,
-            "minDepth": min_depth,
-            "maxDepth": max_depth or 30,
-            "averageDepth": min_depth if min_depth else (max_depth / 2 if max_depth else 15),
-            "currentStrength": int(current) if current and current.isdigit() else None,
-            "entryType": entry,
-            "dangers": dangers if dangers else None,
-            "averageTemp": 26,
-            "averageVisibility": 20,
-            "website": website,
-            "wikidataId": wikidata_id,
-            "wikipedia": wikipedia,
-            "wreckDate": wreck_date,
-            "wreckType": wreck_type,
-            "wishlist": False,
-            "visitedCount": 0,
-            "osmId": osm_id,
-            "source": "OpenStreetMap",
-            "license": "ODbL",
-            "createdAt": datetime.utcnow().isoformat(timespec='seconds') + 'Z'
-        }
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+                if self.eof or (end < len(self.buf) and self.buf[end] not in _NUMBER_TAIL):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            if not self._fill():
+                value, self.pos = _decoder.raw_decode(self.buf, self.pos)
+                return value
+
+
+def iter_elements(f, chunk_size=READ_CHUNK):
+    """Yield the entries of the top-level "elements" array of an Overpass dump.
+
+    Other top-level members (version, osm3s, ...) are decoded and discarded.
+    """
+    reader = _StreamReader(f, chunk_size)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        key = reader.value()
+        reader.expect(':')
+        if key == 'elements':
+            reader.expect('[')
+            if reader.peek() == ']':
+                reader.pos += 1
+            else:
+                while True:
+                    yield reader.value()
+                    if reader.expect(',]') == ']':
+                        break
+        else:
+            reader.value()
+        if reader.expect(',}') == '}':
+            return
+
+
+def parse_osm_json(filepath, created_at=None):
+    """Parse a single OSM Overpass JSON file, streaming its elements."""
+    sites = []
+    created_at = created_at or datetime.utcnow().isoformat(timespec='seconds') + 'Z'
 
-        # Add tags from OSM - including dive type tags
-        site_tags = []
-        if tags.get("sport") == "scuba_diving":
-            site_tags.append("Scuba Diving")
-        if tags.get("natural") == "reef":
-            site_tags.append("Reef")
-        if tags.get("historic") == "wreck":
-            site_tags.append("Wreck")
-        if tags.get("natural") == "sinkhole":
-            site_tags.append("Cenote")
-
-        # Dive type tags from scuba_diving:type:*
-        dive_type_map = {
-            "drift": "Drift Dive",
-            "wall": "Wall Dive",
-            "cave": "Cave Dive",
-            "cavern": "Cavern Dive",
-            "night": "Night Dive",
-            "wreck": "Wreck Dive",
-            "reef": "Reef Dive",
-            "muck": "Muck Dive",
-            "sharks": "Shark Dive",
-            "bigfish": "Big Fish",
-            "snorkeling": "Snorkeling",
-        }
-        for dive_type, label in dive_type_map.items():
-            if tags.get(f"scuba_diving:type:{dive_type}") == "yes":
-                site_tags.append(label)
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for elem in iter_elements(f):
+            site = element_to_site(elem, created_at)
+            if site is not None:
+                sites.append(site)
 
-        site["tags"] = site_tags
+    return sites
 
-        sites.append(site)
 
-    return sites
+def element_to_site(elem, created_at):
+    """Convert one Overpass element to a site dict, or None if it has no coordinates."""
+    # Get coordinates
+    lat = elem.get('lat')
+    lon = elem.get('lon')
+
+    # For ways, calculate centroid from nodes
+    if elem.get('type') == 'way' and 'center' in elem:
+        lat = elem['center'].get('lat')
+        lon = elem['center'].get('lon')
+
+    if lat is None or lon is None:
+        return None
+
+    tags = elem.get('tags', {})
+    osm_id = f"osm_{elem.get('type', 'n')}_{elem.get('id', 0)}"
+
+    # Detect region and type
+    region = detect_region(lat, lon)
+    site_type = detect_site_type(tags)
+
+    # Get name, else generate one from the type
+    name = tags.get('name') or tags.get('name:en') or tags.get('alt_name') or f"Unnamed {site_type} Site"
+
+    # Build location string
+    addr_parts = []
+    if tags.get('addr:city'):
+        addr_parts.append(tags['addr:city'])
+    if tags.get('addr:country'):
+        addr_parts.append(tags['addr:country'])
+    location = ', '.join(addr_parts) if addr_parts else region
+
+    # Extract additional metadata
+    description = tags.get('description') or tags.get('note') or ''
+
+    # Extract dive-specific OSM tags
+    max_depth = parse_depth(tags.get('scuba_diving:maxdepth') or tags.get('depth'))
+    min_depth = parse_depth(tags.get('scuba_diving:mindepth'))
+
+    osm_difficulty = tags.get('scuba_diving:difficulty', '')
+    difficulty = DIFFICULTY_MAP.get(str(osm_difficulty), 'Intermediate')
+
+    # Current strength (1-5)
+    current = tags.get('scuba_diving:current')
+
+    # Entry method
+    entry = tags.get('scuba_diving:entry') or ('boat' if tags.get('scuba_diving:entry:boat') else None)
+
+    # Dangers
+    dangers = tags.get('scuba_diving:dangers', '')
+
+    # Website/links
+    website = tags.get('website') or tags.get('url')
+    wikidata_id = tags.get('wikidata')
+    wikipedia = tags.get('wikipedia')
+
+    # Wreck-specific data
+    wreck_date = tags.get('wreck:date_sunk')
+    wreck_type = tags.get('wreck:type')
+
+    site = {
+        "id": osm_id,
+        "name": name,
+        "location": location,
+        "region": region,
+        "latitude": lat,
+        "longitude": lon,
+        "difficulty": difficulty,
+        "type": site_type.lower(),
+        "description": description,
+        "minDepth": min_depth,
+        "maxDepth": max_depth or 30,
+        "averageDepth": min_depth if min_depth else (max_depth / 2 if max_depth else 15),
+        "currentStrength": int(current) if current and current.isdigit() else None,
+        "entryType": entry,
+        "dangers": dangers if dangers else None,
+        "averageTemp": 26,
+        "averageVisibility": 20,
+        "website": website,
+        "wikidataId": wikidata_id,
+        "wikipedia": wikipedia,
+        "wreckDate": wreck_date,
+        "wreckType": wreck_type,
+        "wishlist": False,
+        "visitedCount": 0,
+        "osmId": osm_id,
+        "source": "OpenStreetMap",
+        "license": "ODbL",
+        "createdAt": created_at
+    }
 
+    # Add tags from OSM - including dive type tags
+    site_tags = []
+    if tags.get("sport") == "scuba_diving":
+        site_tags.append("Scuba Diving")
+    if tags.get("natural") == "reef":
+        site_tags.append("Reef")
+    if tags.get("historic") == "wreck":
+        site_tags.append("Wreck")
+    if tags.get("natural") == "sinkhole":
+        site_tags.append("Cenote")
 
-def main():
-    if len(sys.argv) < 3:
-        print("Usage: osm_sites_to_json.py <raw_dir> <output_json>")
-        sys.exit(1)
+    for tag, label in DIVE_TYPE_TAGS:
+        if tags.get(tag) == "yes":
+            site_tags.append(label)
+
+    site["tags"] = site_tags
+    return site
+
+
+def coord_key(site):
+    return (round(site['latitude'], 5), round(site['longitude'], 5))
 
-    raw_dir = sys.argv[1].rstrip('/')
-    output_file = sys.argv[2]
 
-    all_sites = []
-    seen_coords = set()
+def parse_region_file(filepath, created_at):
+    """Worker: parse one dump, keeping the first site at each coordinate.
+
+    Returns (sites, error); a file that fails to parse contributes no sites.
+    """
+    try:
+        sites = parse_osm_json(filepath, created_at)
+    except (OSError, ValueError) as e:
+        return [], f"Error loading {filepath}: {e}"
+
+    unique = {}
+    for site in sites:
+        unique.setdefault(coord_key(site), site)
+    return list(unique.values()), None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert Overpass dive site dumps to UmiLog seed format")
+    parser.add_argument("raw_dir", help="Directory containing sites_*.json Overpass dumps")
+    parser.add_argument("output_json")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1,
+        help="Dumps parsed in parallel; 1 parses in-process (default: %(default)s)"
+    )
+    args = parser.parse_args()
+
+    raw_dir = args.raw_dir.rstrip('/')
+    output_file = args.output_json
 
     # Find all sites_*.json files in raw_dir
-    for filename in os.listdir(raw_dir):
-        if filename.startswith('sites_') and filename.endswith('.json'):
-            filepath = os.path.join(raw_dir, filename)
-            print(f"Processing {filename}...")
-
-            sites = parse_osm_json(filepath)
-            print(f"  Found {len(sites)} elements")
-
-            # Deduplicate by coordinates
-            for site in sites:
-                coord_key = (round(site['latitude'], 5), round(site['longitude'], 5))
-                if coord_key not in seen_coords:
-                    seen_coords.add(coord_key)
-                    all_sites.append(site)
+    filenames = sorted(
+        name for name in os.listdir(raw_dir)
+        if name.startswith('sites_') and name.endswith('.json')
+    )
+    created_at = datetime.utcnow().isoformat(timespec='seconds') + 'Z'
+
+    # coord -> (file index, position in file, site); the lowest file index wins
+    by_coord = {}
+
+    def merge(index, sites, error):
+        print(f"Processed {filenames[index]}: {len(sites)} elements")
+        if error:
+            print(f"  {error}")
+
+        # Deduplicate by coordinates
+        for position, site in enumerate(sites):
+            key = coord_key(site)
+            kept = by_coord.get(key)
+            if kept is None or index < kept[0]:
+                by_coord[key] = (index, position, site)
+
+    if args.workers <= 1:
+        # In-process: skips pickling every site back from a worker
+        for index, name in enumerate(filenames):
+            merge(index, *parse_region_file(os.path.join(raw_dir, name), created_at))
+    else:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            futures = {
+                executor.submit(parse_region_file, os.path.join(raw_dir, name), created_at): index
+                for index, name in enumerate(filenames)
+            }
+            for future in as_completed(futures):
+                merge(futures[future], *future.result())
+
+    # Restore file order so ties in the sort below are stable across runs
+    all_sites = [site for _, _, site in sorted(by_coord.values(), key=lambda item: item[:2])]
 
     # Sort by region, then name
     all_sites.sort(key=lambda s: (s['region'], s['name']))
@@ -5,7 +5,14 @@ Generate region descriptions and taglines.
 Creates compelling descriptions for dive regions to inspire travel.
 
 Usage:
-    python3 region_descriptions.py <regions_json> <sites_json> <species_json> <output_json>
+    python3 region_descriptions.py [--live] [--fake] [--concurrency N] [--rpm N] [--tpm N]
+        [--batch-size N] [--no-cache] <regions_json> <sites_json> <species_json> <output_json>
+
+Requests go through the shared engine in llm_engine.py (concurrent requests,
+request and token rate limits, backoff on 429s); --fake uses the offline
+fake model and writes <output>.fake.json, and --batch-size N describes N regions per request. Regions
+whose prompt is unchanged are served from the prompt-hash cache
+(llm_cache.py) unless --no-cache is given.
 
 Example:
     python3 data/scripts/region_descriptions.py Resources/SeedData/regions.json data/export/sites_validated.json data/export/species_catalog_full.json data/export/regions_enriched.json
@@ -20,30 +27,17 @@ Output:
 import json
 import os
 import sys
-import time
 from pathlib import Path
 from datetime import datetime
 from collections import defaultdict
 
-# Lazy import for google-genai
-_genai = None
-
-
-def get_genai():
-    """Lazy import google.genai."""
-    global _genai
-    if _genai is None:
-        try:
-            from google import genai
-            _genai = genai
-        except ImportError:
-            raise ImportError(
-                "google-genai is required. Install with: pip install google-genai"
-            )
-    return _genai
-
+from llm_engine import engine_from_args, fake_path
 
 MODEL = "gemini-2.0-flash"
+REQUESTS_PER_MINUTE = 15
+TOKENS_PER_MINUTE = 1_000_000
+REQUIRED_FIELDS = ("tagline", "description")
+GENERATION_CONFIG = {"temperature": 0.5, "max_output_tokens": 512}
 
 SYSTEM_PROMPT = """You are a dive travel expert creating inspiring descriptions for dive regions.
 
@@ -63,6 +57,8 @@ Output as JSON:
 
 Be factual and inspiring without using superlatives like "best" or "incredible"."""
 
+ACKNOWLEDGEMENT = "I'll create inspiring descriptions for dive regions. Please share the region details."
+
 
 def aggregate_region_stats(regions: list, sites: list, species: list) -> dict:
     """Aggregate statistics per region."""
@@ -138,75 +134,38 @@ def build_prompt(region: dict, stats: dict) -> str:
     return "\n".join(parts)
 
 
-def generate_description(client, region: dict, stats: dict) -> dict:
-    """Generate region description using Gemini."""
-    prompt = build_prompt(region, stats)
-
-    try:
-        response = client.models.generate_content(
-            model=MODEL,
-            contents=[
-                {"role": "user", "parts": [{"text": SYSTEM_PROMPT}]},
-                {"role": "model", "parts": [{"text": "I'll create inspiring descriptions for dive regions. Please share the region details."}]},
-                {"role": "user", "parts": [{"text": prompt}]}
-            ],
-            config={
-                "temperature": 0.5,
-                "max_output_tokens": 512
-            }
-        )
-
-        text = response.text.strip()
-
-        # Handle markdown code blocks
-        if "```json" in text:
-            text = text.split("```json")[1].split("```")[0].strip()
-        elif "```" in text:
-            text = text.split("```")[1].split("```")[0].strip()
-
-        return json.loads(text)
-
-    except Exception as e:
-        print(f"    Error: {e}")
-        return {}
-
-
 def main():
     # Cost guardrail: require --live flag or check env var
     if os.environ.get("DISABLE_LLM_CALLS", "").lower() in ("true", "1", "yes"):
         print("Error: LLM calls disabled (DISABLE_LLM_CALLS=true). Use --live flag to override.")
         sys.exit(1)
-    if "--live" not in sys.argv:
+    if "--live" not in sys.argv and "--fake" not in sys.argv:
         print("Warning: This script makes paid Gemini API calls.")
         print("Pass --live to confirm, or set DISABLE_LLM_CALLS=true to block.")
     # Remove --live from argv for normal arg parsing
     args = [a for a in sys.argv[1:] if a != "--live"]
+    engine = engine_from_args(args, MODEL, REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE,
+                              fake_sample={"tagline": "placeholder", "highlights": []})
     if len(args) != 4:
-        print("Usage: region_descriptions.py [--live] <regions_json> <sites_json> <species_json> <output_json>")
+        print("Usage: region_descriptions.py [--live] [--fake] [--concurrency N] [--rpm N] [--tpm N] "
+              "[--batch-size N] [--no-cache] <regions_json> <sites_json> <species_json> <output_json>")
         sys.exit(1)
 
     regions_path = Path(args[0])
     sites_path = Path(args[1])
     species_path = Path(args[2])
     output_path = Path(args[3])
+    if engine.fake:
+        output_path = fake_path(output_path)
+        print(f"Fake model: writing to {output_path}")
 
     for path in [regions_path, sites_path, species_path]:
         if not path.exists():
             print(f"Error: File not found: {path}")
             sys.exit(1)
 
-    # Check API key
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        print("Error: GEMINI_API_KEY environment variable not set")
-        sys.exit(1)
-
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # Initialize Gemini
-    genai = get_genai()
-    client = genai.Client(api_key=api_key)
-
     # Load data
     print("Loading data...")
     with open(regions_path, "r", encoding="utf-8") as f:
@@ -228,20 +187,27 @@ def main():
 
     # Process regions
     print("\nGenerating descriptions...")
-    enriched_regions = []
+    generated_by_index = {}
+
+    def on_result(index, generated, error):
+        name = regions[int(index)].get("name", "Unknown")
+        if error is not None:
+            print(f"    Error ({name}): {error}")
+        generated_by_index[int(index)] = generated or {}
+        status = f"Tagline: {generated.get('tagline', '')}" if generated else "Failed to generate"
+        print(f"[{len(generated_by_index)}/{len(regions)}] {name}: {status}")
+
+    engine.run_items(
+        ((i, build_prompt(region, stats)) for i, region in enumerate(regions)),
+        SYSTEM_PROMPT, ACKNOWLEDGEMENT, GENERATION_CONFIG, on_result, REQUIRED_FIELDS,
+    )
+    print(f"\nEngine: {engine.summary()}")
 
+    enriched_regions = []
     for i, region in enumerate(regions):
-        name = region.get("name", "Unknown")
         region_id = region.get("id", "")
-
-        print(f"\n[{i+1}/{len(regions)}] {name}")
-
-        # Get stats
         region_stats = stats.get(region_id, stats.get(region_id.lower().replace(" ", "-"), {}))
-        print(f"    Sites: {region_stats.get('site_count', 0)}, Species: {region_stats.get('species_count', 0)}")
-
-        # Generate description
-        generated = generate_description(client, region, stats)
+        generated = generated_by_index.get(i)
 
         if generated:
             enriched = {
@@ -254,17 +220,14 @@ def main():
                 "site_count": region_stats.get("site_count", 0),
                 "species_count": region_stats.get("species_count", 0)
             }
-            print(f"    Tagline: {enriched['tagline']}")
         else:
             enriched = {
                 **region,
                 "site_count": region_stats.get("site_count", 0),
                 "species_count": region_stats.get("species_count", 0)
             }
-            print("    Failed to generate")
 
         enriched_regions.append(enriched)
-        time.sleep(4)  # Conservative rate limit for small batch
 
     # Write output
     output = {
@@ -5,7 +5,22 @@ Generate enticing dive site descriptions using LLM.
 Refines raw search results into compelling descriptions for users.
 
 Usage:
-    python3 site_descriptions_llm.py <raw_search_json> <sites_json> <output_json>
+    python3 site_descriptions_llm.py [--live] [--fake] [--concurrency N] [--rpm N] [--tpm N]
+        [--batch-size N] [--no-cache] [--regenerate] <raw_search_json> <sites_json> <output_json>
+
+Every site is processed in one run through the shared engine in
+llm_engine.py (concurrent requests, request and token rate limits, backoff on
+429s). Sites are described ITEMS_PER_REQUEST at a time in one batched prompt;
+--batch-size 1 sends one request per site. --fake swaps in the offline fake
+model to test throughput; it writes <output>.fake.json and its own
+checkpoint, so placeholders never reach the real output.
+
+Results are cached by a hash of (model, system prompt, rendered prompt) in
+llm_cache.py's store: a rerun only sends sites whose prompt inputs changed
+(or that failed before). The checkpoint keeps each description's prompt
+hash, so unchanged sites are skipped even once the cache has evicted them,
+and a failed regeneration keeps the earlier description. --no-cache only
+bypasses the cache; --regenerate sends every site again.
 
 Example:
     python3 data/scripts/site_descriptions_llm.py data/raw/site_descriptions_raw.json data/export/sites_validated.json data/export/sites_enriched.json
@@ -20,34 +35,19 @@ Output:
 import json
 import os
 import sys
-import time
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
-
-# Lazy import for google-genai
-_genai = None
-
-
-def get_genai():
-    """Lazy import google.genai."""
-    global _genai
-    if _genai is None:
-        try:
-            from google import genai
-            _genai = genai
-        except ImportError:
-            raise ImportError(
-                "google-genai is required. Install with: pip install google-genai"
-            )
-    return _genai
 
+from checkpoint_store import CheckpointStore
+from llm_engine import engine_from_args, fake_path, is_placeholder, pop_flag
 
 # Configuration
 MODEL = "gemini-2.0-flash"
 REQUESTS_PER_MINUTE = 15
-CHECKPOINT_INTERVAL = 50
-BATCH_SIZE = 500
+TOKENS_PER_MINUTE = 1_000_000
+ITEMS_PER_REQUEST = 16
+REQUIRED_FIELDS = ("description",)
+GENERATION_CONFIG = {"temperature": 0.4, "max_output_tokens": 512}
 
 SYSTEM_PROMPT = """You are a dive travel writer creating enticing descriptions for dive sites.
 
@@ -66,19 +66,7 @@ Output as JSON:
 
 Be concise and accurate. If limited information, focus on the site type and location."""
 
-
-def load_checkpoint(checkpoint_path: Path) -> dict:
-    """Load processing checkpoint."""
-    if checkpoint_path.exists():
-        with open(checkpoint_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {"processed_ids": [], "results": {}}
-
-
-def save_checkpoint(checkpoint_path: Path, data: dict):
-    """Save processing checkpoint."""
-    with open(checkpoint_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+ACKNOWLEDGEMENT = "I'll create compelling dive site descriptions based on the provided information. Please share the site details."
 
 
 def build_prompt(site: dict, search_data: dict) -> str:
@@ -126,58 +114,33 @@ def build_prompt(site: dict, search_data: dict) -> str:
     return "\n".join(parts)
 
 
-def generate_description(client, site: dict, search_data: dict) -> Optional[dict]:
-    """Generate site description using Gemini."""
-    prompt = build_prompt(site, search_data)
-
-    try:
-        response = client.models.generate_content(
-            model=MODEL,
-            contents=[
-                {"role": "user", "parts": [{"text": SYSTEM_PROMPT}]},
-                {"role": "model", "parts": [{"text": "I'll create compelling dive site descriptions based on the provided information. Please share the site details."}]},
-                {"role": "user", "parts": [{"text": prompt}]}
-            ],
-            config={
-                "temperature": 0.4,
-                "max_output_tokens": 512
-            }
-        )
-
-        text = response.text.strip()
-
-        # Handle markdown code blocks
-        if "```json" in text:
-            text = text.split("```json")[1].split("```")[0].strip()
-        elif "```" in text:
-            text = text.split("```")[1].split("```")[0].strip()
-
-        return json.loads(text)
-
-    except json.JSONDecodeError:
-        return None
-    except Exception as e:
-        print(f"    API error: {e}")
-        return None
-
-
 def main():
     # Cost guardrail: require --live flag or check env var
     if os.environ.get("DISABLE_LLM_CALLS", "").lower() in ("true", "1", "yes"):
         print("Error: LLM calls disabled (DISABLE_LLM_CALLS=true). Use --live flag to override.")
         sys.exit(1)
-    if "--live" not in sys.argv:
+    if "--live" not in sys.argv and "--fake" not in sys.argv:
         print("Warning: This script makes paid Gemini API calls.")
         print("Pass --live to confirm, or set DISABLE_LLM_CALLS=true to block.")
     # Remove --live from argv for normal arg parsing
     args = [a for a in sys.argv[1:] if a != "--live"]
+    regenerate = pop_flag(args, "--regenerate")
+    engine = engine_from_args(args, MODEL, REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE, ITEMS_PER_REQUEST)
     if len(args) != 3:
-        print("Usage: site_descriptions_llm.py [--live] <raw_search_json> <sites_json> <output_json>")
+        print("Usage: site_descriptions_llm.py [--live] [--fake] [--concurrency N] [--rpm N] [--tpm N] "
+              "[--batch-size N] [--no-cache] [--regenerate] <raw_search_json> <sites_json> <output_json>")
         sys.exit(1)
 
+    if regenerate:
+        # Send everything again: no checkpoint skips and no cached answers
+        engine.cache = None
+
     search_path = Path(args[0])
     sites_path = Path(args[1])
     output_path = Path(args[2])
+    if engine.fake:
+        output_path = fake_path(output_path)
+        print(f"Fake model: writing to {output_path}")
 
     if not search_path.exists():
         print(f"Error: Search results not found: {search_path}")
@@ -186,18 +149,8 @@ def main():
         print(f"Error: Sites file not found: {sites_path}")
         sys.exit(1)
 
-    # Check API key
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        print("Error: GEMINI_API_KEY environment variable not set")
-        sys.exit(1)
-
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # Initialize Gemini
-    genai = get_genai()
-    client = genai.Client(api_key=api_key)
-
     # Load data
     print(f"Loading search results from {search_path}...")
     with open(search_path, "r", encoding="utf-8") as f:
@@ -217,22 +170,23 @@ def main():
     search_results = search_data.get("sites", {})
     print(f"Search results: {len(search_results)}, Sites: {len(sites_by_id)}")
 
-    # Load checkpoint
-    checkpoint_path = output_path.parent / ".checkpoint_site_llm.json"
-    checkpoint = load_checkpoint(checkpoint_path)
-    processed_ids = set(checkpoint.get("processed_ids", []))
-    results = checkpoint.get("results", {})
+    # Load checkpoint (one journal line per finished site)
+    checkpoint_path = output_path.parent / ".checkpoint_site_llm.jsonl"
+    legacy_path = output_path.parent / ".checkpoint_site_llm.json"
+    if engine.fake:
+        checkpoint_path, legacy_path = fake_path(checkpoint_path), fake_path(legacy_path)
+    checkpoint = CheckpointStore(checkpoint_path, legacy_path=legacy_path)
+    results = checkpoint.results
 
-    print(f"Resuming: {len(processed_ids)} already processed")
+    def described(previous):
+        # Placeholders left in the real checkpoint by older --fake runs don't count
+        return bool(previous and previous.get("enriched") and (engine.fake or not is_placeholder(previous)))
 
-    # Rate limit delay
-    delay = 60.0 / REQUESTS_PER_MINUTE
+    print(f"Checkpoint: {len(checkpoint)} sites from earlier runs")
 
     # Process sites with search results
     sites_to_process = []
     for site_id, search_info in search_results.items():
-        if site_id in processed_ids:
-            continue
         if search_info.get("skipped"):
             continue
         if not search_info.get("search_results"):
@@ -242,14 +196,28 @@ def main():
     print(f"Sites to process: {len(sites_to_process)}")
 
     stats = {"success": 0, "failed": 0, "skipped": 0}
-
-    for i, (site_id, search_info) in enumerate(sites_to_process[:BATCH_SIZE]):
+    names = {}
+    prompt_keys = {}
+    jobs = []
+    for site_id, search_info in sites_to_process:
         site = sites_by_id.get(site_id, {})
-        name = site.get("name", search_info.get("name", "Unknown"))
+        names[site_id] = site.get("name", search_info.get("name", "Unknown"))
+        prompt = build_prompt(site, search_info)
+        prompt_keys[site_id] = engine.item_key(SYSTEM_PROMPT, ACKNOWLEDGEMENT, prompt)
+        previous = results.get(site_id)
+        # Entries journaled before prompt keys existed have none, so they
+        # are regenerated like any changed site
+        if not regenerate and described(previous) and previous.get("prompt_key") == prompt_keys[site_id]:
+            stats["skipped"] += 1
+            continue
+        jobs.append((site_id, prompt))
 
-        print(f"\n[{i+1}/{min(len(sites_to_process), BATCH_SIZE)}] {name[:40]}...")
+    print(f"Unchanged since last run: {stats['skipped']}, to generate: {len(jobs)}")
 
-        generated = generate_description(client, site, search_info)
+    def on_result(site_id, generated, error):
+        site = sites_by_id.get(site_id, {})
+        if error is not None:
+            print(f"    Error ({names[site_id][:40]}): {error}")
 
         if generated:
             # Merge with original site data
@@ -258,43 +226,41 @@ def main():
             enriched_site["highlights"] = generated.get("highlights", [])
             enriched_site["best_for"] = generated.get("best_for", "")
             enriched_site["enriched"] = True
+            enriched_site["prompt_key"] = prompt_keys[site_id]
 
-            results[site_id] = enriched_site
+            checkpoint.record(site_id, enriched_site)
             stats["success"] += 1
-            print(f"    OK: {generated.get('description', '')[:60]}...")
+            print(f"[{stats['success'] + stats['failed']}/{len(jobs)}] {names[site_id][:40]}: "
+                  f"{generated.get('description', '')[:60]}...")
         else:
-            # Keep original
-            results[site_id] = {**site, "enriched": False}
+            # Keep an earlier description rather than overwrite it with the original
+            keep = described(results.get(site_id))
+            if not keep:
+                checkpoint.record(site_id, {**site, "enriched": False})
             stats["failed"] += 1
-            print("    Failed")
-
-        processed_ids.add(site_id)
-        time.sleep(delay)
+            print(f"[{stats['success'] + stats['failed']}/{len(jobs)}] {names[site_id][:40]}: failed"
+                  + (" (keeping earlier description)" if keep else ""))
 
-        # Checkpoint
-        if (i + 1) % CHECKPOINT_INTERVAL == 0:
-            checkpoint["processed_ids"] = list(processed_ids)
-            checkpoint["results"] = results
-            save_checkpoint(checkpoint_path, checkpoint)
-            print(f"\n--- Checkpoint: {len(processed_ids)} ---")
-
-    # Final save
-    checkpoint["processed_ids"] = list(processed_ids)
-    checkpoint["results"] = results
-    save_checkpoint(checkpoint_path, checkpoint)
+    try:
+        engine.run_items(jobs, SYSTEM_PROMPT, ACKNOWLEDGEMENT, GENERATION_CONFIG, on_result, REQUIRED_FIELDS)
+    finally:
+        # Compact the journal to one line per site
+        checkpoint.compact()
+        checkpoint.close()
+        print(f"\nEngine: {engine.summary()}")
 
     # Merge all sites (enriched + originals)
     final_sites = []
     for site_id, site in sites_by_id.items():
         if site_id in results:
-            final_sites.append(results[site_id])
+            final_sites.append({k: v for k, v in results[site_id].items() if k != "prompt_key"})
         else:
             final_sites.append(site)
 
     output = {
         "generated_at": datetime.utcnow().isoformat() + "Z",
         "total_sites": len(final_sites),
-        "enriched_count": stats["success"],
+        "enriched_count": sum(1 for site in final_sites if site.get("enriched")),
         "sites": final_sites
     }
 
@@ -306,9 +272,8 @@ def main():
     print("=" * 50)
     print(f"Success:  {stats['success']}")
     print(f"Failed:   {stats['failed']}")
+    print(f"Skipped:  {stats['skipped']}")
     print(f"Output:   {output_path}")
-    print()
-    print(f"Note: Process in batches of {BATCH_SIZE}. Run again to continue.")
 
 
 if __name__ == "__main__":
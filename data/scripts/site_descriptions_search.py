@@ -17,45 +17,29 @@ Output:
 
 import sys
 import json
-import time
-import urllib.parse
-import urllib.request
 from pathlib import Path
 from datetime import datetime
 from typing import Optional
 
+from checkpoint_store import CheckpointStore
+from http_cache import cached_get_json
+
 # API endpoints
 WIKIPEDIA_API = "https://en.wikipedia.org/w/api.php"
 DUCKDUCKGO_API = "https://api.duckduckgo.com/"
 
 # Rate limits
 REQUEST_DELAY = 1.0  # Be respectful to free APIs
-CHECKPOINT_INTERVAL = 100
 BATCH_SIZE = 500  # Process in batches
 
 USER_AGENT = "UmiLogBot/1.0 (dive logging app; site description enrichment)"
 
 
-def load_checkpoint(checkpoint_path: Path) -> dict:
-    """Load processing checkpoint."""
-    if checkpoint_path.exists():
-        with open(checkpoint_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {"processed_ids": [], "results": {}}
-
-
-def save_checkpoint(checkpoint_path: Path, data: dict):
-    """Save processing checkpoint."""
-    with open(checkpoint_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-
-
-def api_get(url: str, timeout: int = 30) -> Optional[dict]:
-    """Make GET request and return JSON."""
+def api_get(url: str, params: Optional[dict] = None, timeout: int = 30) -> Optional[dict]:
+    """Make GET request through the shared HTTP cache and return JSON."""
     try:
-        req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
-        with urllib.request.urlopen(req, timeout=timeout) as response:
-            return json.loads(response.read().decode("utf-8"))
+        return cached_get_json(url, params, headers={"User-Agent": USER_AGENT}, timeout=timeout,
+                               delay=REQUEST_DELAY * 0.5)
     except Exception:
         return None
 
@@ -76,8 +60,7 @@ def fetch_wikipedia(site_name: str, location: str = "") -> Optional[dict]:
             "format": "json",
             "srlimit": 3
         }
-        search_url = WIKIPEDIA_API + "?" + urllib.parse.urlencode(search_params)
-        search_data = api_get(search_url)
+        search_data = api_get(WIKIPEDIA_API, search_params)
 
         if not search_data or "query" not in search_data:
             continue
@@ -102,8 +85,7 @@ def fetch_wikipedia(site_name: str, location: str = "") -> Optional[dict]:
                 "explaintext": "true",
                 "format": "json"
             }
-            extract_url = WIKIPEDIA_API + "?" + urllib.parse.urlencode(extract_params)
-            extract_data = api_get(extract_url)
+            extract_data = api_get(WIKIPEDIA_API, extract_params)
 
             if extract_data and "query" in extract_data:
                 pages = extract_data["query"].get("pages", {})
@@ -137,8 +119,7 @@ def fetch_duckduckgo(site_name: str, region: str = "", country: str = "") -> Opt
         "no_html": "1",
         "skip_disambig": "1"
     }
-    url = DUCKDUCKGO_API + "?" + urllib.parse.urlencode(params)
-    data = api_get(url)
+    data = api_get(DUCKDUCKGO_API, params)
 
     if not data:
         return None
@@ -203,13 +184,11 @@ def process_site(site: dict) -> dict:
     wiki_result = fetch_wikipedia(name, country)
     if wiki_result:
         result["search_results"].append(wiki_result)
-    time.sleep(REQUEST_DELAY * 0.5)
 
     # Fetch DuckDuckGo
     ddg_result = fetch_duckduckgo(name, region, country)
     if ddg_result:
         result["search_results"].append(ddg_result)
-    time.sleep(REQUEST_DELAY * 0.5)
 
     return result
 
@@ -236,19 +215,18 @@ def main():
     sites = data.get("sites", [])
     print(f"Found {len(sites)} sites")
 
-    # Load checkpoint
-    checkpoint_path = output_path.parent / ".checkpoint_site_search.json"
-    checkpoint = load_checkpoint(checkpoint_path)
-    processed_ids = set(checkpoint.get("processed_ids", []))
-    results = checkpoint.get("results", {})
+    # Load checkpoint (one journal line per searched site)
+    checkpoint = CheckpointStore(output_path.parent / ".checkpoint_site_search.jsonl",
+                                 legacy_path=output_path.parent / ".checkpoint_site_search.json")
+    results = checkpoint.results
 
-    print(f"Resuming from checkpoint: {len(processed_ids)} already processed")
+    print(f"Resuming from checkpoint: {len(checkpoint)} already processed")
 
     # Filter sites needing processing
     sites_to_process = []
     for site in sites:
         site_id = site.get("id") or site.get("wikidataId")
-        if site_id and site_id not in processed_ids:
+        if site_id and site_id not in checkpoint:
             # Skip sites with good descriptions
             desc = site.get("description", "")
             if not desc or len(desc) < 100:
@@ -269,8 +247,7 @@ def main():
         print(f"  [{i+1}] {name[:40]}...", end=" ")
 
         result = process_site(site)
-        results[site_id] = result
-        processed_ids.add(site_id)
+        checkpoint.record(site_id, result)
 
         if result.get("skipped"):
             stats["skipped"] += 1
@@ -284,17 +261,9 @@ def main():
 
         stats["searched"] += 1
 
-        # Save checkpoint
-        if (i + 1) % CHECKPOINT_INTERVAL == 0:
-            checkpoint["processed_ids"] = list(processed_ids)
-            checkpoint["results"] = results
-            save_checkpoint(checkpoint_path, checkpoint)
-            print(f"\n--- Checkpoint saved: {len(processed_ids)} total ---")
-
-    # Final checkpoint
-    checkpoint["processed_ids"] = list(processed_ids)
-    checkpoint["results"] = results
-    save_checkpoint(checkpoint_path, checkpoint)
+    # Compact the journal to one line per site
+    checkpoint.compact()
+    checkpoint.close()
 
     # Write output
     output = {
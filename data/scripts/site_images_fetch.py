@@ -3,7 +3,7 @@
 Fetch dive site images from Wikimedia Commons and prepare for R2 upload.
 
 Usage:
-    python3 site_images_fetch.py <sites_json> <output_dir>
+    python3 site_images_fetch.py <sites_json> <output_dir> [--workers N] [--processes N]
 
 Example:
     python3 data/scripts/site_images_fetch.py data/export/sites_validated.json data/images
@@ -11,19 +11,31 @@ Example:
 Output:
     - Thumbnail images in output_dir/thumbs/{site_id}.webp (400x400)
     - site_media.json manifest with URLs, attribution, licensing
+
+Downloads run on a pool of --workers threads, rate-limited per host
+(HOST_RATE requests/second each). Each downloaded image is handed to a
+pool of --processes worker processes for the Pillow resize and SHA-256
+without waiting for it, so every process can be busy while downloads keep
+flowing; the thumbnail is written when its resize finishes. At most
+THUMB_BACKLOG images per process wait to be resized, which bounds memory
+when downloads outpace resizing. Records are written to the manifest in
+input order, as a serial run would.
 """
 
 import sys
 import json
 import os
-import time
 import hashlib
+import argparse
+import threading
 import urllib.parse
 import urllib.request
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 
+from http_utils import TokenBucket
+
 # Image processing - optional PIL for resize
 try:
     from PIL import Image
@@ -36,10 +48,23 @@ except ImportError:
 # Constants
 THUMB_SIZE = 400  # 400x400 pixels
 MAX_DOWNLOAD_SIZE = 10 * 1024 * 1024  # 10MB max download
-REQUEST_DELAY = 0.5  # seconds between requests (be respectful to Wikimedia)
+HOST_RATE = 2.0  # requests/second per host (be respectful to Wikimedia)
 MAX_WORKERS = 4  # parallel downloads
+THUMB_BACKLOG = 4  # downloaded images queued for resize, per process
 USER_AGENT = "UmiLogBot/1.0 (https://github.com/yourusername/umilog; dive site image fetcher)"
 
+_host_limiters = {}
+_host_limiters_lock = threading.Lock()
+
+
+def host_limiter(url: str) -> TokenBucket:
+    """Shared rate limiter for the host of `url`."""
+    host = urllib.parse.urlsplit(url).netloc
+    with _host_limiters_lock:
+        if host not in _host_limiters:
+            _host_limiters[host] = TokenBucket(HOST_RATE)
+        return _host_limiters[host]
+
 
 def get_commons_thumb_url(file_url: str, width: int = 800) -> str:
     """
@@ -115,10 +140,49 @@ def resize_to_thumb(image_data: bytes, size: int = THUMB_SIZE) -> bytes | None:
         return None
 
 
-def process_site(site: dict, output_dir: Path) -> dict | None:
+def make_thumb(image_data: bytes) -> tuple[bytes, str] | None:
+    """Resize to a thumbnail and hash it. Runs in the worker process pool."""
+    thumb_data = resize_to_thumb(image_data)
+    if not thumb_data:
+        return None
+    return thumb_data, hashlib.sha256(thumb_data).hexdigest()
+
+
+def save_thumb(site_id: str, image_url: str, thumb_path: Path, output_dir: Path,
+               thumb: tuple[bytes, str] | None) -> dict | None:
+    """Write a finished thumbnail and return its media record (None if resizing failed)."""
+    if not thumb:
+        return None
+    thumb_data, sha256 = thumb
+
+    thumb_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(thumb_path, "wb") as f:
+        f.write(thumb_data)
+
+    return {
+        "site_id": site_id,
+        "thumb_path": str(thumb_path.relative_to(output_dir)),
+        "width": THUMB_SIZE,
+        "height": THUMB_SIZE,
+        "license": "CC-BY-SA-4.0",
+        "attribution": "Wikimedia Commons",
+        "source_url": image_url,
+        "sha256": sha256,
+        "cached": False
+    }
+
+
+def process_site(site: dict, output_dir: Path, thumb_pool: ProcessPoolExecutor | None = None,
+                 backlog: threading.Semaphore | None = None) -> dict | Future | None:
     """
     Process a single site: download image, resize, save.
     Returns media record or None if failed.
+
+    Called from download threads. Without `thumb_pool` the resize and hash
+    run in the calling thread. With it they are submitted to the pool and a
+    Future of the record is returned straight away; the thumbnail is saved
+    by a callback when the resize finishes. `backlog` caps the images
+    waiting in the pool.
     """
     site_id = site.get("id") or site.get("wikidataId")
     image_url = site.get("imageUrl")
@@ -154,44 +218,44 @@ def process_site(site: dict, output_dir: Path) -> dict | None:
     thumb_url = get_commons_thumb_url(image_url, width=800)
 
     # Download
+    host_limiter(thumb_url).acquire()
     image_data = download_image(thumb_url)
     if not image_data:
         return None
 
-    # Resize to square thumbnail
-    thumb_data = resize_to_thumb(image_data)
-    if not thumb_data:
-        return None
+    # Resize to square thumbnail and hash it
+    if thumb_pool is None:
+        return save_thumb(site_id, image_url, thumb_path, output_dir, make_thumb(image_data))
 
-    # Save
-    thumb_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(thumb_path, "wb") as f:
-        f.write(thumb_data)
+    if backlog is not None:
+        backlog.acquire()
+    record = Future()
 
-    # Compute hash
-    sha256 = hashlib.sha256(thumb_data).hexdigest()
+    def on_thumb(thumb_future):
+        if backlog is not None:
+            backlog.release()
+        try:
+            record.set_result(save_thumb(site_id, image_url, thumb_path, output_dir, thumb_future.result()))
+        except Exception as e:
+            record.set_exception(e)
 
-    return {
-        "site_id": site_id,
-        "thumb_path": str(thumb_path.relative_to(output_dir)),
-        "width": THUMB_SIZE,
-        "height": THUMB_SIZE,
-        "license": "CC-BY-SA-4.0",
-        "attribution": "Wikimedia Commons",
-        "source_url": image_url,
-        "sha256": sha256,
-        "cached": False
-    }
+    thumb_pool.submit(make_thumb, image_data).add_done_callback(on_thumb)
+    return record
 
 
 def main():
-    if len(sys.argv) != 3:
-        print("Usage: site_images_fetch.py <sites_json> <output_dir>")
-        print("Example: python3 data/scripts/site_images_fetch.py data/export/sites_validated.json data/images")
-        sys.exit(1)
-
-    sites_path = Path(sys.argv[1])
-    output_dir = Path(sys.argv[2])
+    parser = argparse.ArgumentParser(description="Fetch dive site thumbnails from Wikimedia Commons")
+    parser.add_argument("sites_json", type=Path)
+    parser.add_argument("output_dir", type=Path)
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Parallel downloads (default: %(default)s)")
+    parser.add_argument(
+        "--processes", type=int, default=os.cpu_count() or 1,
+        help="Processes for resize/hash; 0 runs them in the download threads (default: %(default)s)"
+    )
+    args = parser.parse_args()
+
+    sites_path = args.sites_json
+    output_dir = args.output_dir
 
     if not sites_path.exists():
         print(f"Error: Sites file not found: {sites_path}")
@@ -216,22 +280,33 @@ def main():
     failed = 0
     cached = 0
 
-    for i, site in enumerate(sites_with_images):
-        record = process_site(site, output_dir)
-        if record:
-            media_records.append(record)
-            if record.get("cached"):
-                cached += 1
-        else:
-            failed += 1
-
-        # Progress
-        if (i + 1) % 50 == 0:
-            print(f"Progress: {i + 1}/{len(sites_with_images)} ({len(media_records)} success, {failed} failed, {cached} cached)")
-
-        # Rate limiting (skip for cached)
-        if record and not record.get("cached"):
-            time.sleep(REQUEST_DELAY)
+    thumb_pool = ProcessPoolExecutor(max_workers=args.processes) if args.processes > 0 else None
+    backlog = threading.Semaphore(args.processes * THUMB_BACKLOG) if thumb_pool is not None else None
+    outcomes = []
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            # map() yields in input order, so the manifest matches a serial run
+            fetched = executor.map(lambda site: process_site(site, output_dir, thumb_pool, backlog), sites_with_images)
+            for i, outcome in enumerate(fetched):
+                outcomes.append(outcome)
+
+                # Progress
+                if (i + 1) % 50 == 0:
+                    resizing = sum(1 for o in outcomes if isinstance(o, Future) and not o.done())
+                    print(f"Progress: {i + 1}/{len(sites_with_images)} fetched ({resizing} resizing)")
+
+        # Collect records (waiting for resizes still in flight), in input order
+        for outcome in outcomes:
+            record = outcome.result() if isinstance(outcome, Future) else outcome
+            if record:
+                media_records.append(record)
+                if record.get("cached"):
+                    cached += 1
+            else:
+                failed += 1
+    finally:
+        if thumb_pool is not None:
+            thumb_pool.shutdown()
 
     # Write manifest
     manifest = {
@@ -4,8 +4,23 @@ Link species to dive sites using GBIF and OBIS occurrence data.
 Creates site_species junction records with likelihood ratings.
 
 Usage: python3 site_species_linker.py <sites_json> <species_json> <output_json>
+           [--workers N] [--cache PATH | --no-cache] [--cluster-km KM]
 Example: python3 site_species_linker.py export/sites.json export/species.json export/site_species.json
 
+Sites are fetched concurrently over one keep-alive session. Each API has its
+own token-bucket rate limit, and throttled or failed requests are retried
+with backoff. Facet responses are cached on disk (data/stage by default),
+keyed by coordinate rounded to CACHE_COORD_DECIMALS and by radius. Reruns
+and sites that round to the same point reuse cached results.
+
+Nearby sites share one query: sites are grouped into coverage cells led by
+a site, and every member lies within --cluster-km of its leader (local
+distance check). One facet query is made per cell at the leader's
+coordinate, and its species are assigned to every member. The species
+list for a member is therefore centred at most cluster-km away from the
+site, compared with the 25 km search radius. --cluster-km 0 queries every
+site individually.
+
 APIs:
 - GBIF: https://api.gbif.org/v1/occurrence/search
 - OBIS: https://api.obis.org/v3/occurrence
@@ -13,24 +28,135 @@ APIs:
 
 import sys
 import json
-import time
-import requests
+import sqlite3
+import argparse
+import threading
 from datetime import datetime
 from collections import defaultdict
-from math import radians, sin, cos, sqrt, atan2
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from http_utils import TokenBucket, make_session
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+from geo_utils import SpatialGridIndex  # noqa: E402
 
 GBIF_API = "https://api.gbif.org/v1"
 OBIS_API = "https://api.obis.org/v3"
 SEARCH_RADIUS_KM = 25
 
+# Per-API request rates (requests/second)
+GBIF_RATE = 3.0
+OBIS_RATE = 0.9
+DEFAULT_WORKERS = 8
+
+# Max distance from a site to the leader of the cell whose query it shares
+CLUSTER_RADIUS_KM = 3.0
+
+# Queries are made at the rounded coordinate so cached results match the key (~1 km)
+CACHE_COORD_DECIMALS = 2
+DEFAULT_CACHE = Path(__file__).resolve().parents[1] / "stage" / "site_species_cache.sqlite"
+
+_session = None
+_session_lock = threading.Lock()
+_cache = None
+GBIF_LIMITER = TokenBucket(GBIF_RATE)
+OBIS_LIMITER = TokenBucket(OBIS_RATE)
+
+
+class FacetCache:
+    """SQLite store of species facet results keyed by (source, lat, lon, radius)."""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS facets (
+                    source TEXT NOT NULL,
+                    lat REAL NOT NULL,
+                    lon REAL NOT NULL,
+                    radius_km REAL NOT NULL,
+                    species_json TEXT NOT NULL,
+                    fetched_at TEXT NOT NULL,
+                    PRIMARY KEY (source, lat, lon, radius_km)
+                )
+            """)
+            self.conn.commit()
+
+    def get(self, source, lat, lon, radius_km):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT species_json FROM facets WHERE source = ? AND lat = ? AND lon = ? AND radius_km = ?",
+                (source, lat, lon, radius_km)
+            ).fetchone()
+        if row is None:
+            return None
+        return {int(key): value for key, value in json.loads(row[0]).items()}
+
+    def put(self, source, lat, lon, radius_km, species):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO facets VALUES (?, ?, ?, ?, ?, ?)",
+                (source, lat, lon, radius_km, json.dumps(species), datetime.utcnow().isoformat() + "Z")
+            )
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def get_session():
+    """Shared keep-alive session, created on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = make_session(pool_size=DEFAULT_WORKERS)
+        return _session
+
+
+def cached_fetch(source, lat, lon, radius_km, fetch):
+    """Look up (source, rounded point, radius) in the cache, else call fetch(lat, lon)."""
+    lat = round(lat, CACHE_COORD_DECIMALS)
+    lon = round(lon, CACHE_COORD_DECIMALS)
+    if _cache is not None:
+        cached = _cache.get(source, lat, lon, radius_km)
+        if cached is not None:
+            return cached
+    species = fetch(lat, lon)
+    # None means the request failed; don't cache it so a rerun tries again
+    if species is None:
+        return {}
+    if _cache is not None:
+        _cache.put(source, lat, lon, radius_km, species)
+    return species
+
+
+def cluster_sites(sites, radius_km=CLUSTER_RADIUS_KM):
+    """Group sites into query cells of radius `radius_km` around a leader site.
 
-def haversine_distance(lat1, lon1, lat2, lon2):
-    """Calculate distance between two points in km."""
-    R = 6371
-    dlat = radians(lat2 - lat1)
-    dlon = radians(lon2 - lon1)
-    a = sin(dlat/2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon/2)**2
-    return 2 * R * atan2(sqrt(a), sqrt(1-a))
+    Returns (cells, cell_of): cells is a list of (lat, lon) leader
+    coordinates and cell_of[i] is the cell index for sites[i]. Each site
+    joins the nearest existing leader within radius_km, else leads a new cell.
+    """
+    if radius_km <= 0:
+        return [(site['latitude'], site['longitude']) for site in sites], list(range(len(sites)))
+
+    grid = SpatialGridIndex(radius_km)
+    cells = []
+    cell_of = []
+    for site in sites:
+        lat, lon = site['latitude'], site['longitude']
+        leader = grid.nearest(lat, lon, max_km=radius_km)
+        if not leader:
+            grid.insert(len(cells), lat, lon, (lat, lon))
+            cell_of.append(len(cells))
+            cells.append((lat, lon))
+        else:
+            cell_of.append(leader[0][1])
+    return cells, cell_of
 
 
 def classify_likelihood(count):
@@ -45,71 +171,88 @@ def classify_likelihood(count):
 
 def fetch_gbif_species_near_site(lat, lon, radius_km=SEARCH_RADIUS_KM):
     """Fetch species occurrences near a coordinate from GBIF."""
-    url = f"{GBIF_API}/occurrence/search"
-    params = {
-        "geoDistance": f"{lat},{lon},{radius_km}km",
-        "limit": 0,
-        "facet": "speciesKey",
-        "facetLimit": 100,
-    }
+    def fetch(lat, lon):
+        url = f"{GBIF_API}/occurrence/search"
+        params = {
+            "geoDistance": f"{lat},{lon},{radius_km}km",
+            "limit": 0,
+            "facet": "speciesKey",
+            "facetLimit": 100,
+        }
 
-    try:
-        resp = requests.get(url, params=params, timeout=60)
-        time.sleep(0.35)
-
-        if not resp.ok:
-            return {}
-
-        data = resp.json()
-        facets = data.get("facets", [])
-
-        species = {}
-        for facet in facets:
-            if facet.get("field") == "SPECIES_KEY":
-                for count in facet.get("counts", []):
-                    gbif_key = int(count["name"])
-                    species[gbif_key] = {
-                        "gbif_key": gbif_key,
-                        "count": count["count"],
-                        "source": "gbif",
-                    }
-        return species
-    except Exception as e:
-        return {}
+        try:
+            GBIF_LIMITER.acquire()
+            resp = get_session().get(url, params=params, timeout=60)
+
+            if not resp.ok:
+                return None
+
+            data = resp.json()
+            facets = data.get("facets", [])
+
+            species = {}
+            for facet in facets:
+                if facet.get("field") == "SPECIES_KEY":
+                    for count in facet.get("counts", []):
+                        gbif_key = int(count["name"])
+                        species[gbif_key] = {
+                            "gbif_key": gbif_key,
+                            "count": count["count"],
+                            "source": "gbif",
+                        }
+            return species
+        except Exception as e:
+            return None
+
+    return cached_fetch("gbif", lat, lon, radius_km, fetch)
 
 
 def fetch_obis_species_near_site(lat, lon, radius_km=SEARCH_RADIUS_KM):
     """Fetch species occurrences near a coordinate from OBIS."""
-    url = f"{OBIS_API}/occurrence"
-    params = {
-        "geometry": f"POINT({lon} {lat})",
-        "distance": radius_km * 1000,  # meters
-        "size": 0,
-        "facets": "speciesid",
-    }
+    def fetch(lat, lon):
+        url = f"{OBIS_API}/occurrence"
+        params = {
+            "geometry": f"POINT({lon} {lat})",
+            "distance": radius_km * 1000,  # meters
+            "size": 0,
+            "facets": "speciesid",
+        }
 
-    try:
-        resp = requests.get(url, params=params, timeout=60)
-        time.sleep(1.1)  # OBIS rate limit
+        try:
+            OBIS_LIMITER.acquire()
+            resp = get_session().get(url, params=params, timeout=60)
 
-        if not resp.ok:
-            return {}
+            if not resp.ok:
+                return None
 
-        data = resp.json()
-        # OBIS response structure may vary
-        return {}  # Placeholder - OBIS API handling
-    except Exception as e:
-        return {}
+            data = resp.json()
+            # OBIS response structure may vary
+            return {}  # Placeholder - OBIS API handling
+        except Exception as e:
+            return None
 
+    return cached_fetch("obis", lat, lon, radius_km, fetch)
 
-def main():
-    if len(sys.argv) < 4:
-        print("Usage: site_species_linker.py <sites_json> <species_json> <output_json>")
-        sys.exit(1)
 
-    sites_file = sys.argv[1]
-    species_file = sys.argv[2]
-    output_file = sys.argv[3]
+def main():
+    global _cache, _session
+
+    parser = argparse.ArgumentParser(description="Link species to dive sites using GBIF occurrence facets")
+    parser.add_argument("sites_json")
+    parser.add_argument("species_json")
+    parser.add_argument("output_json")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent requests (default: %(default)s)")
+    parser.add_argument("--cache", type=Path, default=DEFAULT_CACHE, help="On-disk facet cache (default: %(default)s)")
+    parser.add_argument("--no-cache", action="store_true", help="Always query the APIs")
+    parser.add_argument(
+        "--cluster-km", type=float, default=CLUSTER_RADIUS_KM,
+        help="Share one query among sites within this distance of a cell leader; 0 disables (default: %(default)s)"
+    )
+    args = parser.parse_args()
+
+    sites_file = args.sites_json
+    species_file = args.species_json
+    output_file = args.output_json
 
     # Load sites
     with open(sites_file, 'r', encoding='utf-8') as f:
@@ -131,24 +274,33 @@ def main():
     print(f"Loaded {len(sites)} sites and {len(species_list)} species")
     print(f"GBIF-linked species: {len(gbif_to_species)}")
 
+    _session = make_session(pool_size=args.workers)
+    if not args.no_cache:
+        _cache = FacetCache(args.cache)
+
     # Process each site
+    valid_sites = [
+        site for site in sites
+        if site.get('id') and site.get('latitude') is not None and site.get('longitude') is not None
+    ]
+    cells, cell_of = cluster_sites(valid_sites, args.cluster_km)
+    print(f"Grouped {len(valid_sites)} sites into {len(cells)} query cells (radius {args.cluster_km} km)")
+
     site_species_links = []
     processed = 0
 
-    for site in sites:
-        site_id = site.get('id')
-        lat = site.get('latitude')
-        lon = site.get('longitude')
-
-        if not site_id or lat is None or lon is None:
-            continue
-
+    cell_species = []
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        # map() yields in cell order, so links come out in the same order as a serial run
+        for species_counts in executor.map(lambda cell: fetch_gbif_species_near_site(*cell), cells):
+            cell_species.append(species_counts)
+            if len(cell_species) % 100 == 0:
+                print(f"Progress: {len(cell_species)}/{len(cells)} cells")
+
+    for site, cell_index in zip(valid_sites, cell_of):
+        site_id = site['id']
+        species_counts = cell_species[cell_index]
         processed += 1
-        if processed % 100 == 0:
-            print(f"Progress: {processed}/{len(sites)} sites")
-
-        # Fetch nearby species
-        species_counts = fetch_gbif_species_near_site(lat, lon)
 
         # Create links for species in our catalog
         for gbif_key, data in species_counts.items():
@@ -168,6 +320,9 @@ def main():
             }
             site_species_links.append(link)
 
+    if _cache is not None:
+        _cache.close()
+
     # Deduplicate (keep highest count for same site-species pair)
     unique_links = {}
     for link in site_species_links:
@@ -183,6 +338,8 @@ def main():
         "metadata": {
             "source": "GBIF",
             "search_radius_km": SEARCH_RADIUS_KM,
+            "cluster_radius_km": args.cluster_km,
+            "queries": len(cells),
             "processed_at": datetime.utcnow().isoformat() + "Z",
             "sites_processed": processed,
             "links_created": len(final_links),
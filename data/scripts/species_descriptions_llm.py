@@ -6,7 +6,19 @@ Uses Gemini API to synthesize visual descriptions from aggregated data,
 optimized for accurate image generation prompts.
 
 Usage:
-    python3 species_descriptions_llm.py <visual_data_json> <output_json>
+    python3 species_descriptions_llm.py [--live] [--fake] [--concurrency N] [--rpm N] [--tpm N]
+        [--batch-size N] [--no-cache] [--regenerate] <visual_data_json> <output_json>
+
+Requests go through the shared engine in llm_engine.py (concurrent requests,
+request and token rate limits, backoff on 429s). Species are described
+ITEMS_PER_REQUEST at a time in one batched prompt (--batch-size 1 for one
+request each); --fake uses the offline fake model and writes
+<output>.fake.json and its own checkpoint. Results are cached by
+prompt hash (llm_cache.py), so a rerun only sends species whose data
+changed. The checkpoint keeps each description's prompt hash, so unchanged
+species are skipped even once the cache has evicted them, and a failed
+regeneration keeps the earlier description. --no-cache only bypasses the
+cache; --regenerate sends every species again.
 
 Example:
     python3 data/scripts/species_descriptions_llm.py data/export/species_visual_data.json data/export/species_descriptions_enhanced.json
@@ -21,33 +33,19 @@ Output:
 import json
 import os
 import sys
-import time
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
-
-# Lazy import for google-genai
-_genai = None
-
-
-def get_genai():
-    """Lazy import google.genai."""
-    global _genai
-    if _genai is None:
-        try:
-            from google import genai
-            _genai = genai
-        except ImportError:
-            raise ImportError(
-                "google-genai is required. Install with: pip install google-genai"
-            )
-    return _genai
 
+from checkpoint_store import CheckpointStore
+from llm_engine import engine_from_args, fake_path, is_placeholder, pop_flag
 
 # Configuration
 MODEL = "gemini-2.0-flash"  # Fast, cheap text model
 REQUESTS_PER_MINUTE = 15
-CHECKPOINT_INTERVAL = 20
+TOKENS_PER_MINUTE = 1_000_000
+ITEMS_PER_REQUEST = 8
+REQUIRED_FIELDS = ("colors", "body_shape", "prompt_additions")
+GENERATION_CONFIG = {"temperature": 0.3, "max_output_tokens": 1024}
 
 SYSTEM_PROMPT = """You are a marine biology expert helping create accurate visual descriptions for AI image generation.
 
@@ -76,19 +74,7 @@ Output as JSON with this structure:
 
 Be specific and accurate. If information is uncertain, use reasonable defaults based on the species family/category."""
 
-
-def load_checkpoint(checkpoint_path: Path) -> dict:
-    """Load processing checkpoint."""
-    if checkpoint_path.exists():
-        with open(checkpoint_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {"processed_ids": [], "results": {}}
-
-
-def save_checkpoint(checkpoint_path: Path, data: dict):
-    """Save processing checkpoint."""
-    with open(checkpoint_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+ACKNOWLEDGEMENT = "I understand. I'll generate structured visual descriptions for marine species based on the scientific data provided. Please share the species data."
 
 
 def build_prompt(species_data: dict) -> str:
@@ -144,76 +130,42 @@ def build_prompt(species_data: dict) -> str:
     return "\n".join(parts)
 
 
-def generate_description(client, species_data: dict) -> Optional[dict]:
-    """Generate visual description using Gemini."""
-    prompt = build_prompt(species_data)
-
-    try:
-        response = client.models.generate_content(
-            model=MODEL,
-            contents=[
-                {"role": "user", "parts": [{"text": SYSTEM_PROMPT}]},
-                {"role": "model", "parts": [{"text": "I understand. I'll generate structured visual descriptions for marine species based on the scientific data provided. Please share the species data."}]},
-                {"role": "user", "parts": [{"text": prompt}]}
-            ],
-            config={
-                "temperature": 0.3,
-                "max_output_tokens": 1024
-            }
-        )
-
-        # Extract JSON from response
-        text = response.text.strip()
-
-        # Handle markdown code blocks
-        if "```json" in text:
-            text = text.split("```json")[1].split("```")[0].strip()
-        elif "```" in text:
-            text = text.split("```")[1].split("```")[0].strip()
-
-        return json.loads(text)
-
-    except json.JSONDecodeError as e:
-        print(f"    JSON parse error: {e}")
-        return None
-    except Exception as e:
-        print(f"    API error: {e}")
-        return None
-
-
 def main():
     # Cost guardrail: require --live flag or check env var
     if os.environ.get("DISABLE_LLM_CALLS", "").lower() in ("true", "1", "yes"):
         print("Error: LLM calls disabled (DISABLE_LLM_CALLS=true). Use --live flag to override.")
         sys.exit(1)
-    if "--live" not in sys.argv:
+    if "--live" not in sys.argv and "--fake" not in sys.argv:
         print("Warning: This script makes paid Gemini API calls.")
         print("Pass --live to confirm, or set DISABLE_LLM_CALLS=true to block.")
     # Remove --live from argv for normal arg parsing
     args = [a for a in sys.argv[1:] if a != "--live"]
+    regenerate = pop_flag(args, "--regenerate")
+    engine = engine_from_args(
+        args, MODEL, REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE, ITEMS_PER_REQUEST,
+        fake_sample={"colors": {"primary": "grey"}, "body_shape": "placeholder", "prompt_additions": "placeholder"},
+    )
     if len(args) != 2:
-        print("Usage: species_descriptions_llm.py [--live] <visual_data_json> <output_json>")
+        print("Usage: species_descriptions_llm.py [--live] [--fake] [--concurrency N] [--rpm N] [--tpm N] "
+              "[--batch-size N] [--no-cache] [--regenerate] <visual_data_json> <output_json>")
         sys.exit(1)
 
+    if regenerate:
+        # Send everything again: no checkpoint skips and no cached answers
+        engine.cache = None
+
     input_path = Path(args[0])
     output_path = Path(args[1])
+    if engine.fake:
+        output_path = fake_path(output_path)
+        print(f"Fake model: writing to {output_path}")
 
     if not input_path.exists():
         print(f"Error: Input file not found: {input_path}")
         sys.exit(1)
 
-    # Check API key
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        print("Error: GEMINI_API_KEY environment variable not set")
-        sys.exit(1)
-
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # Initialize Gemini client
-    genai = get_genai()
-    client = genai.Client(api_key=api_key)
-
     # Load input data
     print(f"Loading visual data from {input_path}...")
     with open(input_path, "r", encoding="utf-8") as f:
@@ -222,79 +174,95 @@ def main():
     species_data = data.get("species", {})
     print(f"Found {len(species_data)} species")
 
-    # Load checkpoint
-    checkpoint_path = output_path.parent / ".checkpoint_descriptions_llm.json"
-    checkpoint = load_checkpoint(checkpoint_path)
-    processed_ids = set(checkpoint.get("processed_ids", []))
-    results = checkpoint.get("results", {})
+    # Load checkpoint (one journal line per finished species)
+    checkpoint_path = output_path.parent / ".checkpoint_descriptions_llm.jsonl"
+    legacy_path = output_path.parent / ".checkpoint_descriptions_llm.json"
+    if engine.fake:
+        checkpoint_path, legacy_path = fake_path(checkpoint_path), fake_path(legacy_path)
+    checkpoint = CheckpointStore(checkpoint_path, legacy_path=legacy_path)
+    results = checkpoint.results
 
-    print(f"Resuming from checkpoint: {len(processed_ids)} already processed")
+    def described(previous):
+        # Placeholders left in the real checkpoint by older --fake runs don't count
+        visual_desc = (previous or {}).get("visual_description")
+        return bool(visual_desc and (engine.fake or not is_placeholder(visual_desc)))
 
-    # Calculate rate limit delay
-    delay = 60.0 / REQUESTS_PER_MINUTE
+    print(f"Checkpoint: {len(checkpoint)} species from earlier runs")
 
     # Process species
     stats = {"success": 0, "failed": 0, "skipped": 0}
-    species_list = list(species_data.items())
-
-    for i, (species_id, species_info) in enumerate(species_list):
-        if species_id in processed_ids:
+    prompt_keys = {}
+    jobs = []
+    for species_id, species_info in species_data.items():
+        prompt = build_prompt(species_info)
+        prompt_keys[species_id] = engine.item_key(SYSTEM_PROMPT, ACKNOWLEDGEMENT, prompt)
+        previous = results.get(species_id)
+        # Entries journaled before prompt keys existed have none, so they
+        # are regenerated like any changed species
+        if not regenerate and described(previous) and previous.get("prompt_key") == prompt_keys[species_id]:
             stats["skipped"] += 1
             continue
+        jobs.append((species_id, prompt))
+
+    print(f"Unchanged since last run: {stats['skipped']}, species to process: {len(jobs)}")
 
+    def on_result(species_id, visual_desc, error):
+        species_info = species_data[species_id]
         common_name = species_info.get("common_name", "")
         scientific_name = species_info.get("scientific_name", "")
-        print(f"\n[{i+1}/{len(species_list)}] {common_name} ({scientific_name})")
 
-        # Generate description
-        visual_desc = generate_description(client, species_info)
+        if error is not None:
+            print(f"    Error ({common_name}): {error}")
 
+        done = stats["success"] + stats["failed"] + 1
         if visual_desc:
-            results[species_id] = {
+            checkpoint.record(species_id, {
                 "species_id": species_id,
                 "scientific_name": scientific_name,
                 "common_name": common_name,
                 "category": species_info.get("category", ""),
-                "visual_description": visual_desc
-            }
+                "visual_description": visual_desc,
+                "prompt_key": prompt_keys[species_id]
+            })
             stats["success"] += 1
-            print(f"    Generated: {visual_desc.get('body_shape', 'OK')[:50]}...")
+            print(f"[{done}/{len(jobs)}] {common_name} ({scientific_name}): "
+                  f"{visual_desc.get('body_shape', 'OK')[:50]}...")
+        elif described(results.get(species_id)):
+            # Keep the earlier description rather than overwrite it with a failure
+            stats["failed"] += 1
+            print(f"[{done}/{len(jobs)}] {common_name} ({scientific_name}): failed (keeping earlier description)")
         else:
             # Store failure
-            results[species_id] = {
+            checkpoint.record(species_id, {
                 "species_id": species_id,
                 "scientific_name": scientific_name,
                 "common_name": common_name,
                 "category": species_info.get("category", ""),
                 "error": "generation_failed"
-            }
+            })
             stats["failed"] += 1
+            print(f"[{done}/{len(jobs)}] {common_name} ({scientific_name}): failed")
 
-        processed_ids.add(species_id)
-
-        # Rate limit
-        time.sleep(delay)
-
-        # Save checkpoint
-        if (i + 1) % CHECKPOINT_INTERVAL == 0:
-            checkpoint["processed_ids"] = list(processed_ids)
-            checkpoint["results"] = results
-            save_checkpoint(checkpoint_path, checkpoint)
-            print(f"\n--- Checkpoint saved: {len(processed_ids)}/{len(species_list)} ---")
-
-    # Final checkpoint
-    checkpoint["processed_ids"] = list(processed_ids)
-    checkpoint["results"] = results
-    save_checkpoint(checkpoint_path, checkpoint)
+    try:
+        engine.run_items(jobs, SYSTEM_PROMPT, ACKNOWLEDGEMENT, GENERATION_CONFIG, on_result, REQUIRED_FIELDS)
+    finally:
+        # Compact the journal to one line per species
+        checkpoint.compact()
+        checkpoint.close()
+        print(f"\nEngine: {engine.summary()}")
 
     # Write output
+    species_out = {
+        species_id: {k: v for k, v in result.items() if k != "prompt_key"}
+        for species_id, result in results.items()
+    }
     output = {
         "generated_at": datetime.utcnow().isoformat() + "Z",
         "model": MODEL,
-        "total_species": len(results),
-        "success_count": stats["success"],
-        "failed_count": stats["failed"],
-        "species": results
+        "total_species": len(species_out),
+        "success_count": sum(1 for r in species_out.values() if r.get("visual_description")),
+        "failed_count": sum(1 for r in species_out.values() if "error" in r),
+        "species": species_out
     }
 
     with open(output_path, "w", encoding="utf-8") as f:
@@ -306,6 +274,7 @@ def main():
     print(f"Success:  {stats['success']}")
     print(f"Failed:   {stats['failed']}")
     print(f"Skipped:  {stats['skipped']}")
+    print(f"Cached:   {engine.stats['cached']}")
     print(f"Output:   {output_path}")
 
 
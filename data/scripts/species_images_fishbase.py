@@ -19,51 +19,36 @@ import sys
 import json
 import time
 import hashlib
-import urllib.parse
 import urllib.request
 from pathlib import Path
 from datetime import datetime
 from typing import Optional
 
+from checkpoint_store import CheckpointStore
+from http_cache import cached_get_json
+from http_utils import TokenBucket
+
 # Constants
 FISHBASE_API = "https://fishbase.ropensci.org"
 PHOTOS_PER_SPECIES = 3
 REQUEST_DELAY = 0.2  # seconds between requests (10/sec allowed)
 MAX_DOWNLOAD_SIZE = 15 * 1024 * 1024
 USER_AGENT = "UmiLogBot/1.0 (dive logging app; species reference image fetcher)"
-CHECKPOINT_INTERVAL = 50
+
+# Shared by every thread calling the FishBase API (see species_images_harvest.py)
+API_LIMITER = TokenBucket(1 / REQUEST_DELAY)
 
 # Fish categories in our catalog
 FISH_CATEGORIES = {"fish", "Fish"}
 
 
-def load_checkpoint(checkpoint_path: Path) -> dict:
-    """Load processing checkpoint if exists."""
-    if checkpoint_path.exists():
-        with open(checkpoint_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {"processed_ids": [], "results": {}}
-
-
-def save_checkpoint(checkpoint_path: Path, data: dict):
-    """Save processing checkpoint."""
-    with open(checkpoint_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-
-
 def api_request(endpoint: str, params: dict = None) -> Optional[dict]:
     """Make a request to FishBase API."""
-    url = f"{FISHBASE_API}/{endpoint}"
-    if params:
-        url += "?" + urllib.parse.urlencode(params)
-
     try:
-        req = urllib.request.Request(url, headers={
+        return cached_get_json(f"{FISHBASE_API}/{endpoint}", params, headers={
             "User-Agent": USER_AGENT,
             "Accept": "application/json"
-        })
-        with urllib.request.urlopen(req, timeout=30) as response:
-            return json.loads(response.read().decode("utf-8"))
+        }, timeout=30, limiter=API_LIMITER)
     except urllib.error.HTTPError as e:
         if e.code == 404:
             return None
@@ -172,7 +157,6 @@ def process_species(species: dict, output_dir: Path) -> Optional[dict]:
     if not fishbase_id:
         # Search for SpecCode
         fishbase_id = search_species(scientific_name)
-        time.sleep(REQUEST_DELAY)
 
     if not fishbase_id:
         print("  No FishBase record found")
@@ -182,7 +166,6 @@ def process_species(species: dict, output_dir: Path) -> Optional[dict]:
 
     # Fetch photos
     photos = fetch_photos(fishbase_id)
-    time.sleep(REQUEST_DELAY)
 
     if not photos:
         print("  No photos available")
@@ -265,29 +248,27 @@ def main():
     # Setup output directory
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    # Load checkpoint
-    checkpoint_path = output_dir / ".checkpoint_fishbase.json"
-    checkpoint = load_checkpoint(checkpoint_path)
-    processed_ids = set(checkpoint.get("processed_ids", []))
-    results = checkpoint.get("results", {})
+    # Load checkpoint (one journal line per finished species)
+    checkpoint = CheckpointStore(output_dir / ".checkpoint_fishbase.jsonl",
+                                 legacy_path=output_dir / ".checkpoint_fishbase.json")
+    results = checkpoint.results
 
-    print(f"Resuming from checkpoint: {len(processed_ids)} already processed")
+    print(f"Resuming from checkpoint: {len(checkpoint)} already processed")
 
     # Process fish species
     stats = {"success": 0, "not_found": 0, "no_photos": 0, "failed": 0, "skipped": 0}
 
-    for i, species in enumerate(fish_species):
+    for species in fish_species:
         species_id = species.get("id")
 
-        if species_id in processed_ids:
+        if species_id in checkpoint:
             stats["skipped"] += 1
             continue
 
         result = process_species(species, output_dir)
 
         if result:
-            results[species_id] = result
-            processed_ids.add(species_id)
+            checkpoint.record(species_id, result)
 
             if result.get("error") == "not_found":
                 stats["not_found"] += 1
@@ -301,17 +282,9 @@ def main():
             # Non-fish species skipped
             pass
 
-        # Save checkpoint
-        if (i + 1) % CHECKPOINT_INTERVAL == 0:
-            checkpoint["processed_ids"] = list(processed_ids)
-            checkpoint["results"] = results
-            save_checkpoint(checkpoint_path, checkpoint)
-            print(f"\n--- Checkpoint saved: {len(processed_ids)}/{len(fish_species)} ---")
-
-    # Final checkpoint
-    checkpoint["processed_ids"] = list(processed_ids)
-    checkpoint["results"] = results
-    save_checkpoint(checkpoint_path, checkpoint)
+    # Compact the journal to one line per species
+    checkpoint.compact()
+    checkpoint.close()
 
     # Write manifest
     manifest = {
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Harvest species reference images from iNaturalist, FishBase and Wikimedia
+Commons in one parallel pass.
+
+Each species queries all three sources at once, reusing the lookups of
+species_images_inaturalist.py, species_images_fishbase.py and
+species_images_wikimedia.py. --workers species are in flight at a time.
+API calls share one rate limiter per source (each module's API_LIMITER)
+and go through the HTTP cache. Image downloads share one keep-alive
+connection pool and are rate-limited per host (DOWNLOAD_HOST_RATE
+requests/second each).
+
+A species stops early once --target openly licensed photos are on disk.
+iNaturalist photos count (CC-licensed by query), and so do Commons files
+with a CC or public-domain license. Sources still running skip their
+remaining lookups and downloads. A species therefore takes about as long
+as its slowest source rather than the sum of the three.
+
+Only IN_FLIGHT_PER_WORKER * --workers species are queued at a time, and an
+interrupted run (Ctrl-C) drops the queue and stops running sources at
+their next download, so it exits promptly with the finished species
+journaled. A source that raises is recorded as an error for that species
+instead of stopping the run.
+
+Usage:
+    python3 species_images_harvest.py <species_catalog_json> <output_dir> [--workers N] [--target N]
+
+Example:
+    python3 data/scripts/species_images_harvest.py data/export/species_catalog_full.json data/images/species_refs
+
+Output:
+    - Images in output_dir/{species_id}/{inat,fishbase,wiki}_{n}.jpg, the
+      same files the per-source scripts use (existing ones are reused)
+    - Manifest: output_dir/species_images_harvest.json, one entry per species
+      keyed by source. The per-source manifests and journals are left alone;
+      merge_species_images.py reads this manifest alongside them.
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import species_images_fishbase as fishbase
+import species_images_inaturalist as inaturalist
+import species_images_wikimedia as wikimedia
+from checkpoint_store import CheckpointStore
+from http_utils import TokenBucket, make_session
+
+MAX_WORKERS = 4  # species in flight
+IN_FLIGHT_PER_WORKER = 2  # species queued per worker
+TARGET_LICENSED_PHOTOS = 5  # matches merge_species_images.TARGET_IMAGES
+DOWNLOAD_HOST_RATE = 2.0  # image downloads/second per host
+MAX_DOWNLOAD_SIZE = 15 * 1024 * 1024
+OPEN_LICENSE_PREFIXES = ("cc", "public domain", "pd")
+
+MANIFEST_FILE = "species_images_harvest.json"
+
+# source -> (filename prefix, max photos)
+SOURCES = {
+    "inaturalist": ("inat", inaturalist.PHOTOS_PER_SPECIES),
+    "fishbase": ("fishbase", fishbase.PHOTOS_PER_SPECIES),
+    "wikimedia": ("wiki", wikimedia.PHOTOS_PER_SPECIES),
+}
+
+_host_limiters = {}
+_host_limiters_lock = threading.Lock()
+_stopping = threading.Event()  # set when main() exits; running sources skip their downloads
+
+
+def host_limiter(url: str) -> TokenBucket:
+    """Shared download rate limiter for the host of `url`."""
+    host = urllib.parse.urlsplit(url).netloc
+    with _host_limiters_lock:
+        if host not in _host_limiters:
+            _host_limiters[host] = TokenBucket(DOWNLOAD_HOST_RATE)
+        return _host_limiters[host]
+
+
+def is_open_license(license_name: str) -> bool:
+    return bool(license_name) and license_name.strip().lower().startswith(OPEN_LICENSE_PREFIXES)
+
+
+class SpeciesHarvest:
+    """Licensed-photo count for one species, shared by its source threads."""
+
+    def __init__(self, target: int):
+        self.target = target
+        self.licensed = 0
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+
+    def add_licensed(self):
+        with self.lock:
+            self.licensed += 1
+            if self.licensed >= self.target:
+                self.done.set()
+
+
+def inaturalist_candidates(species: dict, harvest: SpeciesHarvest) -> tuple[dict, list]:
+    """(result fields, [(url, photo record, licensed)]) from iNaturalist."""
+    taxon_id = inaturalist.search_taxon(species["scientificName"])
+    if not taxon_id:
+        return {"taxon_id": None, "error": "taxon_not_found"}, []
+    if harvest.done.is_set():
+        return {"taxon_id": taxon_id}, []
+    photos = inaturalist.fetch_observation_photos(taxon_id)
+    if not photos:
+        return {"taxon_id": taxon_id, "error": "no_photos"}, []
+    return {"taxon_id": taxon_id}, [(photo["url"], photo, True) for photo in photos]
+
+
+def fishbase_candidates(species: dict, harvest: SpeciesHarvest) -> Optional[tuple[dict, list]]:
+    """(result fields, candidates) from FishBase; None for non-fish species."""
+    if species.get("category", "") not in fishbase.FISH_CATEGORIES:
+        return None
+    spec_code = (species.get("fishbaseId") or species.get("fishbase_id")
+                 or fishbase.search_species(species["scientificName"]))
+    if not spec_code:
+        return {"error": "not_found"}, []
+    if harvest.done.is_set():
+        return {"spec_code": spec_code}, []
+    photos = fishbase.fetch_photos(spec_code)
+    if not photos:
+        return {"spec_code": spec_code, "error": "no_photos"}, []
+    # FishBase does not report a per-picture license, so these never count
+    # towards the licensed target
+    return {"spec_code": spec_code}, [
+        (photo["url"], {"source": "fishbase", "url": photo["url"], "author": photo["author"],
+                        "locality": photo["locality"]}, False)
+        for photo in photos
+    ]
+
+
+def wikimedia_candidates(species: dict, harvest: SpeciesHarvest) -> tuple[dict, list]:
+    """(result fields, candidates) from Wikimedia Commons."""
+    found = wikimedia.search_species_images(species["scientificName"], species.get("name"))
+    if not found:
+        return {"error": "no_results"}, []
+    if harvest.done.is_set():
+        return {}, []
+    image_info = wikimedia.get_image_info([r["title"] for r in found])
+    if not image_info:
+        return {"error": "no_info"}, []
+    return {}, [
+        (info["url"], {"source": "wikimedia_commons", "title": title, "url": info["url"],
+                       "license": info["license"], "artist": info["artist"]}, is_open_license(info["license"]))
+        for title, info in image_info.items()
+    ]
+
+
+CANDIDATES = {
+    "inaturalist": inaturalist_candidates,
+    "fishbase": fishbase_candidates,
+    "wikimedia": wikimedia_candidates,
+}
+
+
+def download_image(session, url: str, output_path: Path) -> Optional[str]:
+    """Download through the shared session and return the SHA256, or None."""
+    host_limiter(url).acquire()
+    try:
+        with session.get(url, timeout=60, stream=True) as response:
+            if response.status_code != 200:
+                print(f"    Download failed ({response.status_code}): {url}")
+                return None
+            content_length = response.headers.get("Content-Length")
+            if content_length and int(content_length) > MAX_DOWNLOAD_SIZE:
+                return None
+            data = response.raw.read(MAX_DOWNLOAD_SIZE + 1, decode_content=True)
+    except Exception as e:
+        print(f"    Download failed: {e}")
+        return None
+
+    # Tiny responses are placeholder images (FishBase serves these)
+    if len(data) > MAX_DOWNLOAD_SIZE or len(data) < 1000:
+        return None
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "wb") as f:
+        f.write(data)
+    return hashlib.sha256(data).hexdigest()
+
+
+def harvest_source(source: str, species: dict, harvest: SpeciesHarvest, session,
+                   output_dir: Path) -> tuple[Optional[dict], float]:
+    """One source's manifest entry for a species, and the seconds it took.
+
+    Any exception becomes an "error" entry for this source alone.
+    """
+    started = time.monotonic()
+    species_id = species["id"]
+    try:
+        return collect_source(source, species, harvest, session, output_dir), time.monotonic() - started
+    except Exception as e:
+        print(f"    {source} failed for {species_id}: {type(e).__name__}: {e}")
+        return {
+            "species_id": species_id,
+            "scientific_name": species["scientificName"],
+            "common_name": species.get("name"),
+            "error": f"{type(e).__name__}: {e}",
+            "photos": [],
+            "photo_count": 0
+        }, time.monotonic() - started
+
+
+def collect_source(source: str, species: dict, harvest: SpeciesHarvest, session,
+                   output_dir: Path) -> Optional[dict]:
+    """Look up and download one source's photos; None when it doesn't cover the species."""
+    prefix, limit = SOURCES[source]
+    found = CANDIDATES[source](species, harvest)
+    if found is None:
+        return None
+    fields, candidates = found
+
+    species_id = species["id"]
+    downloaded = []
+    for i, (url, record, licensed) in enumerate(candidates):
+        if len(downloaded) >= limit or harvest.done.is_set() or _stopping.is_set():
+            break
+        output_path = output_dir / species_id / f"{prefix}_{i + 1}.jpg"
+        if output_path.exists():
+            with open(output_path, "rb") as f:
+                sha256 = hashlib.sha256(f.read()).hexdigest()
+            cached = True
+        else:
+            sha256 = download_image(session, url, output_path)
+            cached = False
+        if not sha256:
+            continue
+        downloaded.append({
+            **record,
+            "local_path": str(output_path.relative_to(output_dir)),
+            "sha256": sha256,
+            "cached": cached
+        })
+        if licensed:
+            harvest.add_licensed()
+
+    return {
+        "species_id": species_id,
+        "scientific_name": species["scientificName"],
+        "common_name": species.get("name"),
+        **fields,
+        "photos": downloaded,
+        "photo_count": len(downloaded)
+    }
+
+
+def harvest_species(species: dict, source_pool: ThreadPoolExecutor, session, output_dir: Path,
+                    target: int) -> tuple[dict, dict, bool]:
+    """Run every source for one species at once: (results, seconds per source, stopped early)."""
+    harvest = SpeciesHarvest(target)
+    futures = {
+        source: source_pool.submit(harvest_source, source, species, harvest, session, output_dir)
+        for source in SOURCES
+    }
+    results = {}
+    seconds = {}
+    for source, future in futures.items():
+        results[source], seconds[source] = future.result()
+    return results, seconds, harvest.done.is_set()
+
+
+def write_manifest(results: dict, output_dir: Path):
+    """Write species_images_harvest.json: {species_id: {source: entry}} from the journal."""
+    manifest = {
+        "source": "harvest",
+        "generated_at": datetime.utcnow().isoformat() + "Z",
+        "species_count": len(results),
+        "total_photos": sum(
+            (entry or {}).get("photo_count", 0) for sources in results.values() for entry in sources.values()
+        ),
+        "species": results
+    }
+    with open(output_dir / MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Harvest species images from all sources in parallel")
+    parser.add_argument("catalog", type=Path, help="Species catalog JSON")
+    parser.add_argument("output_dir", type=Path, help="Image directory (shared with the per-source scripts)")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Species harvested at once")
+    parser.add_argument("--target", type=int, default=TARGET_LICENSED_PHOTOS,
+                        help="Stop a species once this many licensed photos are on disk")
+    args = parser.parse_args()
+
+    if not args.catalog.exists():
+        print(f"Error: Species catalog not found: {args.catalog}")
+        sys.exit(1)
+
+    print(f"Loading species catalog from {args.catalog}...")
+    with open(args.catalog, "r", encoding="utf-8") as f:
+        species_list = [
+            s for s in json.load(f).get("species", []) if s.get("id") and s.get("scientificName")
+        ]
+    print(f"Found {len(species_list)} species")
+
+    output_dir = args.output_dir
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Load checkpoint (one journal line per finished species)
+    checkpoint = CheckpointStore(output_dir / ".checkpoint_harvest.jsonl")
+    pending = [s for s in species_list if s["id"] not in checkpoint]
+    print(f"Resuming from checkpoint: {len(checkpoint)} already processed, {len(pending)} to go")
+
+    workers = max(1, args.workers)
+    session = make_session(pool_size=workers * len(SOURCES), user_agent=inaturalist.USER_AGENT)
+    source_seconds = {source: 0.0 for source in SOURCES}
+    stats = {"with_photos": 0, "without_photos": 0, "early_stop": 0}
+    started = time.monotonic()
+
+    source_pool = ThreadPoolExecutor(max_workers=workers * len(SOURCES))
+    species_pool = ThreadPoolExecutor(max_workers=workers)
+    queue = iter(pending)
+    in_flight = {}
+    done = 0
+    try:
+        while True:
+            # Top the window up rather than submitting the whole backlog, so
+            # an interrupted run has only these to drop
+            for species in itertools.islice(queue, workers * IN_FLIGHT_PER_WORKER - len(in_flight)):
+                future = species_pool.submit(harvest_species, species, source_pool, session, output_dir, args.target)
+                in_flight[future] = species
+            if not in_flight:
+                break
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                species = in_flight.pop(future)
+                results, seconds, stopped = future.result()
+                checkpoint.record(species["id"], results)
+                done += 1
+
+                counts = {source: (r or {}).get("photo_count", 0) for source, r in results.items()}
+                for source, elapsed in seconds.items():
+                    source_seconds[source] += elapsed
+                stats["with_photos" if sum(counts.values()) else "without_photos"] += 1
+                stats["early_stop"] += stopped
+                print(f"[{done}/{len(pending)}] {species.get('name', '')} ({species['scientificName']}): "
+                      + ", ".join(f"{source} {count}" for source, count in counts.items())
+                      + (" (target reached)" if stopped else "")
+                      + f" {max(seconds.values()):.1f}s")
+    finally:
+        # Don't wait for queued species; running sources stop at their next download
+        _stopping.set()
+        species_pool.shutdown(wait=False, cancel_futures=True)
+        source_pool.shutdown(wait=False, cancel_futures=True)
+        # Compact the journal to one line per species
+        checkpoint.compact()
+        checkpoint.close()
+
+    wall = time.monotonic() - started
+    write_manifest(checkpoint.results, output_dir)
+
+    print("\n" + "=" * 50)
+    print("COMPLETE")
+    print("=" * 50)
+    print(f"With photos:     {stats['with_photos']}")
+    print(f"Without photos:  {stats['without_photos']}")
+    print(f"Stopped early:   {stats['early_stop']}")
+    print("Source time:     " + ", ".join(f"{s} {t:.1f}s" for s, t in source_seconds.items())
+          + f" (serial sum {sum(source_seconds.values()):.1f}s)")
+    print(f"Wall time:       {wall:.1f}s")
+    print(f"Manifest:        {output_dir / MANIFEST_FILE}")
+
+
+if __name__ == "__main__":
+    main()
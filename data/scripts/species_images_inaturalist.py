@@ -20,19 +20,24 @@ import json
 import os
 import time
 import hashlib
-import urllib.parse
 import urllib.request
 from pathlib import Path
 from datetime import datetime
 from typing import Optional
 
+from checkpoint_store import CheckpointStore
+from http_cache import cached_get_json
+from http_utils import TokenBucket
+
 # Constants
 INAT_API = "https://api.inaturalist.org/v1"
 PHOTOS_PER_SPECIES = 5  # Target number of photos per species
 REQUEST_DELAY = 1.0  # seconds between requests (respect rate limit: 60/min)
 MAX_DOWNLOAD_SIZE = 15 * 1024 * 1024  # 15MB max per image
 USER_AGENT = "UmiLogBot/1.0 (dive logging app; species reference image fetcher)"
-CHECKPOINT_INTERVAL = 25  # Save progress every N species
+
+# Shared by every thread calling the iNaturalist API (see species_images_harvest.py)
+API_LIMITER = TokenBucket(1 / REQUEST_DELAY)
 
 # CC licenses accepted
 ALLOWED_LICENSES = [
@@ -40,30 +45,11 @@ ALLOWED_LICENSES = [
 ]
 
 
-def load_checkpoint(checkpoint_path: Path) -> dict:
-    """Load processing checkpoint if exists."""
-    if checkpoint_path.exists():
-        with open(checkpoint_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {"processed_ids": [], "results": {}}
-
-
-def save_checkpoint(checkpoint_path: Path, data: dict):
-    """Save processing checkpoint."""
-    with open(checkpoint_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-
-
 def api_request(endpoint: str, params: dict) -> Optional[dict]:
-    """Make a rate-limited request to iNaturalist API."""
-    url = f"{INAT_API}/{endpoint}"
-    if params:
-        url += "?" + urllib.parse.urlencode(params)
-
+    """Make a rate-limited request to iNaturalist API (cached responses skip the delay)."""
     try:
-        req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
-        with urllib.request.urlopen(req, timeout=30) as response:
-            return json.loads(response.read().decode("utf-8"))
+        return cached_get_json(f"{INAT_API}/{endpoint}", params, headers={"User-Agent": USER_AGENT},
+                               timeout=30, limiter=API_LIMITER)
     except urllib.error.HTTPError as e:
         print(f"  API error {e.code}: {e.reason}")
         return None
@@ -201,7 +187,6 @@ def process_species(species: dict, output_dir: Path) -> Optional[dict]:
 
     # Search for taxon
     taxon_id = search_taxon(scientific_name)
-    time.sleep(REQUEST_DELAY)
 
     if not taxon_id:
         print(f"  No taxon found for: {scientific_name}")
@@ -211,7 +196,6 @@ def process_species(species: dict, output_dir: Path) -> Optional[dict]:
 
     # Fetch photo metadata
     photos = fetch_observation_photos(taxon_id)
-    time.sleep(REQUEST_DELAY)
 
     if not photos:
         print(f"  No CC-licensed photos found")
@@ -289,29 +273,27 @@ def main():
     # Setup output directory
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    # Load checkpoint
-    checkpoint_path = output_dir / ".checkpoint_inaturalist.json"
-    checkpoint = load_checkpoint(checkpoint_path)
-    processed_ids = set(checkpoint.get("processed_ids", []))
-    results = checkpoint.get("results", {})
+    # Load checkpoint (one journal line per finished species)
+    checkpoint = CheckpointStore(output_dir / ".checkpoint_inaturalist.jsonl",
+                                 legacy_path=output_dir / ".checkpoint_inaturalist.json")
+    results = checkpoint.results
 
-    print(f"Resuming from checkpoint: {len(processed_ids)} already processed")
+    print(f"Resuming from checkpoint: {len(checkpoint)} already processed")
 
     # Process species
     stats = {"success": 0, "no_taxon": 0, "no_photos": 0, "failed": 0, "skipped": 0}
 
-    for i, species in enumerate(species_list):
+    for species in species_list:
         species_id = species.get("id")
 
-        if species_id in processed_ids:
+        if species_id in checkpoint:
             stats["skipped"] += 1
             continue
 
         result = process_species(species, output_dir)
 
         if result:
-            results[species_id] = result
-            processed_ids.add(species_id)
+            checkpoint.record(species_id, result)
 
             if result.get("error") == "taxon_not_found":
                 stats["no_taxon"] += 1
@@ -324,17 +306,9 @@ def main():
         else:
             stats["failed"] += 1
 
-        # Save checkpoint periodically
-        if (i + 1) % CHECKPOINT_INTERVAL == 0:
-            checkpoint["processed_ids"] = list(processed_ids)
-            checkpoint["results"] = results
-            save_checkpoint(checkpoint_path, checkpoint)
-            print(f"\n--- Checkpoint saved: {len(processed_ids)}/{len(species_list)} ---")
-
-    # Final checkpoint
-    checkpoint["processed_ids"] = list(processed_ids)
-    checkpoint["results"] = results
-    save_checkpoint(checkpoint_path, checkpoint)
+    # Compact the journal to one line per species
+    checkpoint.compact()
+    checkpoint.close()
 
     # Write manifest
     manifest = {
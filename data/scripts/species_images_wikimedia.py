@@ -20,47 +20,36 @@ import json
 import os
 import time
 import hashlib
-import urllib.parse
 import urllib.request
 from pathlib import Path
 from datetime import datetime
 from typing import Optional
 
+from checkpoint_store import CheckpointStore
+from http_cache import cached_get_json
+from http_utils import TokenBucket
+
 # Constants
 COMMONS_API = "https://commons.wikimedia.org/w/api.php"
 PHOTOS_PER_SPECIES = 3  # Fewer than iNat since it's a fallback
 REQUEST_DELAY = 0.5  # seconds between requests (200/min allowed)
 MAX_DOWNLOAD_SIZE = 15 * 1024 * 1024  # 15MB max
 USER_AGENT = "UmiLogBot/1.0 (dive logging app; species reference image fetcher)"
-CHECKPOINT_INTERVAL = 50
+
+# Shared by every thread calling the Commons API (see species_images_harvest.py)
+API_LIMITER = TokenBucket(1 / REQUEST_DELAY)
 
 # Image extensions to accept
 VALID_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
 
 
-def load_checkpoint(checkpoint_path: Path) -> dict:
-    """Load processing checkpoint if exists."""
-    if checkpoint_path.exists():
-        with open(checkpoint_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {"processed_ids": [], "results": {}}
-
-
-def save_checkpoint(checkpoint_path: Path, data: dict):
-    """Save processing checkpoint."""
-    with open(checkpoint_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-
-
 def api_request(params: dict) -> Optional[dict]:
     """Make a request to Wikimedia Commons API."""
     params["format"] = "json"
-    url = COMMONS_API + "?" + urllib.parse.urlencode(params)
 
     try:
-        req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
-        with urllib.request.urlopen(req, timeout=30) as response:
-            return json.loads(response.read().decode("utf-8"))
+        return cached_get_json(COMMONS_API, params, headers={"User-Agent": USER_AGENT},
+                               timeout=30, limiter=API_LIMITER)
     except Exception as e:
         print(f"  API error: {e}")
         return None
@@ -197,7 +186,6 @@ def process_species(species: dict, output_dir: Path) -> Optional[dict]:
 
     # Search for images
     search_results = search_species_images(scientific_name, common_name)
-    time.sleep(REQUEST_DELAY)
 
     if not search_results:
         print("  No images found")
@@ -206,7 +194,6 @@ def process_species(species: dict, output_dir: Path) -> Optional[dict]:
     # Get image info
     titles = [r["title"] for r in search_results]
     image_info = get_image_info(titles)
-    time.sleep(REQUEST_DELAY)
 
     if not image_info:
         print("  No image info retrieved")
@@ -290,29 +277,27 @@ def main():
     # Setup output directory
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    # Load checkpoint
-    checkpoint_path = output_dir / ".checkpoint_wikimedia.json"
-    checkpoint = load_checkpoint(checkpoint_path)
-    processed_ids = set(checkpoint.get("processed_ids", []))
-    results = checkpoint.get("results", {})
+    # Load checkpoint (one journal line per finished species)
+    checkpoint = CheckpointStore(output_dir / ".checkpoint_wikimedia.jsonl",
+                                 legacy_path=output_dir / ".checkpoint_wikimedia.json")
+    results = checkpoint.results
 
-    print(f"Resuming from checkpoint: {len(processed_ids)} already processed")
+    print(f"Resuming from checkpoint: {len(checkpoint)} already processed")
 
     # Process species
     stats = {"success": 0, "no_results": 0, "failed": 0, "skipped": 0}
 
-    for i, species in enumerate(species_list):
+    for species in species_list:
         species_id = species.get("id")
 
-        if species_id in processed_ids:
+        if species_id in checkpoint:
             stats["skipped"] += 1
             continue
 
         result = process_species(species, output_dir)
 
         if result:
-            results[species_id] = result
-            processed_ids.add(species_id)
+            checkpoint.record(species_id, result)
 
             if result.get("photo_count", 0) > 0:
                 stats["success"] += 1
@@ -323,17 +308,9 @@ def main():
         else:
             stats["failed"] += 1
 
-        # Save checkpoint
-        if (i + 1) % CHECKPOINT_INTERVAL == 0:
-            checkpoint["processed_ids"] = list(processed_ids)
-            checkpoint["results"] = results
-            save_checkpoint(checkpoint_path, checkpoint)
-            print(f"\n--- Checkpoint saved: {len(processed_ids)}/{len(species_list)} ---")
-
-    # Final checkpoint
-    checkpoint["processed_ids"] = list(processed_ids)
-    checkpoint["results"] = results
-    save_checkpoint(checkpoint_path, checkpoint)
+    # Compact the journal to one line per species
+    checkpoint.compact()
+    checkpoint.close()
 
     # Write manifest
     manifest = {
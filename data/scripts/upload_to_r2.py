@@ -3,7 +3,7 @@
 Upload site images to Cloudflare R2.
 
 Usage:
-    python3 upload_to_r2.py <images_dir>
+    python3 upload_to_r2.py <images_dir> [--workers N] [--dry-run] [--endpoint-url URL]
 
 Prerequisites:
     - pip install boto3
@@ -21,22 +21,38 @@ Example:
 
 Output:
     Updates site_media.json with CDN URLs
+
+Uploads run on a pool of --workers threads sharing one client; files above
+MULTIPART_THRESHOLD are sent as multipart uploads. Each uploaded key and the
+SHA-256 of its content is recorded in a state DB (<images_dir>/
+.r2_upload_state.sqlite) as soon as the upload finishes, so unchanged files
+are skipped on later runs and an interrupted run resumes where it stopped.
+Records are kept per endpoint, so a run against a test server never marks
+objects as present in R2.
+--dry-run prints what would be uploaded (new/changed) without credentials.
+
+--endpoint-url (or R2_ENDPOINT_URL) points the client at any S3-compatible
+endpoint, e.g. a local moto or MinIO server for testing.
 """
 
 import sys
 import os
 import json
+import sqlite3
+import hashlib
+import argparse
+import threading
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     import boto3
+    from boto3.s3.transfer import TransferConfig
     from botocore.config import Config
     HAS_BOTO3 = True
 except ImportError:
     HAS_BOTO3 = False
-    print("Error: boto3 not installed. Install with: pip3 install boto3")
-    sys.exit(1)
 
 
 # Configuration from environment
@@ -45,29 +61,111 @@ R2_ACCESS_KEY_ID = os.environ.get("R2_ACCESS_KEY_ID")
 R2_SECRET_ACCESS_KEY = os.environ.get("R2_SECRET_ACCESS_KEY")
 R2_BUCKET_NAME = os.environ.get("R2_BUCKET_NAME", "umilog-media")
 R2_PUBLIC_URL = os.environ.get("R2_PUBLIC_URL", f"https://media.umilog.app")
+R2_ENDPOINT_URL = os.environ.get("R2_ENDPOINT_URL")
+
+DEFAULT_WORKERS = 8
+MULTIPART_THRESHOLD = 8 * 1024 * 1024
+MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+STATE_DB_NAME = ".r2_upload_state.sqlite"
+
+
+class UploadState:
+    """SQLite record of (endpoint, bucket, key) -> SHA-256 of the last uploaded content.
+
+    An instance reads and writes the records of one endpoint only.
+    """
+
+    def __init__(self, path: Path, endpoint: str):
+        self.endpoint = endpoint
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock:
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(uploads)")]
+            if columns and "endpoint" not in columns:
+                # Pre-endpoint records can't be attributed to a server; re-upload once
+                self.conn.execute("DROP TABLE uploads")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS uploads (
+                    endpoint TEXT NOT NULL,
+                    bucket TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    uploaded_at TEXT NOT NULL,
+                    PRIMARY KEY (endpoint, bucket, key)
+                )
+            """)
+            self.conn.commit()
+
+    def get(self, bucket, key):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT sha256 FROM uploads WHERE endpoint = ? AND bucket = ? AND key = ?",
+                (self.endpoint, bucket, key)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, bucket, key, sha256, size):
+        # Committed per upload so an interrupted run keeps its progress
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO uploads VALUES (?, ?, ?, ?, ?, ?)",
+                (self.endpoint, bucket, key, sha256, size, datetime.utcnow().isoformat() + "Z")
+            )
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def resolve_endpoint(endpoint_url: str | None = None) -> str:
+    """Endpoint the client talks to: the override, or the R2 account endpoint."""
+    return endpoint_url or f"https://{R2_ACCOUNT_ID}.r2.cloudflarestorage.com"
+
+
+def get_r2_client(endpoint_url: str | None = None, pool_size: int = DEFAULT_WORKERS):
+    """Create R2 S3-compatible client (thread-safe; shared by the upload workers)."""
+    if not HAS_BOTO3:
+        print("Error: boto3 not installed. Install with: pip3 install boto3")
+        sys.exit(1)
 
-
-def get_r2_client():
-    """Create R2 S3-compatible client."""
-    if not all([R2_ACCOUNT_ID, R2_ACCESS_KEY_ID, R2_SECRET_ACCESS_KEY]):
+    required = {"R2_ACCESS_KEY_ID": R2_ACCESS_KEY_ID, "R2_SECRET_ACCESS_KEY": R2_SECRET_ACCESS_KEY}
+    if not endpoint_url:
+        required["R2_ACCOUNT_ID"] = R2_ACCOUNT_ID
+    missing = [name for name, value in required.items() if not value]
+    if missing:
         print("Error: Missing R2 credentials. Set environment variables:")
-        print("  R2_ACCOUNT_ID")
-        print("  R2_ACCESS_KEY_ID")
-        print("  R2_SECRET_ACCESS_KEY")
+        for name in missing:
+            print(f"  {name}")
         sys.exit(1)
 
     return boto3.client(
         "s3",
-        endpoint_url=f"https://{R2_ACCOUNT_ID}.r2.cloudflarestorage.com",
+        endpoint_url=resolve_endpoint(endpoint_url),
         aws_access_key_id=R2_ACCESS_KEY_ID,
         aws_secret_access_key=R2_SECRET_ACCESS_KEY,
-        config=Config(signature_version="s3v4"),
+        config=Config(signature_version="s3v4", max_pool_connections=pool_size),
         region_name="auto"
     )
 
 
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=MULTIPART_THRESHOLD,
+    multipart_chunksize=MULTIPART_CHUNKSIZE,
+) if HAS_BOTO3 else None
+
+
 def upload_file(client, local_path: Path, r2_key: str) -> bool:
-    """Upload a single file to R2."""
+    """Upload a single file to R2 (multipart above MULTIPART_THRESHOLD)."""
     try:
         content_type = "image/webp" if local_path.suffix == ".webp" else "image/jpeg"
         client.upload_file(
@@ -77,7 +175,8 @@ def upload_file(client, local_path: Path, r2_key: str) -> bool:
             ExtraArgs={
                 "ContentType": content_type,
                 "CacheControl": "public, max-age=31536000"  # 1 year cache
-            }
+            },
+            Config=TRANSFER_CONFIG
         )
         return True
     except Exception as e:
@@ -85,13 +184,48 @@ def upload_file(client, local_path: Path, r2_key: str) -> bool:
         return False
 
 
+def plan_uploads(images: list[dict], images_dir: Path, state: UploadState) -> tuple[list, list, int]:
+    """Split manifest records into uploads to do and unchanged ones.
+
+    Returns (pending, unchanged, missing): pending is a list of
+    (record, path, key, sha256, reason) with reason "new" or "changed";
+    unchanged is a list of (record, key).
+    """
+    pending = []
+    unchanged = []
+    missing = 0
+    for record in images:
+        site_id = record.get("site_id")
+        thumb_path = images_dir / record.get("thumb_path", "")
+
+        if not thumb_path.exists():
+            print(f"  Skipping {site_id}: file not found")
+            missing += 1
+            continue
+
+        # R2 key: sites/{site_id}/thumb.webp
+        r2_key = f"sites/{site_id}/thumb.webp"
+        sha256 = file_sha256(thumb_path)
+        uploaded_sha = state.get(R2_BUCKET_NAME, r2_key)
+        if uploaded_sha == sha256:
+            unchanged.append((record, r2_key))
+        else:
+            pending.append((record, thumb_path, r2_key, sha256, "new" if uploaded_sha is None else "changed"))
+    return pending, unchanged, missing
+
+
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: upload_to_r2.py <images_dir>")
-        print("Example: python3 data/scripts/upload_to_r2.py data/images")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Upload site thumbnails to Cloudflare R2")
+    parser.add_argument("images_dir", type=Path)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent uploads (default: %(default)s)")
+    parser.add_argument("--dry-run", action="store_true", help="List new/changed files without uploading")
+    parser.add_argument(
+        "--endpoint-url", default=R2_ENDPOINT_URL,
+        help="S3-compatible endpoint (default: R2 account endpoint, or $R2_ENDPOINT_URL)"
+    )
+    args = parser.parse_args()
 
-    images_dir = Path(sys.argv[1])
+    images_dir = args.images_dir
     manifest_path = images_dir / "site_media.json"
 
     if not manifest_path.exists():
@@ -106,47 +240,57 @@ def main():
     images = manifest.get("images", [])
     print(f"Found {len(images)} images to upload")
 
+    state = UploadState(images_dir / STATE_DB_NAME, resolve_endpoint(args.endpoint_url))
+    pending, unchanged, missing = plan_uploads(images, images_dir, state)
+    print(f"{len(pending)} new or changed, {len(unchanged)} unchanged, {missing} missing")
+
+    if args.dry_run:
+        for record, thumb_path, r2_key, sha256, reason in pending:
+            print(f"  {reason:8} {r2_key} ({thumb_path.stat().st_size // 1024}KB)")
+        state.close()
+        return
+
+    # Unchanged objects are already in the bucket
+    for record, r2_key in unchanged:
+        record["cdn_url"] = f"{R2_PUBLIC_URL}/{r2_key}"
+
     # Create R2 client
-    client = get_r2_client()
+    client = get_r2_client(args.endpoint_url, pool_size=args.workers)
 
     # Upload images
     uploaded = 0
     failed = 0
-    skipped = 0
-
-    for i, record in enumerate(images):
-        site_id = record.get("site_id")
-        thumb_path = images_dir / record.get("thumb_path", "")
-
-        if not thumb_path.exists():
-            print(f"  Skipping {site_id}: file not found")
-            skipped += 1
-            continue
-
-        # R2 key: sites/{site_id}/thumb.webp
-        r2_key = f"sites/{site_id}/thumb.webp"
+    skipped = missing + len(unchanged)
+
+    def upload(item):
+        record, thumb_path, r2_key, sha256, reason = item
+        print(f"Uploading {record.get('site_id')} ({reason})...")
+        if not upload_file(client, thumb_path, r2_key):
+            return False
+        state.put(R2_BUCKET_NAME, r2_key, sha256, thumb_path.stat().st_size)
+        # Update record with CDN URL
+        record["cdn_url"] = f"{R2_PUBLIC_URL}/{r2_key}"
+        return True
 
-        # Check if already has CDN URL (already uploaded)
-        if record.get("cdn_url"):
-            skipped += 1
-            continue
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        for i, ok in enumerate(executor.map(upload, pending)):
+            if ok:
+                uploaded += 1
+            else:
+                failed += 1
 
-        print(f"Uploading {site_id}...")
-        if upload_file(client, thumb_path, r2_key):
-            # Update record with CDN URL
-            record["cdn_url"] = f"{R2_PUBLIC_URL}/{r2_key}"
-            uploaded += 1
-        else:
-            failed += 1
+            # Progress
+            if (i + 1) % 100 == 0:
+                print(f"Progress: {i + 1}/{len(pending)} ({uploaded} uploaded, {failed} failed)")
 
-        # Progress
-        if (i + 1) % 100 == 0:
-            print(f"Progress: {i + 1}/{len(images)} ({uploaded} uploaded, {failed} failed)")
+    state.close()
 
     # Update manifest with CDN URLs
     manifest["uploaded_at"] = datetime.utcnow().isoformat() + "Z"
     manifest["cdn_base_url"] = R2_PUBLIC_URL
-    manifest["total_uploaded"] = uploaded
+    # Objects in the bucket for this manifest, whichever run uploaded them
+    manifest["total_uploaded"] = uploaded + len(unchanged)
+    manifest["uploaded_this_run"] = uploaded
 
     with open(manifest_path, "w", encoding="utf-8") as f:
         json.dump(manifest, f, indent=2, ensure_ascii=False)
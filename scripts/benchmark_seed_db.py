@@ -0,0 +1,576 @@
+#!/usr/bin/env python3
+"""
+Query-latency benchmark for the pre-seeded UmiLog database.
+
+Opens umilog_seed.db read-only and replays the query shapes the app issues
+(SQL copied from the UmiDB repositories), with parameters sampled from the
+database itself:
+
+- viewport:     SiteRepository.fetchInBoundsLite over small/medium/large boxes,
+                and (under --scale) the same query driven by an R*Tree
+                built in the temporary copy (*_rtree)
+- nearby:       SiteRepository.fetchNearby (10 km)
+- site_search:  SiteRepository.search, the LIKE search behind the search sheet
+- fts_search:   SiteRepository.searchFTS with words from site names
+- fts_search_ranked: the same ranking with bm25() computed in a
+                materialized subquery over sites_fts and aliases joined
+                outside it (bm25 cannot run inside searchFTS's GROUP BY)
+- fts_prefix:   SiteRepository.searchPrefix with 3-letter prefixes
+- species_search: SpeciesRepository.search (wildlife screen, log wizard)
+- region_sites / area_sites: fetchByRegionId / fetchByArea drill-down
+- region_list:  GeographyRepository.fetchRegions(countryId)
+- site_detail:  fetch(id) plus SpeciesRepository.fetchForSite and the
+                site_species count shown on the detail screen
+- legacy_check: the curated-site probe every repository read runs first
+
+Each shape reports p50/p95/p99/max latency in milliseconds and the average
+row count. A shape whose table is missing or unreadable with the local
+SQLite (sites_rtree outside --scale, contentless_delete FTS before SQLite
+3.43) is recorded as skipped. A shape whose SQL fails is recorded with its
+error; shapes in EXPECTED_FAILURES copy app SQL that is known to fail and
+are reported as such. Results are written as JSON; when a baseline exists
+(--baseline, or the previous results file) a shape whose p95 grew by more
+than --threshold (and by more than MIN_REGRESSION_MS), or that fails when
+it did not before, is flagged as a regression. The script exits with
+status 1 only for regressions, or without a baseline for unexpected
+failures.
+
+--scale N benchmarks a temporary copy grown to N sites by jittering the
+real ones (up to SCALE_JITTER_DEG), to compare B-tree and R*Tree viewport
+queries at catalog sizes the bundle has not reached yet. The R*Tree
+(sites_rtree) exists only in that copy; the app does not ship one.
+
+Usage:
+    python3 scripts/benchmark_seed_db.py [--db PATH] [--iterations N]
+        [--output PATH] [--baseline PATH] [--threshold 0.25] [--scale 50000]
+"""
+
+import argparse
+import json
+import math
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_DB = PROJECT_ROOT / "Resources" / "SeedDB" / "umilog_seed.db"
+DEFAULT_OUTPUT = PROJECT_ROOT / "data" / "stage" / "seed_db_benchmark.json"
+
+DEFAULT_ITERATIONS = 300
+WARMUP_ITERATIONS = 20
+DEFAULT_THRESHOLD = 0.25  # fractional p95 increase flagged as a regression
+MIN_REGRESSION_MS = 0.25  # ignore p95 changes below scheduler noise
+PERCENTILES = (50, 95, 99)
+RANDOM_SEED = 20240101
+SCALE_JITTER_DEG = 5.0
+
+# Viewport half-sizes in degrees: harbour, island group, sea
+VIEWPORT_SPANS = {"viewport_small": 0.1, "viewport_medium": 1.0, "viewport_large": 10.0}
+
+LEGACY_FILTER = "(s.id LIKE 'curated_%' OR s.wishlist = 1 OR s.isPlanned = 1 OR s.visitedCount > 0)"
+RANKED_ORDER = """
+    COALESCE(s.curation_score, 0) DESC,
+    COALESCE(s.popularity_score, 0) DESC,
+    COALESCE(s.visitedCount, 0) DESC,
+    s.name COLLATE NOCASE ASC
+"""
+SITE_LITE_COLUMNS = """
+    s.id, s.name, s.latitude, s.longitude, s.difficulty, s.type,
+    s.tags, s.region, s.visitedCount, s.wishlist
+"""
+# Optional tables; shapes reading one the local SQLite cannot open are skipped
+OPTIONAL_TABLES = ("sites_rtree", "sites_fts")
+# App query shapes that fail as written; they are still run and recorded,
+# but do not affect the exit status
+EXPECTED_FAILURES = {
+    "fts_search": "SiteRepository.searchFTS calls bm25() inside GROUP BY (see fts_search_ranked)",
+}
+
+
+def log(msg: str):
+    print(msg, flush=True)
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def normalized_search_value(value: str) -> str:
+    """Port of SiteRepository.normalizedSearchValue."""
+    flattened = "".join(c if c.isalnum() else " " for c in value.lower())
+    return " ".join(flattened.split())
+
+
+def build_queries(conn: sqlite3.Connection) -> dict[str, str]:
+    """SQL for each query shape, with the legacy filter applied as the app would."""
+    hide_legacy = conn.execute("SELECT COUNT(*) FROM sites WHERE id LIKE 'curated_%'").fetchone()[0] > 0
+    legacy = f" AND {LEGACY_FILTER}" if hide_legacy else ""
+
+    viewport = f"""
+        SELECT {SITE_LITE_COLUMNS}
+        FROM sites s
+        WHERE s.latitude BETWEEN ? AND ?
+          AND s.longitude BETWEEN ? AND ?
+          {legacy}
+        ORDER BY {RANKED_ORDER}
+        LIMIT ?
+    """
+    # R*Tree boxes are float32 rounded outward, so the exact BETWEEN stays as a recheck
+    viewport_rtree = f"""
+        SELECT {SITE_LITE_COLUMNS}
+        FROM sites_rtree r
+        CROSS JOIN sites s ON s.rowid = r.id
+        WHERE r.max_lat >= ? AND r.min_lat <= ?
+          AND r.max_lon >= ? AND r.min_lon <= ?
+          AND s.latitude BETWEEN ? AND ?
+          AND s.longitude BETWEEN ? AND ?
+          {legacy}
+        ORDER BY {RANKED_ORDER}
+        LIMIT ?
+    """
+    queries = {}
+    for name in VIEWPORT_SPANS:
+        queries[name] = viewport
+        queries[f"{name}_rtree"] = viewport_rtree
+    queries.update({
+        "legacy_check": "SELECT COUNT(*) FROM sites WHERE id LIKE 'curated_%'",
+        "nearby": f"""
+            SELECT *,
+                   (
+                       (latitude - ?) * (latitude - ?) +
+                       (longitude - ?) * (longitude - ?) * COS(? * 0.0174533) * COS(? * 0.0174533)
+                   ) as distance_sq
+            FROM sites s
+            WHERE latitude BETWEEN ? AND ?
+              AND longitude BETWEEN ? AND ?
+              {legacy}
+            ORDER BY distance_sq ASC, {RANKED_ORDER}
+            LIMIT ?
+        """,
+        "site_search": f"""
+            SELECT s.*
+            FROM sites s
+            LEFT JOIN site_aliases sa ON sa.site_id = s.id
+            LEFT JOIN countries c ON c.id = s.country_id
+            LEFT JOIN regions r ON r.id = s.region_id
+            LEFT JOIN areas a ON a.id = s.area_id
+            WHERE (
+                LOWER(s.name) LIKE LOWER(?)
+                OR LOWER(s.location) LIKE LOWER(?)
+                OR LOWER(COALESCE(c.name, '')) LIKE LOWER(?)
+                OR LOWER(COALESCE(r.name, '')) LIKE LOWER(?)
+                OR LOWER(COALESCE(a.name, '')) LIKE LOWER(?)
+                OR LOWER(COALESCE(s.destination_slug, '')) LIKE LOWER(?)
+                OR sa.alias_normalized LIKE ?
+            ){legacy}
+            GROUP BY s.id
+            ORDER BY
+                MAX(
+                    CASE
+                        WHEN LOWER(s.name) = LOWER(?) THEN 900
+                        WHEN sa.alias_normalized = ? THEN 850
+                        WHEN LOWER(s.name) LIKE LOWER(?) THEN 700
+                        WHEN sa.alias_normalized LIKE ? THEN 650
+                        WHEN LOWER(COALESCE(c.name, '')) = LOWER(?) THEN 620
+                        WHEN LOWER(COALESCE(r.name, '')) = LOWER(?) THEN 600
+                        WHEN LOWER(COALESCE(a.name, '')) = LOWER(?) THEN 580
+                        WHEN LOWER(COALESCE(s.destination_slug, '')) LIKE LOWER(?) THEN 500
+                        ELSE 0
+                    END
+                ) DESC,
+                {RANKED_ORDER}
+        """,
+        "fts_search": f"""
+            SELECT {SITE_LITE_COLUMNS},
+                   (
+                       -bm25(sites_fts, 8.0, 6.0, 2.5, 2.0, 1.5, 0.75)
+                       + COALESCE(s.curation_score, 0) * 25.0
+                       + COALESCE(s.popularity_score, 0) * 10.0
+                       + COALESCE(s.visitedCount, 0)
+                       + MAX(
+                            CASE
+                                WHEN LOWER(s.name) = LOWER(?) THEN 200
+                                WHEN sa.alias_normalized = ? THEN 180
+                                WHEN LOWER(COALESCE(s.destination_slug, '')) = LOWER(?) THEN 160
+                                ELSE 0
+                            END
+                         )
+                   ) as weighted_rank
+            FROM sites_fts
+            INNER JOIN sites s ON s.rowid = sites_fts.rowid
+            LEFT JOIN site_aliases sa ON sa.site_id = s.id
+            WHERE sites_fts MATCH ?{legacy}
+            GROUP BY s.id
+            ORDER BY weighted_rank DESC, {RANKED_ORDER}
+            LIMIT ?
+        """,
+        # MATERIALIZED keeps SQLite from flattening bm25() back into the GROUP BY
+        "fts_search_ranked": f"""
+            WITH matches AS MATERIALIZED (
+                SELECT rowid, -bm25(sites_fts, 8.0, 6.0, 2.5, 2.0, 1.5, 0.75) AS text_rank
+                FROM sites_fts
+                WHERE sites_fts MATCH ?
+            )
+            SELECT {SITE_LITE_COLUMNS},
+                   (
+                       m.text_rank
+                       + COALESCE(s.curation_score, 0) * 25.0
+                       + COALESCE(s.popularity_score, 0) * 10.0
+                       + COALESCE(s.visitedCount, 0)
+                       + MAX(
+                            CASE
+                                WHEN LOWER(s.name) = LOWER(?) THEN 200
+                                WHEN sa.alias_normalized = ? THEN 180
+                                WHEN LOWER(COALESCE(s.destination_slug, '')) = LOWER(?) THEN 160
+                                ELSE 0
+                            END
+                         )
+                   ) as weighted_rank
+            FROM matches m
+            INNER JOIN sites s ON s.rowid = m.rowid
+            LEFT JOIN site_aliases sa ON sa.site_id = s.id
+            WHERE 1{legacy}
+            GROUP BY s.id
+            ORDER BY weighted_rank DESC, {RANKED_ORDER}
+            LIMIT ?
+        """,
+        "fts_prefix": f"""
+            SELECT {SITE_LITE_COLUMNS},
+                   (
+                       -bm25(sites_fts, 8.0, 6.0, 2.5, 2.0, 1.5, 0.75)
+                       + COALESCE(s.curation_score, 0) * 25.0
+                       + COALESCE(s.popularity_score, 0) * 10.0
+                       + COALESCE(s.visitedCount, 0)
+                   ) as weighted_rank
+            FROM sites_fts
+            INNER JOIN sites s ON s.rowid = sites_fts.rowid
+            WHERE sites_fts MATCH ?{legacy}
+            ORDER BY weighted_rank DESC, {RANKED_ORDER}
+            LIMIT ?
+        """,
+        "species_search": """
+            SELECT * FROM wildlife_species
+            WHERE name LIKE ? OR scientificName LIKE ?
+            ORDER BY name
+        """,
+        "region_sites": f"""
+            SELECT * FROM sites s
+            WHERE s.region_id = ?{legacy}
+            ORDER BY s.curation_score DESC, s.popularity_score DESC, s.visitedCount DESC, s.name
+        """,
+        "area_sites": f"""
+            SELECT * FROM sites s
+            WHERE s.area_id = ?{legacy}
+            ORDER BY s.curation_score DESC, s.popularity_score DESC, s.visitedCount DESC, s.name
+        """,
+        "region_list": "SELECT * FROM regions WHERE country_id = ? ORDER BY name",
+        "site_detail": "SELECT * FROM sites WHERE id = ?",
+        "site_species": """
+            SELECT s.* FROM wildlife_species s
+            INNER JOIN site_species ss ON s.id = ss.species_id
+            WHERE ss.site_id = ?
+            ORDER BY
+                CASE ss.likelihood
+                    WHEN 'common' THEN 1
+                    WHEN 'occasional' THEN 2
+                    ELSE 3
+                END,
+                s.name
+        """,
+        "site_species_count": "SELECT COUNT(*) FROM site_species WHERE site_id = ?",
+    })
+    return queries
+
+
+def build_params(conn: sqlite3.Connection, rng: random.Random, count: int) -> dict[str, list[tuple]]:
+    """Sample `count` argument tuples per query shape from the database contents."""
+    sites = conn.execute("SELECT id, name, latitude, longitude FROM sites").fetchall()
+    if not sites:
+        raise SystemExit("Database has no sites to benchmark against")
+    region_ids = [r[0] for r in conn.execute("SELECT DISTINCT region_id FROM sites WHERE region_id IS NOT NULL")]
+    area_ids = [r[0] for r in conn.execute("SELECT DISTINCT area_id FROM sites WHERE area_id IS NOT NULL")]
+    country_ids = [r[0] for r in conn.execute("SELECT id FROM countries")]
+    words = sorted({
+        word for _, name, _, _ in sites
+        for word in normalized_search_value(name or "").split() if len(word) >= 3
+    })
+
+    def sample_sites():
+        return [rng.choice(sites) for _ in range(count)]
+
+    params: dict[str, list[tuple]] = {}
+    for name, span in VIEWPORT_SPANS.items():
+        boxes = [(lat - span, lat + span, lon - span, lon + span) for _, _, lat, lon in sample_sites()]
+        params[name] = [box + (500,) for box in boxes]
+        params[f"{name}_rtree"] = [box + box + (500,) for box in boxes]
+
+    params["legacy_check"] = [()] * count
+    nearby = []
+    for _, _, lat, lon in sample_sites():
+        lat_delta = 10 / 111.0
+        lon_delta = 10 / (111.0 * max(math.cos(math.radians(lat)), 0.01))
+        nearby.append((lat, lat, lon, lon, lat, lat,
+                       lat - lat_delta, lat + lat_delta, lon - lon_delta, lon + lon_delta, 50))
+    params["nearby"] = nearby
+
+    search = []
+    for _ in range(count):
+        term = rng.choice(words) if words else "reef"
+        like = f"%{term}%"
+        search.append((like,) * 6 + (f"%{term}%", term, term, like, f"{term}%", term, term, term, like))
+    params["site_search"] = search
+
+    fts = []
+    for _ in range(count):
+        term = rng.choice(words) if words else "reef"
+        fts.append((term, term, term, f"{term} OR {term}*", 50))
+    params["fts_search"] = fts
+    params["fts_search_ranked"] = [(match, name, alias, slug, limit) for name, alias, slug, match, limit in fts]
+    params["fts_prefix"] = [(f"{(rng.choice(words) if words else 'ree')[:3]}*", 20) for _ in range(count)]
+
+    species = [r[0] for r in conn.execute("SELECT name FROM wildlife_species")]
+    species_words = sorted({word for name in species for word in normalized_search_value(name or "").split()
+                            if len(word) >= 3})
+    params["species_search"] = [
+        (f"%{term}%", f"%{term}%") for term in (rng.choice(species_words) for _ in range(count))
+    ] if species_words else []
+
+    params["region_sites"] = [(rng.choice(region_ids),) for _ in range(count)] if region_ids else []
+    params["area_sites"] = [(rng.choice(area_ids),) for _ in range(count)] if area_ids else []
+    params["region_list"] = [(rng.choice(country_ids),) for _ in range(count)] if country_ids else []
+
+    detail = [(site_id,) for site_id, _, _, _ in sample_sites()]
+    params["site_detail"] = detail
+    params["site_species"] = detail
+    params["site_species_count"] = detail
+    return params
+
+
+def unreadable_tables(conn: sqlite3.Connection) -> dict[str, str]:
+    """OPTIONAL_TABLES this database lacks or the local SQLite cannot read, with the reason."""
+    reasons = {}
+    for table in OPTIONAL_TABLES:
+        try:
+            conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchall()
+        except sqlite3.OperationalError as e:
+            reasons[table] = str(e)
+    return reasons
+
+
+def query_plan(conn: sqlite3.Connection, sql: str, args: tuple) -> list[str]:
+    return [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", args)]
+
+
+def run_shape(conn: sqlite3.Connection, sql: str, params: list[tuple], warmup: int) -> dict:
+    """Time each execution (execute + fetchall) and summarize the latencies."""
+    for args in params[:warmup]:
+        conn.execute(sql, args).fetchall()
+
+    timings = []
+    rows = 0
+    for args in params:
+        start = time.perf_counter()
+        result = conn.execute(sql, args).fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+        rows += len(result)
+
+    timings.sort()
+    summary = {
+        "runs": len(timings),
+        "mean_ms": round(sum(timings) / len(timings), 4),
+        "max_ms": round(timings[-1], 4),
+        "avg_rows": round(rows / len(timings), 1),
+        "plan": query_plan(conn, sql, params[0]),
+    }
+    for pct in PERCENTILES:
+        summary[f"p{pct}_ms"] = round(percentile(timings, pct), 4)
+    return summary
+
+
+def scaled_copy(db_path: Path, target_sites: int, directory: Path) -> Path:
+    """Copy the database and add jittered duplicates of its sites until it holds target_sites.
+
+    Inserts go through the schema's triggers, so the FTS index covers the
+    synthetic sites as well. A sites_rtree R*Tree (points as zero-size boxes
+    keyed by rowid) is then built over every site for the *_rtree shapes.
+    """
+    copy = directory / db_path.name
+    shutil.copyfile(db_path, copy)
+    conn = sqlite3.connect(copy)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(sites)")]
+    sites = conn.execute("SELECT * FROM sites").fetchall()
+    id_index, lat_index, lon_index = (columns.index(c) for c in ("id", "latitude", "longitude"))
+    rng = random.Random(RANDOM_SEED)
+    rows = []
+    for n in range(max(0, target_sites - len(sites))):
+        row = list(sites[n % len(sites)])
+        row[id_index] = f"{row[id_index]}_scaled_{n}"
+        row[lat_index] = max(-90.0, min(90.0, row[lat_index] + rng.uniform(-SCALE_JITTER_DEG, SCALE_JITTER_DEG)))
+        row[lon_index] = max(-180.0, min(180.0, row[lon_index] + rng.uniform(-SCALE_JITTER_DEG, SCALE_JITTER_DEG)))
+        rows.append(row)
+    conn.executemany(f"INSERT INTO sites ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows)
+    conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS sites_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)")
+    conn.execute("DELETE FROM sites_rtree")
+    conn.execute("INSERT INTO sites_rtree SELECT rowid, latitude, latitude, longitude, longitude FROM sites")
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+    return copy
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Shapes whose p95 regressed beyond the threshold or that started failing, as printable lines."""
+    regressions = []
+    for name, result in current["queries"].items():
+        previous = baseline.get("queries", {}).get(name)
+        if "error" in result:
+            if name not in EXPECTED_FAILURES and not (previous and "error" in previous):
+                regressions.append(f"{name}: now fails ({result['error']})")
+            continue
+        if not previous or "p95_ms" not in previous or "p95_ms" not in result:
+            continue
+        before, after = previous["p95_ms"], result["p95_ms"]
+        if after > before * (1 + threshold) and after - before > MIN_REGRESSION_MS:
+            regressions.append(f"{name}: p95 {before:.3f}ms -> {after:.3f}ms (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark app query latency against the seed database")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB, help="Seed database (default: %(default)s)")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS,
+                        help="Timed runs per query shape (default: %(default)s)")
+    parser.add_argument("--output", type=Path,
+                        help=f"Where to write results JSON (default: {DEFAULT_OUTPUT}, "
+                             "or seed_db_benchmark_<SITES>.json beside it with --scale)")
+    parser.add_argument("--baseline", type=Path,
+                        help="Results JSON to compare against (default: the existing --output file)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Fractional p95 increase reported as a regression (default: %(default)s)")
+    parser.add_argument("--only", nargs="+", metavar="SHAPE", help="Run only these query shapes")
+    parser.add_argument("--scale", type=int, metavar="SITES",
+                        help="Benchmark a temporary copy grown to this many sites")
+    args = parser.parse_args()
+
+    if not args.db.exists():
+        log(f"Error: {args.db} not found (run scripts/generate_seed_db.py)")
+        return 1
+
+    if args.output is None:
+        args.output = (DEFAULT_OUTPUT.with_name(f"{DEFAULT_OUTPUT.stem}_{args.scale}{DEFAULT_OUTPUT.suffix}")
+                       if args.scale else DEFAULT_OUTPUT)
+    baseline_path = args.baseline or (args.output if args.output.exists() else None)
+    baseline = None
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+
+    db_path = args.db
+    scratch = None
+    if args.scale:
+        scratch = tempfile.TemporaryDirectory()
+        log(f"Growing a copy of {args.db} to {args.scale} sites...")
+        try:
+            db_path = scaled_copy(args.db, args.scale, Path(scratch.name))
+        except sqlite3.OperationalError as e:
+            log(f"Error: cannot insert into this database with SQLite {sqlite3.sqlite_version}: {e}")
+            return 1
+
+    # Read-only so the benchmark never touches the bundled database or its WAL
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    queries = build_queries(conn)
+    unreadable = unreadable_tables(conn)
+    params = build_params(conn, random.Random(RANDOM_SEED), args.iterations + WARMUP_ITERATIONS)
+
+    results = {
+        "generated_at": datetime.now().isoformat(),
+        "db": str(args.db),
+        "db_size_bytes": db_path.stat().st_size,
+        "scaled_to": args.scale,
+        "sqlite_version": sqlite3.sqlite_version,
+        "iterations": args.iterations,
+        "site_count": conn.execute("SELECT COUNT(*) FROM sites").fetchone()[0],
+        "queries": {},
+    }
+
+    log(f"Benchmarking {args.db} ({results['site_count']} sites, SQLite {sqlite3.sqlite_version})")
+    log(f"\n{'query':<24} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'rows':>8}")
+    for name, sql in queries.items():
+        if args.only and name not in args.only:
+            continue
+        shape_params = params.get(name)
+        if not shape_params:
+            log(f"{name:<24} skipped (no parameters in this database)")
+            continue
+        missing = [table for table in unreadable if table in sql]
+        if missing:
+            reason = f"{missing[0]}: {unreadable[missing[0]]}"
+            results["queries"][name] = {"skipped": reason}
+            log(f"{name:<24} skipped ({reason})")
+            continue
+        try:
+            summary = run_shape(conn, sql, shape_params, WARMUP_ITERATIONS)
+        except sqlite3.Error as e:
+            results["queries"][name] = {"error": str(e)}
+            if name in EXPECTED_FAILURES:
+                results["queries"][name]["expected"] = EXPECTED_FAILURES[name]
+                log(f"{name:<24} failed as expected: {e}")
+            else:
+                log(f"{name:<24} failed: {e}")
+            continue
+        results["queries"][name] = summary
+        log(f"{name:<24} {summary['p50_ms']:>9.3f} {summary['p95_ms']:>9.3f} "
+            f"{summary['p99_ms']:>9.3f} {summary['max_ms']:>9.3f} {summary['avg_rows']:>8}")
+    conn.close()
+    if scratch:
+        scratch.cleanup()
+
+    speedups = [
+        (name, results["queries"][name]["p50_ms"] / results["queries"][f"{name}_rtree"]["p50_ms"])
+        for name in VIEWPORT_SPANS
+        if "p50_ms" in results["queries"].get(name, {}) and "p50_ms" in results["queries"].get(f"{name}_rtree", {})
+    ]
+    if speedups:
+        log("\nR*Tree vs B-tree viewport (p50): " + ", ".join(f"{name} {ratio:.1f}x" for name, ratio in speedups))
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    log(f"\nResults written to {args.output}")
+
+    failed = [name for name, result in results["queries"].items() if "error" in result]
+    unexpected = [name for name in failed if name not in EXPECTED_FAILURES]
+    if failed:
+        log(f"\nFailed shapes: {', '.join(failed)}"
+            + (f" ({len(failed) - len(unexpected)} expected)" if len(unexpected) < len(failed) else ""))
+
+    if baseline is None:
+        return 1 if unexpected else 0
+    mismatched = [key for key in ("scaled_to", "site_count") if baseline.get(key) != results[key]]
+    if mismatched:
+        log(f"Not comparing with {baseline_path}: "
+            + ", ".join(f"{key} {baseline.get(key)} there vs {results[key]} here" for key in mismatched))
+        return 1 if unexpected else 0
+    regressions = compare(results, baseline, args.threshold)
+    log(f"Compared with {baseline_path} ({baseline.get('generated_at', 'unknown date')}), "
+        f"threshold +{args.threshold * 100:.0f}% p95")
+    if regressions:
+        log("\nRegressions:")
+        for line in regressions:
+            log(f"  {line}")
+        return 1
+    log("  No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,14 +2,51 @@
 """
 Benchmark script for tile-based seeding performance.
 Measures load times, memory footprint, and query performance.
+
+Usage:
+    python3 scripts/benchmark_seeding.py
+    python3 scripts/benchmark_seeding.py --memory [--top 10] [--output memory.json]
+
+--memory profiles each pipeline stage (JSON and binary tile load, seed DB
+build, FTS build, VACUUM) instead of timing it: tracemalloc records peak
+and retained Python allocations plus the top allocation sites, and a
+sampler thread records peak and steady-state RSS. RSS also covers SQLite's
+own page cache and sort buffers, which tracemalloc cannot see.
 """
 
+import argparse
+import gc
 import json
+import os
+import sqlite3
+import tempfile
+import threading
 import time
+import tracemalloc
 import sys
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
 
+try:
+    from tile_format import TileReader
+    HAS_TILE_FORMAT = True
+except ImportError:
+    HAS_TILE_FORMAT = False
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+import generate_seed_db
+
+RSS_SAMPLE_INTERVAL = 0.005  # seconds between RSS samples while a stage runs
+# Snapshot again once traced memory exceeds the last snapshot by this factor
+PEAK_SNAPSHOT_GROWTH = 1.25
+PEAK_SNAPSHOT_MIN_BYTES = 256 * 1024
+
 class BenchmarkResults:
     """Container for benchmark metrics"""
     def __init__(self):
@@ -54,6 +91,205 @@ class BenchmarkResults:
                 print(f"\n📊 {name}")
                 print(f"   💾 {data['value']} {data.get('unit', '')}")
 
+def current_rss():
+    """Resident set size of this process in bytes, or None where it cannot be read"""
+    if HAS_PSUTIL:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+class StageSampler(threading.Thread):
+    """Background thread tracking the highest RSS seen until stop()
+
+    Also keeps a tracemalloc snapshot taken close to the traced peak, so
+    allocations freed before the stage ends can still be attributed.
+    """
+    def __init__(self, take_snapshot, interval=RSS_SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = current_rss()
+        self.take_snapshot = take_snapshot
+        self.peak_snapshot = None
+        self._snapshot_at = tracemalloc.get_traced_memory()[0] + PEAK_SNAPSHOT_MIN_BYTES
+        self._done = threading.Event()
+    
+    def run(self):
+        while not self._done.wait(self.interval):
+            rss = current_rss()
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+            traced = tracemalloc.get_traced_memory()[0]
+            if traced > self._snapshot_at:
+                self.peak_snapshot = self.take_snapshot()
+                self._snapshot_at = traced * PEAK_SNAPSHOT_GROWTH
+    
+    def stop(self):
+        self._done.set()
+        self.join()
+        rss = current_rss()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+        return self.peak
+
+class MemoryProfiler:
+    """Per-stage peak and steady-state memory from tracemalloc and RSS sampling"""
+    # Allocations made by the profiler itself
+    IGNORED_FILES = (__file__, tracemalloc.__file__, threading.__file__, "<frozen importlib._bootstrap>",
+                     "<frozen importlib._bootstrap_external>", "<unknown>")
+    
+    def __init__(self, top=10):
+        self.top = top
+        self.stages = {}
+    
+    @contextmanager
+    def stage(self, name):
+        """Profile the enclosed block; results stay alive until the block exits"""
+        gc.collect()
+        rss_before = current_rss()
+        traced_before = tracemalloc.get_traced_memory()[0]
+        snapshot_before = self._snapshot()
+        tracemalloc.reset_peak()
+        sampler = StageSampler(self._snapshot)
+        sampler.start()
+        start = time.time()
+        try:
+            yield
+        finally:
+            elapsed = time.time() - start
+            rss_peak = sampler.stop()
+            traced_peak = tracemalloc.get_traced_memory()[1]
+            gc.collect()
+            traced_after = tracemalloc.get_traced_memory()[0]
+            rss_after = current_rss()
+            retained = self._snapshot().compare_to(snapshot_before, "lineno")
+            peak = sampler.peak_snapshot.compare_to(snapshot_before, "lineno") if sampler.peak_snapshot else []
+            self.stages[name] = {
+                'time_ms': round(elapsed * 1000, 2),
+                'traced_peak_mb': _mb(traced_peak - traced_before),
+                'traced_retained_mb': _mb(traced_after - traced_before),
+                'rss_peak_mb': _mb(rss_peak - rss_before) if rss_before is not None else None,
+                'rss_retained_mb': _mb(rss_after - rss_before) if rss_before is not None else None,
+                'rss_mb': _mb(rss_after) if rss_after is not None else None,
+                'peak_allocations': self._top_sites(peak),
+                'retained_allocations': self._top_sites(retained),
+            }
+    
+    def _top_sites(self, stats):
+        return [
+            {
+                'site': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                'size_kb': round(stat.size_diff / 1024, 1),
+                'count': stat.count_diff,
+            }
+            for stat in stats if stat.size_diff > 0
+        ][:self.top]
+    
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, pattern) for pattern in self.IGNORED_FILES]
+        )
+    
+    def print_summary(self):
+        """Print per-stage memory and the allocation sites each stage retained"""
+        print("\n" + "="*60)
+        print("MEMORY PROFILE".center(60))
+        print("="*60)
+        print(f"\n{'stage':<20} {'time ms':>9} {'py peak':>9} {'py kept':>9} {'rss peak':>9} {'rss kept':>9}")
+        for name, data in self.stages.items():
+            rss = [f"{data[k]:>9.2f}" if data[k] is not None else f"{'n/a':>9}"
+                   for k in ('rss_peak_mb', 'rss_retained_mb')]
+            print(f"{name:<20} {data['time_ms']:>9.1f} {data['traced_peak_mb']:>9.2f} "
+                  f"{data['traced_retained_mb']:>9.2f} {rss[0]} {rss[1]}")
+        print("   (MB above the level before each stage; 'kept' is after the stage and gc;")
+        print("    times include tracemalloc overhead)")
+        
+        for name, data in self.stages.items():
+            for kind in ('peak', 'retained'):
+                entries = data[f'{kind}_allocations']
+                if not entries:
+                    continue
+                print(f"\n📍 Top allocation sites: {name} ({kind})")
+                for entry in entries:
+                    print(f"   {entry['size_kb']:>10.1f} KB {entry['count']:>8} blocks  {entry['site']}")
+
+def _mb(size_bytes):
+    return round(size_bytes / (1024 * 1024), 2)
+
+def load_json_tiles(tiles_dir):
+    """Load every regional JSON tile; returns the combined site list"""
+    with open(tiles_dir / "manifest.json") as f:
+        manifest = json.load(f)
+    sites = []
+    for tile_info in manifest['tiles']:
+        with open(tiles_dir / tile_info['name']) as f:
+            sites.extend(json.load(f)['sites'])
+    return sites
+
+def profile_memory(top=10, output=None):
+    """Profile memory for each seeding pipeline stage"""
+    print("\n🧪 Profiling memory per pipeline stage...")
+    if not HAS_PSUTIL and current_rss() is None:
+        print("  ⚠️  RSS unavailable (install psutil); reporting tracemalloc only")
+    
+    tiles_dir = Path("Resources/SeedData/optimized/tiles")
+    profiler = MemoryProfiler(top=top)
+    tracemalloc.start()
+    try:
+        if (tiles_dir / "manifest.json").exists():
+            with profiler.stage("tile_load"):
+                load_json_tiles(tiles_dir)
+            
+            binary_tiles = sorted(tiles_dir.glob("*.umt"))
+            if HAS_TILE_FORMAT and binary_tiles:
+                with profiler.stage("binary_tile_load"):
+                    records = []
+                    for path in binary_tiles:
+                        with TileReader(path) as reader:
+                            records.extend(reader.records())
+                del records
+        else:
+            print(f"  ⚠️  No tiles in {tiles_dir}; skipping tile stages")
+        
+        # Same stage order as generate_seed_db.main(), into a scratch database
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = Path(tmp) / "umilog_seed.db"
+            conn = sqlite3.connect(str(db_path))
+            try:
+                conn.execute("PRAGMA foreign_keys = ON")
+                generate_seed_db.apply_pragmas(conn, generate_seed_db.BULK_LOAD_PRAGMAS)
+                with profiler.stage("seed_db_build"):
+                    deferred = []
+                    generate_seed_db.create_schema(conn, deferred)
+                    generate_seed_db.seed_stages(conn, list(generate_seed_db.SEED_STAGES))
+                    generate_seed_db.create_deferred_schema(conn, deferred)
+                with profiler.stage("fts_build"):
+                    generate_seed_db.build_fts_indexes(conn)
+                with profiler.stage("vacuum"):
+                    generate_seed_db.apply_pragmas(conn, generate_seed_db.APP_PRAGMAS)
+                    generate_seed_db.vacuum_database(conn, db_path)
+            except sqlite3.OperationalError as e:
+                # The seed schema needs SQLite 3.43+ (contentless_delete FTS tables)
+                print(f"  ⚠️  Seed DB stages skipped: {e}")
+            finally:
+                conn.close()
+    finally:
+        tracemalloc.stop()
+    
+    profiler.print_summary()
+    if output:
+        report = {
+            'generated_at': datetime.now().isoformat(),
+            'rss_source': 'psutil' if HAS_PSUTIL else ('/proc/self/statm' if current_rss() else None),
+            'stages': profiler.stages,
+        }
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Memory profile written to {output}")
+    return profiler
+
 def benchmark_manifest_loading():
     """Benchmark manifest loading"""
     results = BenchmarkResults()
@@ -128,6 +364,51 @@ def benchmark_tile_loading():
     
     return results
 
+def benchmark_binary_tile_loading():
+    """Benchmark memory-mapped binary tiles against JSON parsing"""
+    results = BenchmarkResults()
+    
+    print("\n🧪 Benchmarking binary tile loading...")
+    tiles_dir = Path("Resources/SeedData/optimized/tiles")
+    
+    with open(tiles_dir / "manifest.json") as f:
+        manifest = json.load(f)
+    
+    binary_tiles = [t for t in manifest['tiles'] if t.get('binary')]
+    if not HAS_TILE_FORMAT or not binary_tiles:
+        print("  ⚠️  No binary tiles (needs numpy and tiles from optimize_dataset.py); skipping")
+        return results
+    
+    json_time = 0
+    coords_time = 0
+    records_time = 0
+    total_sites = 0
+    for tile_info in binary_tiles:
+        start = time.time()
+        with open(tiles_dir / tile_info['name']) as f:
+            json.load(f)
+        json_time += time.time() - start
+        
+        start = time.time()
+        with TileReader(tiles_dir / tile_info['binary']) as reader:
+            lats, lons = reader.coordinates()
+        coords_time += time.time() - start
+        total_sites += len(lats)
+        
+        start = time.time()
+        with TileReader(tiles_dir / tile_info['binary']) as reader:
+            reader.records()
+        records_time += time.time() - start
+    
+    results.add_metric("json_parse_time", f"{json_time * 1000:.2f}", "ms")
+    results.add_metric("binary_coordinates_time", f"{coords_time * 1000:.2f}", "ms")
+    results.add_metric("binary_records_time", f"{records_time * 1000:.2f}", "ms")
+    results.add_metric("binary_sites", total_sites, "sites")
+    if coords_time > 0:
+        results.add_metric("coordinate_speedup", f"{json_time / coords_time:.0f}", "x vs json.load")
+    
+    return results
+
 def benchmark_coordinate_operations():
     """Benchmark coordinate validation and spatial operations"""
     results = BenchmarkResults()
@@ -169,7 +450,7 @@ def benchmark_coordinate_operations():
     return results
 
 def benchmark_memory_footprint():
-    """Estimate memory footprint of full dataset"""
+    """Measure memory footprint of the full dataset once loaded"""
     results = BenchmarkResults()
     
     print("\n🧪 Benchmarking memory footprint...")
@@ -181,18 +462,20 @@ def benchmark_memory_footprint():
         if json_file.name != "manifest.json":
             total_size += json_file.stat().st_size
     
-    # Each site in memory (rough estimate)
-    # ~300 bytes per site object (id, name, coords, metadata)
-    with open(tiles_dir / "manifest.json") as f:
-        manifest = json.load(f)
-    
-    total_sites = manifest['summary']['total_sites']
-    estimated_memory_per_site = 300  # bytes
-    estimated_total_memory = (total_sites * estimated_memory_per_site) / (1024 * 1024)  # MB
+    profiler = MemoryProfiler(top=0)
+    tracemalloc.start()
+    try:
+        with profiler.stage("tile_load"):
+            sites = load_json_tiles(tiles_dir)
+    finally:
+        tracemalloc.stop()
+    measured = profiler.stages["tile_load"]
+    retained_bytes = measured['traced_retained_mb'] * 1024 * 1024
     
     results.add_metric("uncompressed_size", f"{total_size / (1024 * 1024):.2f}", "MB")
-    results.add_metric("estimated_memory_footprint", f"{estimated_memory_per_site * total_sites / 1024:.1f}", "KB (total for all sites)")
-    results.add_metric("estimated_total_memory", f"{estimated_total_memory:.2f}", "MB (with overhead)")
+    results.add_metric("measured_memory_per_site", f"{retained_bytes / max(len(sites), 1):.0f}", "bytes")
+    results.add_metric("measured_total_memory", f"{measured['traced_retained_mb']:.2f}", "MB (Python objects, all sites)")
+    results.add_metric("peak_load_memory", f"{measured['traced_peak_mb']:.2f}", "MB (while parsing)")
     
     return results
 
@@ -247,15 +530,28 @@ def benchmark_full_sequence():
 
 def main():
     """Run all benchmarks"""
+    parser = argparse.ArgumentParser(description="Benchmark tile-based seeding performance")
+    parser.add_argument("--memory", action="store_true",
+                        help="Profile peak and steady-state memory per pipeline stage instead")
+    parser.add_argument("--top", type=int, default=10,
+                        help="Allocation sites to list per stage with --memory (default: %(default)s)")
+    parser.add_argument("--output", type=Path, help="Write the --memory profile as JSON")
+    args = parser.parse_args()
+    
     print(f"🚀 Starting benchmark suite at {datetime.now().isoformat()}")
     print(f"📂 Working directory: {Path.cwd()}")
     
+    if args.memory:
+        profile_memory(top=args.top, output=args.output)
+        return 0
+    
     all_results = []
     
     try:
         # Run all benchmarks
         all_results.append(("Manifest Loading", benchmark_manifest_loading()))
         all_results.append(("Tile Loading", benchmark_tile_loading()))
+        all_results.append(("Binary Tile Loading", benchmark_binary_tile_loading()))
         all_results.append(("Coordinate Operations", benchmark_coordinate_operations()))
         all_results.append(("Memory Footprint", benchmark_memory_footprint()))
         all_results.append(("Full Sequence", benchmark_full_sequence()))
@@ -275,7 +571,7 @@ def main():
         print("="*60)
         print("\n✅ All performance targets met:")
         print("   • Cold start < 2s: Data loads in <200ms")
-        print("   • Memory < 100MB: Estimated ~2MB per full dataset")
+        print("   • Memory < 100MB: see measured_total_memory above")
         print("   • Throughput: 5000+ sites/second")
         print("   • Coordinate validation: 0 invalid entries")
         print("\n🎯 Production readiness: APPROVED")
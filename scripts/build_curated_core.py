@@ -16,12 +16,14 @@ Outputs:
 from __future__ import annotations
 
 import json
-import math
 import re
+from collections import defaultdict
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
+from geo_utils import close_pairs
+
 ROOT = Path(__file__).resolve().parents[1]
 SEED_DIR = ROOT / "Resources" / "SeedData"
 CURATION_DIR = SEED_DIR / "curation"
@@ -102,16 +104,6 @@ def in_bounds(site: dict[str, Any], bounds: dict[str, float] | None) -> bool:
     )
 
 
-def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    r = 6371.0
-    p1 = math.radians(lat1)
-    p2 = math.radians(lat2)
-    dp = math.radians(lat2 - lat1)
-    dl = math.radians(lon2 - lon1)
-    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
-    return 2 * r * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-
-
 def is_generic_wreck(name: str) -> bool:
     return any(pattern.search(name) for pattern in GENERIC_WRECK_PATTERNS)
 
@@ -295,21 +287,31 @@ def build_areas(destinations: list[dict[str, Any]]) -> dict[str, Any]:
 
 
 def find_duplicate_clusters(records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    by_name: dict[str, list[int]] = defaultdict(list)
+    for index, record in enumerate(records):
+        by_name[normalize(record["name"])].append(index)
+
+    pairs: list[tuple[int, int, float]] = []
+    for indices in by_name.values():
+        if len(indices) < 2:
+            continue
+        lats = [records[index]["latitude"] for index in indices]
+        lons = [records[index]["longitude"] for index in indices]
+        for i, j, distance in close_pairs(lats, lons, 1.0):
+            pairs.append((indices[i], indices[j], distance))
+
     duplicates: list[dict[str, Any]] = []
-    for index, left in enumerate(records):
-        for right in records[index + 1 :]:
-            if normalize(left["name"]) != normalize(right["name"]):
-                continue
-            distance = haversine_km(left["latitude"], left["longitude"], right["latitude"], right["longitude"])
-            if distance <= 1.0:
-                duplicates.append(
-                    {
-                        "name": left["name"],
-                        "left_id": left["id"],
-                        "right_id": right["id"],
-                        "distance_km": round(distance, 3),
-                    }
-                )
+    for left_index, right_index, distance in sorted(pairs):
+        left = records[left_index]
+        right = records[right_index]
+        duplicates.append(
+            {
+                "name": left["name"],
+                "left_id": left["id"],
+                "right_id": right["id"],
+                "distance_km": round(distance, 3),
+            }
+        )
     return duplicates
 
 
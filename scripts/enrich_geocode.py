@@ -17,14 +17,14 @@ from __future__ import annotations
 import argparse
 import json
 import re
-import time
+import sys
 from datetime import datetime, timezone
 from pathlib import Path
 
-import urllib.request
-import urllib.parse
-
 ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "data" / "scripts"))
+from http_cache import cached_get_json  # noqa: E402
+
 SEED_DATA = ROOT / "Resources" / "SeedData"
 STAGE_DIR = ROOT / "data" / "stage"
 INPUT_PATH = SEED_DATA / "canonical_site_list.json"
@@ -70,11 +70,9 @@ def nominatim_search(query: str, bounds: dict | None, country: str | None) -> di
         params["viewbox"] = f"{bounds['min_lon']},{bounds['max_lat']},{bounds['max_lon']},{bounds['min_lat']}"
         params["bounded"] = "1"
 
-    url = f"{NOMINATIM_URL}?{urllib.parse.urlencode(params)}"
-    req = urllib.request.Request(url, headers=HEADERS)
     try:
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            results = json.loads(resp.read().decode())
+        # Cached responses skip the rate-limit delay
+        results = cached_get_json(NOMINATIM_URL, params, headers=HEADERS, timeout=10, delay=RATE_LIMIT_S)
         return results[0] if results else None
     except Exception as e:
         print(f"    Nominatim error: {e}")
@@ -95,7 +93,6 @@ def geocode_site(site: dict, region: dict) -> dict | None:
 
     for q in queries:
         result = nominatim_search(q, bounds, country)
-        time.sleep(RATE_LIMIT_S)
         if result:
             lat = float(result["lat"])
             lon = float(result["lon"])
@@ -104,7 +101,6 @@ def geocode_site(site: dict, region: dict) -> dict | None:
         # Try without bounds on second attempt
         if bounds:
             result = nominatim_search(q, None, country)
-            time.sleep(RATE_LIMIT_S)
             if result:
                 lat = float(result["lat"])
                 lon = float(result["lon"])
@@ -6,18 +6,43 @@ This script creates a ready-to-use database with all seed data pre-loaded,
 eliminating the need for JSON parsing and individual inserts at runtime.
 
 Usage:
-    python3 scripts/generate_seed_db.py [output_path]
+    python3 scripts/generate_seed_db.py [output_path] [--incremental]
+
+With --incremental, an existing database is updated in place: only the
+tables whose SeedData inputs changed since the last build (plus the tables
+that depend on them) are cleared and reseeded.
 
 Output:
     Resources/SeedDB/umilog_seed.db (default)
+
+Large record arrays (sites, species, site-species links, media) are streamed
+into SQLite in bounded batches. A SeedData/<name>.jsonl file with one record
+per line takes precedence over <name>.json; .json arrays are parsed
+incrementally when ijson is installed (pip install ijson) and loaded whole
+otherwise.
 """
 
+import argparse
+import hashlib
 import json
+import math
 import os
 import sqlite3
-import sys
 from datetime import datetime
 from pathlib import Path
+from typing import Iterable, Iterator
+
+try:
+    import ijson
+    HAS_IJSON = True
+except ImportError:
+    HAS_IJSON = False
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
 
 # Project paths
 PROJECT_ROOT = Path(__file__).parent.parent
@@ -25,6 +50,73 @@ SEED_DATA_DIR = PROJECT_ROOT / "Resources" / "SeedData"
 OUTPUT_DIR = PROJECT_ROOT / "Resources" / "SeedDB"
 DEFAULT_OUTPUT = OUTPUT_DIR / "umilog_seed.db"
 
+# Connection settings while bulk loading a fresh database: no durability, large page cache.
+# MEMORY (not OFF) journaling keeps ROLLBACK working for failed quality gates.
+BULK_LOAD_PRAGMAS = [
+    ("journal_mode", "MEMORY"),
+    ("synchronous", "OFF"),
+    ("cache_size", -262144),  # 256 MiB
+    ("temp_store", "MEMORY"),
+]
+
+# App-facing settings restored before VACUUM (WAL is persisted in the file header)
+APP_PRAGMAS = [
+    ("journal_mode", "WAL"),
+    ("synchronous", "FULL"),
+    ("cache_size", -2000),
+    ("temp_store", "DEFAULT"),
+]
+
+# Rows buffered per executemany call when streaming records into SQLite
+INSERT_BATCH_SIZE = 5000
+
+# Key under which the generator's own hash is recorded; a change forces a full rebuild
+GENERATOR_INPUT = "generate_seed_db.py"
+
+# Seed stages in dependency order: stage -> (SeedData inputs, tables written, upstream stages).
+# Rebuilding a stage clears its tables, so every stage downstream of it is rebuilt too.
+SEED_STAGES = {
+    "countries": (["countries"], ["countries"], []),
+    "region_groups": (["region_groups"], ["region_groups"], []),
+    "regions": (["regions", "regions_enriched"], ["regions"], ["countries", "region_groups"]),
+    "areas": (["areas"], ["areas"], ["countries", "regions"]),
+    "species_families": (["families_catalog"], ["species_families"], []),
+    "sites": (["curated_core_sites"], ["sites", "site_aliases"], []),
+    "species": (
+        [
+            "species_catalog_full",
+            "species_catalog_v2",
+            "species_catalog",
+            "species_descriptions_enhanced",
+            "species_images_inaturalist",
+            "species_images_wikimedia",
+        ],
+        ["wildlife_species"],
+        [],
+    ),
+    "site_species": (
+        ["species_catalog_full", "species_catalog_v2", "site_species", "curated_core_sites"],
+        ["site_species"],
+        ["sites", "species"],
+    ),
+    "site_media": (["site_media"], ["site_media"], ["sites"]),
+    "heatmap_grids": ([], ["heatmap_cells"], ["sites"]),
+    "site_clusters": ([], ["site_clusters"], ["sites"]),
+}
+
+# Map zoom levels with a precomputed heatmap grid; the client uses the nearest
+# level at or below its zoom. Each grid has 2**(zoom + HEATMAP_CELL_BITS)
+# Web Mercator cells per axis, i.e. 32x32 cells per 256px map tile.
+HEATMAP_ZOOMS = (0, 2, 4, 6, 8, 10)
+HEATMAP_CELL_BITS = 5
+MAX_MERCATOR_LAT = 85.05112878
+
+# Marker clustering, mirroring MapTheme.Clustering and MapLibre's supercluster
+# defaults (512px tiles); zooms above CLUSTER_MAX_ZOOM show individual sites.
+CLUSTER_RADIUS_PX = 80
+CLUSTER_MAX_ZOOM = 12
+CLUSTER_TILE_PX = 512
+
 
 def log(msg: str):
     """Print timestamped log message."""
@@ -41,10 +133,86 @@ def load_json(filename: str) -> dict | list | None:
         return json.load(f)
 
 
-def create_schema(conn: sqlite3.Connection):
-    """Create database schema matching iOS app migrations v1-v10."""
+def seed_data_path(filename: str) -> Path | None:
+    """Path of a SeedData input, preferring <name>.jsonl over <name>.json."""
+    for suffix in (".jsonl", ".json"):
+        path = SEED_DATA_DIR / f"{filename}{suffix}"
+        if path.exists():
+            return path
+    return None
+
+
+def iter_json_items(filename: str, key: str) -> Iterator[dict]:
+    """Stream the records of a SeedData array without loading the whole file.
+
+    Reads one record per line from <name>.jsonl, or the `key` array of
+    <name>.json (incrementally when ijson is available).
+    """
+    path = seed_data_path(filename)
+    if path is None:
+        log(f"  Warning: {filename}.json not found")
+        return
+    if path.suffix == ".jsonl":
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif HAS_IJSON:
+        with open(path, "rb") as f:
+            yield from ijson.items(f, f"{key}.item", use_float=True)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        yield from data.get(key, [])
+
+
+def iter_json_mapping(filename: str, key: str) -> Iterator[tuple[str, dict]]:
+    """Stream (id, entry) pairs from the `key` object of SeedData/<name>.json."""
+    path = SEED_DATA_DIR / f"{filename}.json"
+    if not path.exists():
+        log(f"  Warning: {filename}.json not found")
+        return
+    if HAS_IJSON:
+        with open(path, "rb") as f:
+            yield from ijson.kvitems(f, key, use_float=True)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        yield from data.get(key, {}).items()
+
+
+def insert_batched(conn: sqlite3.Connection, sql: str, rows: Iterable[tuple]) -> int:
+    """executemany over `rows` in INSERT_BATCH_SIZE chunks. Returns rows sent."""
+    cursor = conn.cursor()
+    batch = []
+    total = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= INSERT_BATCH_SIZE:
+            cursor.executemany(sql, batch)
+            total += len(batch)
+            batch.clear()
+    if batch:
+        cursor.executemany(sql, batch)
+        total += len(batch)
+    return total
+
+
+def create_schema(conn: sqlite3.Connection, deferred: list[str] | None = None):
+    """Create database schema matching iOS app migrations v1-v10.
+
+    When `deferred` is given, index and FTS trigger DDL is appended to it
+    instead of executed, so tables can be bulk loaded first and the
+    statements run once afterwards via create_deferred_schema().
+    """
     cursor = conn.cursor()
 
+    def execute_deferrable(sql: str):
+        if deferred is None:
+            cursor.execute(sql)
+        else:
+            deferred.append(sql)
+
     # GRDB migration tracking table - must be created first
     # This tells GRDB which migrations have already been applied
     cursor.execute("""
@@ -93,19 +261,19 @@ def create_schema(conn: sqlite3.Connection):
     """)
 
     # Sites indexes
-    cursor.execute("CREATE INDEX idx_sites_location ON sites(latitude, longitude)")
-    cursor.execute("CREATE INDEX idx_sites_region ON sites(region)")
-    cursor.execute("CREATE INDEX idx_sites_wishlist ON sites(wishlist)")
-    cursor.execute("CREATE INDEX idx_sites_difficulty ON sites(difficulty)")
-    cursor.execute("CREATE INDEX idx_sites_type ON sites(type)")
-    cursor.execute("CREATE INDEX idx_sites_lat_lon ON sites(latitude, longitude)")
-    cursor.execute("CREATE INDEX idx_sites_country ON sites(country_id)")
-    cursor.execute("CREATE INDEX idx_sites_region_id ON sites(region_id)")
-    cursor.execute("CREATE INDEX idx_sites_area_id ON sites(area_id)")
-    cursor.execute("CREATE INDEX idx_sites_planned ON sites(isPlanned)")
-    cursor.execute("CREATE INDEX idx_sites_curation ON sites(curation_score, popularity_score)")
-    cursor.execute("CREATE INDEX idx_sites_destination_slug ON sites(destination_slug)")
-    cursor.execute("CREATE INDEX idx_sites_wreck_verified ON sites(wreck_verified)")
+    execute_deferrable("CREATE INDEX idx_sites_location ON sites(latitude, longitude)")
+    execute_deferrable("CREATE INDEX idx_sites_region ON sites(region)")
+    execute_deferrable("CREATE INDEX idx_sites_wishlist ON sites(wishlist)")
+    execute_deferrable("CREATE INDEX idx_sites_difficulty ON sites(difficulty)")
+    execute_deferrable("CREATE INDEX idx_sites_type ON sites(type)")
+    execute_deferrable("CREATE INDEX idx_sites_lat_lon ON sites(latitude, longitude)")
+    execute_deferrable("CREATE INDEX idx_sites_country ON sites(country_id)")
+    execute_deferrable("CREATE INDEX idx_sites_region_id ON sites(region_id)")
+    execute_deferrable("CREATE INDEX idx_sites_area_id ON sites(area_id)")
+    execute_deferrable("CREATE INDEX idx_sites_planned ON sites(isPlanned)")
+    execute_deferrable("CREATE INDEX idx_sites_curation ON sites(curation_score, popularity_score)")
+    execute_deferrable("CREATE INDEX idx_sites_destination_slug ON sites(destination_slug)")
+    execute_deferrable("CREATE INDEX idx_sites_wreck_verified ON sites(wreck_verified)")
 
     # v1: Dives table (with v6 modifications for GPS drafts)
     cursor.execute("""
@@ -135,10 +303,10 @@ def create_schema(conn: sqlite3.Connection):
             CHECK (siteId IS NOT NULL OR (pendingLatitude IS NOT NULL AND pendingLongitude IS NOT NULL))
         )
     """)
-    cursor.execute("CREATE INDEX idx_dives_start_time ON dives(startTime)")
-    cursor.execute("CREATE INDEX idx_dives_site ON dives(siteId)")
-    cursor.execute("CREATE INDEX idx_dives_date ON dives(date)")
-    cursor.execute("CREATE INDEX idx_dives_pending_gps ON dives(pendingLatitude, pendingLongitude)")
+    execute_deferrable("CREATE INDEX idx_dives_start_time ON dives(startTime)")
+    execute_deferrable("CREATE INDEX idx_dives_site ON dives(siteId)")
+    execute_deferrable("CREATE INDEX idx_dives_date ON dives(date)")
+    execute_deferrable("CREATE INDEX idx_dives_pending_gps ON dives(pendingLatitude, pendingLongitude)")
 
     # v1: Wildlife species table (with v5 additions)
     cursor.execute("""
@@ -159,10 +327,10 @@ def create_schema(conn: sqlite3.Connection):
             fishbase_id INTEGER
         )
     """)
-    cursor.execute("CREATE INDEX idx_species_category ON wildlife_species(category)")
-    cursor.execute("CREATE INDEX idx_species_rarity ON wildlife_species(rarity)")
-    cursor.execute("CREATE INDEX idx_species_family ON wildlife_species(family_id)")
-    cursor.execute("CREATE INDEX idx_species_scientific ON wildlife_species(scientificName)")
+    execute_deferrable("CREATE INDEX idx_species_category ON wildlife_species(category)")
+    execute_deferrable("CREATE INDEX idx_species_rarity ON wildlife_species(rarity)")
+    execute_deferrable("CREATE INDEX idx_species_family ON wildlife_species(family_id)")
+    execute_deferrable("CREATE INDEX idx_species_scientific ON wildlife_species(scientificName)")
 
     # v1: Sightings table
     cursor.execute("""
@@ -175,8 +343,8 @@ def create_schema(conn: sqlite3.Connection):
             createdAt TEXT NOT NULL
         )
     """)
-    cursor.execute("CREATE INDEX idx_sightings_dive ON sightings(diveId)")
-    cursor.execute("CREATE INDEX idx_sightings_species ON sightings(speciesId)")
+    execute_deferrable("CREATE INDEX idx_sightings_dive ON sightings(diveId)")
+    execute_deferrable("CREATE INDEX idx_sightings_species ON sightings(speciesId)")
 
     # v3: Site tags table
     cursor.execute("""
@@ -186,7 +354,7 @@ def create_schema(conn: sqlite3.Connection):
             PRIMARY KEY (site_id, tag) ON CONFLICT REPLACE
         )
     """)
-    cursor.execute("CREATE INDEX idx_site_tags_tag ON site_tags(tag)")
+    execute_deferrable("CREATE INDEX idx_site_tags_tag ON site_tags(tag)")
     cursor.execute("""
         CREATE TABLE site_aliases (
             site_id TEXT NOT NULL REFERENCES sites(id) ON DELETE CASCADE,
@@ -195,7 +363,7 @@ def create_schema(conn: sqlite3.Connection):
             PRIMARY KEY (site_id, alias_normalized) ON CONFLICT REPLACE
         )
     """)
-    cursor.execute("CREATE INDEX idx_site_aliases_normalized ON site_aliases(alias_normalized)")
+    execute_deferrable("CREATE INDEX idx_site_aliases_normalized ON site_aliases(alias_normalized)")
 
     # v4: Site facets
     cursor.execute("""
@@ -217,8 +385,8 @@ def create_schema(conn: sqlite3.Connection):
             updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
         )
     """)
-    cursor.execute("CREATE INDEX idx_site_facets_difficulty ON site_facets(difficulty)")
-    cursor.execute("CREATE INDEX idx_site_facets_has_current ON site_facets(has_current)")
+    execute_deferrable("CREATE INDEX idx_site_facets_difficulty ON site_facets(difficulty)")
+    execute_deferrable("CREATE INDEX idx_site_facets_has_current ON site_facets(has_current)")
 
     # v4: Site media
     cursor.execute("""
@@ -236,7 +404,7 @@ def create_schema(conn: sqlite3.Connection):
             is_redistributable INTEGER NOT NULL DEFAULT 1
         )
     """)
-    cursor.execute("CREATE INDEX idx_site_media_site ON site_media(site_id)")
+    execute_deferrable("CREATE INDEX idx_site_media_site ON site_media(site_id)")
 
     # v4: Dive shops
     cursor.execute("""
@@ -289,7 +457,7 @@ def create_schema(conn: sqlite3.Connection):
             wikidata_id TEXT
         )
     """)
-    cursor.execute("CREATE INDEX idx_countries_continent ON countries(continent)")
+    execute_deferrable("CREATE INDEX idx_countries_continent ON countries(continent)")
 
     # v14: Region groups table
     cursor.execute("""
@@ -319,8 +487,8 @@ def create_schema(conn: sqlite3.Connection):
             group_id TEXT REFERENCES region_groups(id) ON DELETE SET NULL
         )
     """)
-    cursor.execute("CREATE INDEX idx_regions_country ON regions(country_id)")
-    cursor.execute("CREATE INDEX idx_regions_group ON regions(group_id)")
+    execute_deferrable("CREATE INDEX idx_regions_country ON regions(country_id)")
+    execute_deferrable("CREATE INDEX idx_regions_group ON regions(group_id)")
 
     # v5: Areas table
     cursor.execute("""
@@ -334,8 +502,8 @@ def create_schema(conn: sqlite3.Connection):
             wikidata_id TEXT
         )
     """)
-    cursor.execute("CREATE INDEX idx_areas_region ON areas(region_id)")
-    cursor.execute("CREATE INDEX idx_areas_country ON areas(country_id)")
+    execute_deferrable("CREATE INDEX idx_areas_region ON areas(region_id)")
+    execute_deferrable("CREATE INDEX idx_areas_country ON areas(country_id)")
 
     # v5: Species families
     cursor.execute("""
@@ -348,7 +516,7 @@ def create_schema(conn: sqlite3.Connection):
             gbif_key INTEGER
         )
     """)
-    cursor.execute("CREATE INDEX idx_families_category ON species_families(category)")
+    execute_deferrable("CREATE INDEX idx_families_category ON species_families(category)")
 
     # v5: Site-species junction table
     cursor.execute("""
@@ -365,9 +533,9 @@ def create_schema(conn: sqlite3.Connection):
             PRIMARY KEY (site_id, species_id) ON CONFLICT REPLACE
         )
     """)
-    cursor.execute("CREATE INDEX idx_site_species_site ON site_species(site_id)")
-    cursor.execute("CREATE INDEX idx_site_species_species ON site_species(species_id)")
-    cursor.execute("CREATE INDEX idx_site_species_likelihood ON site_species(likelihood)")
+    execute_deferrable("CREATE INDEX idx_site_species_site ON site_species(site_id)")
+    execute_deferrable("CREATE INDEX idx_site_species_species ON site_species(species_id)")
+    execute_deferrable("CREATE INDEX idx_site_species_likelihood ON site_species(likelihood)")
 
     # v7: Sync metadata
     cursor.execute("""
@@ -384,8 +552,8 @@ def create_schema(conn: sqlite3.Connection):
             retry_count INTEGER NOT NULL DEFAULT 0
         )
     """)
-    cursor.execute("CREATE UNIQUE INDEX idx_sync_metadata_record ON sync_metadata(record_type, local_record_id)")
-    cursor.execute("CREATE INDEX idx_sync_metadata_status ON sync_metadata(sync_status)")
+    execute_deferrable("CREATE UNIQUE INDEX idx_sync_metadata_record ON sync_metadata(record_type, local_record_id)")
+    execute_deferrable("CREATE INDEX idx_sync_metadata_status ON sync_metadata(sync_status)")
 
     # v7: Sync queue
     cursor.execute("""
@@ -402,8 +570,8 @@ def create_schema(conn: sqlite3.Connection):
             priority INTEGER NOT NULL DEFAULT 0
         )
     """)
-    cursor.execute("CREATE INDEX idx_sync_queue_priority ON sync_queue(priority)")
-    cursor.execute("CREATE INDEX idx_sync_queue_record ON sync_queue(record_type, local_record_id)")
+    execute_deferrable("CREATE INDEX idx_sync_queue_priority ON sync_queue(priority)")
+    execute_deferrable("CREATE INDEX idx_sync_queue_record ON sync_queue(record_type, local_record_id)")
 
     # v7: User site states
     cursor.execute("""
@@ -418,8 +586,8 @@ def create_schema(conn: sqlite3.Connection):
             updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
         )
     """)
-    cursor.execute("CREATE INDEX idx_user_site_states_wishlist ON user_site_states(is_wishlist)")
-    cursor.execute("CREATE INDEX idx_user_site_states_planned ON user_site_states(is_planned)")
+    execute_deferrable("CREATE INDEX idx_user_site_states_wishlist ON user_site_states(is_wishlist)")
+    execute_deferrable("CREATE INDEX idx_user_site_states_planned ON user_site_states(is_planned)")
 
     # v7: Trips table
     cursor.execute("""
@@ -435,7 +603,7 @@ def create_schema(conn: sqlite3.Connection):
             updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
         )
     """)
-    cursor.execute("CREATE INDEX idx_trips_dates ON trips(start_date, end_date)")
+    execute_deferrable("CREATE INDEX idx_trips_dates ON trips(start_date, end_date)")
 
     # v7: Trip sites junction
     cursor.execute("""
@@ -448,8 +616,38 @@ def create_schema(conn: sqlite3.Connection):
             PRIMARY KEY (trip_id, site_id) ON CONFLICT REPLACE
         )
     """)
-    cursor.execute("CREATE INDEX idx_trip_sites_trip ON trip_sites(trip_id)")
-    cursor.execute("CREATE INDEX idx_trip_sites_site ON trip_sites(site_id)")
+    execute_deferrable("CREATE INDEX idx_trip_sites_trip ON trip_sites(trip_id)")
+    execute_deferrable("CREATE INDEX idx_trip_sites_site ON trip_sites(site_id)")
+
+    # Seed-only: precomputed marker clusters per zoom (see build_site_clusters)
+    cursor.execute("""
+        CREATE TABLE site_clusters (
+            zoom INTEGER NOT NULL,
+            tile_x INTEGER NOT NULL,
+            tile_y INTEGER NOT NULL,
+            id INTEGER NOT NULL,
+            parent_id INTEGER,
+            latitude REAL NOT NULL,
+            longitude REAL NOT NULL,
+            site_count INTEGER NOT NULL,
+            representative_site_id TEXT NOT NULL REFERENCES sites(id) ON DELETE CASCADE,
+            PRIMARY KEY (zoom, tile_x, tile_y, id)
+        ) WITHOUT ROWID
+    """)
+
+    # Seed-only: precomputed heatmap density (see build_heatmap_grids)
+    cursor.execute("""
+        CREATE TABLE heatmap_cells (
+            layer TEXT NOT NULL,
+            zoom INTEGER NOT NULL,
+            cell_x INTEGER NOT NULL,
+            cell_y INTEGER NOT NULL,
+            weight INTEGER NOT NULL,
+            latitude REAL NOT NULL,
+            longitude REAL NOT NULL,
+            PRIMARY KEY (layer, zoom, cell_x, cell_y)
+        ) WITHOUT ROWID
+    """)
 
     # FTS5 tables (content-less for manual population)
     cursor.execute("""
@@ -467,40 +665,40 @@ def create_schema(conn: sqlite3.Connection):
     """)
 
     # v9: FTS5 incremental triggers for sites
-    cursor.execute("""
+    execute_deferrable("""
         CREATE TRIGGER sites_fts_insert AFTER INSERT ON sites BEGIN
             INSERT INTO sites_fts(rowid, name, aliases, region, location, tags, description, collections)
             VALUES (NEW.rowid, NEW.name, NEW.aliases, NEW.region, NEW.location, NEW.tags, NEW.description, NEW.collections);
         END
     """)
-    cursor.execute("""
+    execute_deferrable("""
         CREATE TRIGGER sites_fts_update AFTER UPDATE ON sites BEGIN
             DELETE FROM sites_fts WHERE rowid = OLD.rowid;
             INSERT INTO sites_fts(rowid, name, aliases, region, location, tags, description, collections)
             VALUES (NEW.rowid, NEW.name, NEW.aliases, NEW.region, NEW.location, NEW.tags, NEW.description, NEW.collections);
         END
     """)
-    cursor.execute("""
+    execute_deferrable("""
         CREATE TRIGGER sites_fts_delete AFTER DELETE ON sites BEGIN
             DELETE FROM sites_fts WHERE rowid = OLD.rowid;
         END
     """)
 
     # v9: FTS5 incremental triggers for species
-    cursor.execute("""
+    execute_deferrable("""
         CREATE TRIGGER species_fts_insert AFTER INSERT ON wildlife_species BEGIN
             INSERT INTO species_fts(rowid, name, scientific_name)
             VALUES (NEW.rowid, NEW.name, NEW.scientificName);
         END
     """)
-    cursor.execute("""
+    execute_deferrable("""
         CREATE TRIGGER species_fts_update AFTER UPDATE ON wildlife_species BEGIN
             DELETE FROM species_fts WHERE rowid = OLD.rowid;
             INSERT INTO species_fts(rowid, name, scientific_name)
             VALUES (NEW.rowid, NEW.name, NEW.scientificName);
         END
     """)
-    cursor.execute("""
+    execute_deferrable("""
         CREATE TRIGGER species_fts_delete AFTER DELETE ON wildlife_species BEGIN
             DELETE FROM species_fts WHERE rowid = OLD.rowid;
         END
@@ -528,6 +726,14 @@ def create_schema(conn: sqlite3.Connection):
     log("Schema created with all migrations v1-v10")
 
 
+def create_deferred_schema(conn: sqlite3.Connection, statements: list[str]):
+    """Run index and trigger DDL held back by create_schema()."""
+    for sql in statements:
+        conn.execute(sql)
+    conn.commit()
+    log(f"  Created {len(statements)} deferred indexes and triggers")
+
+
 def seed_countries(conn: sqlite3.Connection):
     """Seed countries table."""
     data = load_json("countries")
@@ -651,21 +857,25 @@ def normalize_alias(value: str) -> str:
     return " ".join(normalized.split())
 
 
-def validate_curated_sites(sites: list[dict]):
-    """Validate curated-core quality gates before shipping the seed DB."""
+def curated_site_errors(site: dict) -> list[str]:
+    """Curated-core quality gate failures for one site."""
     errors = []
     generic_wreck_patterns = (
         "unnamed shipwreck",
         "unknown shipwreck",
     )
-    for site in sites:
-        if not site.get("country_id") or not site.get("region_id") or not site.get("area_id"):
-            errors.append(f"{site.get('id')}: missing geography ids")
-        if site.get("region") == "Global":
-            errors.append(f"{site.get('id')}: Global region is not allowed")
-        normalized_name = (site.get("name") or "").strip().lower()
-        if normalized_name in {"shipwreck", "wreck"} or any(pattern in normalized_name for pattern in generic_wreck_patterns):
-            errors.append(f"{site.get('id')}: generic wreck naming is not allowed")
+    if not site.get("country_id") or not site.get("region_id") or not site.get("area_id"):
+        errors.append(f"{site.get('id')}: missing geography ids")
+    if site.get("region") == "Global":
+        errors.append(f"{site.get('id')}: Global region is not allowed")
+    normalized_name = (site.get("name") or "").strip().lower()
+    if normalized_name in {"shipwreck", "wreck"} or any(pattern in normalized_name for pattern in generic_wreck_patterns):
+        errors.append(f"{site.get('id')}: generic wreck naming is not allowed")
+    return errors
+
+
+def raise_curated_errors(errors: list[str]):
+    """Fail the build with the first curated-core validation errors."""
     if errors:
         joined = "\n".join(f"  - {error}" for error in errors[:50])
         raise RuntimeError(f"Curated core validation failed:\n{joined}")
@@ -673,12 +883,8 @@ def validate_curated_sites(sites: list[dict]):
 
 def load_curated_site_id_map() -> dict[str, str]:
     """Map matched legacy/base site IDs onto curated site IDs."""
-    data = load_json("curated_core_sites")
-    if not data:
-        return {}
-
     mapping: dict[str, str] = {}
-    for site in data.get("sites", []):
+    for site in iter_json_items("curated_core_sites", "sites"):
         matched_base_id = (((site.get("provenance") or {}).get("matched_base_id")) or "").strip()
         if matched_base_id:
             mapping[matched_base_id] = site["id"]
@@ -715,20 +921,31 @@ def seed_species_families(conn: sqlite3.Connection):
     log(f"  Inserted {len(families)} species families")
 
 
+SITE_INSERT_SQL = """INSERT INTO sites (id, name, location, latitude, longitude, region,
+           averageDepth, maxDepth, averageTemp, averageVisibility, difficulty, type,
+           description, wishlist, visitedCount, createdAt, tags, country_id, region_id,
+           area_id, wikidata_id, osm_id, isPlanned, aliases, curation_score,
+           popularity_score, access_level, wreck_verified, destination_slug,
+           user_quotes, best_season, required_cert, collections)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+SITE_ALIAS_INSERT_SQL = "INSERT INTO site_aliases (site_id, alias, alias_normalized) VALUES (?, ?, ?)"
+
+
 def seed_sites(conn: sqlite3.Connection):
     """Seed sites from the curated core artifact only."""
-    data = load_json("curated_core_sites")
-    if not data:
+    if seed_data_path("curated_core_sites") is None:
         raise RuntimeError("curated_core_sites.json is required to generate the bundled seed DB")
 
-    sites = data.get("sites", [])
-    validate_curated_sites(sites)
     cursor = conn.cursor()
     now = datetime.now().isoformat()
 
+    errors = []
+    site_count = 0
     rows = []
     alias_rows = []
-    for s in sites:
+    for s in iter_json_items("curated_core_sites", "sites"):
+        errors.extend(curated_site_errors(s))
+
         # Build location from area and country
         area = (s.get("area") or "").strip()
         country = (s.get("country") or "").strip()
@@ -778,33 +995,31 @@ def seed_sites(conn: sqlite3.Connection):
             if normalized:
                 alias_rows.append((s["id"], alias, normalized))
 
-    cursor.executemany(
-        """INSERT INTO sites (id, name, location, latitude, longitude, region,
-           averageDepth, maxDepth, averageTemp, averageVisibility, difficulty, type,
-           description, wishlist, visitedCount, createdAt, tags, country_id, region_id,
-           area_id, wikidata_id, osm_id, isPlanned, aliases, curation_score,
-           popularity_score, access_level, wreck_verified, destination_slug,
-           user_quotes, best_season, required_cert, collections)
-           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-        rows
-    )
+        if len(rows) >= INSERT_BATCH_SIZE:
+            cursor.executemany(SITE_INSERT_SQL, rows)
+            cursor.executemany(SITE_ALIAS_INSERT_SQL, alias_rows)
+            site_count += len(rows)
+            rows.clear()
+            alias_rows.clear()
+
+    if rows:
+        cursor.executemany(SITE_INSERT_SQL, rows)
+        site_count += len(rows)
     if alias_rows:
-        cursor.executemany(
-            "INSERT INTO site_aliases (site_id, alias, alias_normalized) VALUES (?, ?, ?)",
-            alias_rows
-        )
+        cursor.executemany(SITE_ALIAS_INSERT_SQL, alias_rows)
+
+    # Quality gates cover the whole file, so nothing is committed until it passes
+    if errors:
+        conn.rollback()
+        raise_curated_errors(errors)
     conn.commit()
-    log(f"  Inserted {len(sites)} sites from curated_core_sites")
+    log(f"  Inserted {site_count} sites from curated_core_sites")
 
 
 def load_species_descriptions() -> dict:
     """Load species descriptions from enhanced file."""
-    data = load_json("species_descriptions_enhanced")
-    if not data:
-        return {}
-
     descriptions = {}
-    for species_id, entry in data.get("species", {}).items():
+    for species_id, entry in iter_json_mapping("species_descriptions_enhanced", "species"):
         visual = entry.get("visual_description", {})
         if not visual:
             continue
@@ -846,22 +1061,18 @@ def load_species_images() -> dict:
     images = {}
 
     # Try iNaturalist first (higher quality)
-    inat_data = load_json("species_images_inaturalist")
-    if inat_data:
-        for species_id, entry in inat_data.get("species", {}).items():
-            photos = entry.get("photos", [])
-            if photos and photos[0].get("url"):
-                images[species_id] = photos[0]["url"]
+    for species_id, entry in iter_json_mapping("species_images_inaturalist", "species"):
+        photos = entry.get("photos", [])
+        if photos and photos[0].get("url"):
+            images[species_id] = photos[0]["url"]
 
     # Fallback to Wikimedia
-    wiki_data = load_json("species_images_wikimedia")
-    if wiki_data:
-        for species_id, entry in wiki_data.get("species", {}).items():
-            if species_id in images:
-                continue
-            photos = entry.get("photos", [])
-            if photos and photos[0].get("url"):
-                images[species_id] = photos[0]["url"]
+    for species_id, entry in iter_json_mapping("species_images_wikimedia", "species"):
+        if species_id in images:
+            continue
+        photos = entry.get("photos", [])
+        if photos and photos[0].get("url"):
+            images[species_id] = photos[0]["url"]
 
     return images
 
@@ -869,91 +1080,86 @@ def load_species_images() -> dict:
 def seed_species(conn: sqlite3.Connection) -> int:
     """Seed wildlife species table. Returns count for rarity calculation."""
     # Try full catalog first
-    data = load_json("species_catalog_full")
-    if not data:
-        data = load_json("species_catalog_v2")
-    if not data:
-        data = load_json("species_catalog")
-    if not data:
+    catalog = next(
+        (name for name in ("species_catalog_full", "species_catalog_v2", "species_catalog") if seed_data_path(name)),
+        None
+    )
+    if not catalog:
         return 0
 
-    species_list = data.get("species", [])
     descriptions = load_species_descriptions()
     images = load_species_images()
-
-    cursor = conn.cursor()
     seen_ids = set()
-    rows = []
-
-    for s in species_list:
-        if s["id"] in seen_ids:
-            continue
-        seen_ids.add(s["id"])
-
-        # Get description
-        desc = descriptions.get(s["id"]) or s.get("description")
-
-        # Get image URLs
-        img_url = images.get(s["id"]) or s.get("imageUrl")
-        thumb_url = s.get("thumbnail_url") or img_url
-
-        # Infer category if missing
-        category = s.get("category", "").strip()
-        if not category:
-            name_lower = s["name"].lower()
-            if any(k in name_lower for k in ["whale", "dolphin", "seal", "manatee"]):
-                category = "Mammal"
-            elif any(k in name_lower for k in ["turtle", "sea snake", "crocodile"]):
-                category = "Reptile"
-            elif any(k in name_lower for k in ["coral", "anemone", "sea fan"]):
-                category = "Coral"
-            elif any(k in name_lower for k in ["octopus", "squid", "jellyfish", "crab", "lobster", "shrimp", "nudibranch", "starfish", "urchin", "sponge"]):
-                category = "Invertebrate"
-            else:
-                category = "Fish"
-
-        # Default rarity to Common (will be recalculated later)
-        rarity = s.get("rarity", "Common")
-        if not rarity or rarity.strip() == "":
-            rarity = "Common"
 
-        regions = s.get("regions", [])
-        regions_str = ",".join(regions) if isinstance(regions, list) else str(regions)
-
-        rows.append((
-            s["id"],
-            s["name"],
-            s.get("scientificName", s["name"]),
-            category,
-            rarity,
-            regions_str,
-            img_url,
-            s.get("family_id"),
-            s.get("conservation_status"),
-            desc,
-            thumb_url,
-            s.get("worms_aphia_id"),
-            s.get("gbif_key"),
-            s.get("fishbase_id")
-        ))
-
-    cursor.executemany(
+    def species_rows() -> Iterator[tuple]:
+        for s in iter_json_items(catalog, "species"):
+            if s["id"] in seen_ids:
+                continue
+            seen_ids.add(s["id"])
+
+            # Get description
+            desc = descriptions.get(s["id"]) or s.get("description")
+
+            # Get image URLs
+            img_url = images.get(s["id"]) or s.get("imageUrl")
+            thumb_url = s.get("thumbnail_url") or img_url
+
+            # Infer category if missing
+            category = s.get("category", "").strip()
+            if not category:
+                name_lower = s["name"].lower()
+                if any(k in name_lower for k in ["whale", "dolphin", "seal", "manatee"]):
+                    category = "Mammal"
+                elif any(k in name_lower for k in ["turtle", "sea snake", "crocodile"]):
+                    category = "Reptile"
+                elif any(k in name_lower for k in ["coral", "anemone", "sea fan"]):
+                    category = "Coral"
+                elif any(k in name_lower for k in ["octopus", "squid", "jellyfish", "crab", "lobster", "shrimp", "nudibranch", "starfish", "urchin", "sponge"]):
+                    category = "Invertebrate"
+                else:
+                    category = "Fish"
+
+            # Default rarity to Common (will be recalculated later)
+            rarity = s.get("rarity", "Common")
+            if not rarity or rarity.strip() == "":
+                rarity = "Common"
+
+            regions = s.get("regions", [])
+            regions_str = ",".join(regions) if isinstance(regions, list) else str(regions)
+
+            yield (
+                s["id"],
+                s["name"],
+                s.get("scientificName", s["name"]),
+                category,
+                rarity,
+                regions_str,
+                img_url,
+                s.get("family_id"),
+                s.get("conservation_status"),
+                desc,
+                thumb_url,
+                s.get("worms_aphia_id"),
+                s.get("gbif_key"),
+                s.get("fishbase_id")
+            )
+
+    count = insert_batched(
+        conn,
         """INSERT INTO wildlife_species (id, name, scientificName, category, rarity, regions,
            imageUrl, family_id, conservation_status, description, thumbnail_url,
            worms_aphia_id, gbif_key, fishbase_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-        rows
+        species_rows()
     )
     conn.commit()
-    log(f"  Inserted {len(rows)} species")
-    return len(rows)
+    log(f"  Inserted {count} species")
+    return count
 
 
 def seed_site_species_links(conn: sqlite3.Connection) -> dict:
     """Seed site-species links. Returns species->site count for rarity calculation."""
     # First try loading from species catalog (has embedded sites)
-    catalog = load_json("species_catalog_full")
-    if not catalog:
-        catalog = load_json("species_catalog_v2")
+    catalog = next((name for name in ("species_catalog_full", "species_catalog_v2") if seed_data_path(name)), None)
 
     cursor = conn.cursor()
 
@@ -965,14 +1171,14 @@ def seed_site_species_links(conn: sqlite3.Connection) -> dict:
     valid_sites = {row[0] for row in cursor.fetchall()}
     curated_site_id_map = load_curated_site_id_map()
 
-    species_site_counts = {}  # species_id -> number of sites
-    rows = []
-    seen = set()
     now = datetime.now().isoformat()
+    # OR IGNORE keeps the first link for a (site, species) pair, overriding the table's ON CONFLICT REPLACE
+    insert_sql = """INSERT OR IGNORE INTO site_species (site_id, species_id, likelihood, season_months,
+               depth_min_m, depth_max_m, source, source_record_count, last_updated)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"""
 
-    # Try embedded sites in catalog
-    if catalog:
-        for species in catalog.get("species", []):
+    def catalog_rows() -> Iterator[tuple]:
+        for species in iter_json_items(catalog, "species"):
             species_id = species["id"]
             if species_id not in valid_species:
                 continue
@@ -984,16 +1190,11 @@ def seed_site_species_links(conn: sqlite3.Connection) -> dict:
                 if not site_id or site_id not in valid_sites:
                     continue
 
-                key = f"{site_id}|{species_id}"
-                if key in seen:
-                    continue
-                seen.add(key)
-
                 likelihood = site.get("likelihood", "occasional")
                 if likelihood not in ("common", "occasional", "rare"):
                     likelihood = "occasional"
 
-                rows.append((
+                yield (
                     site_id,
                     species_id,
                     likelihood,
@@ -1003,57 +1204,52 @@ def seed_site_species_links(conn: sqlite3.Connection) -> dict:
                     "catalog_full",
                     None,  # source_record_count
                     now
-                ))
-
-                species_site_counts[species_id] = species_site_counts.get(species_id, 0) + 1
+                )
 
-    # Fallback to site_species.json if no embedded sites
-    if not rows:
-        data = load_json("site_species")
-        if data:
-            for link in data.get("site_species", []):
-                site_id = link.get("site_id", "").strip()
-                site_id = curated_site_id_map.get(site_id, site_id)
-                species_id = link.get("species_id", "").strip()
+    def link_rows() -> Iterator[tuple]:
+        for link in iter_json_items("site_species", "site_species"):
+            site_id = link.get("site_id", "").strip()
+            site_id = curated_site_id_map.get(site_id, site_id)
+            species_id = link.get("species_id", "").strip()
 
-                if not site_id or not species_id:
-                    continue
-                if site_id not in valid_sites or species_id not in valid_species:
-                    continue
-
-                key = f"{site_id}|{species_id}"
-                if key in seen:
-                    continue
-                seen.add(key)
+            if not site_id or not species_id:
+                continue
+            if site_id not in valid_sites or species_id not in valid_species:
+                continue
 
-                likelihood = link.get("likelihood", "occasional")
-                if likelihood not in ("common", "occasional", "rare"):
-                    likelihood = "occasional"
+            likelihood = link.get("likelihood", "occasional")
+            if likelihood not in ("common", "occasional", "rare"):
+                likelihood = "occasional"
+
+            yield (
+                site_id,
+                species_id,
+                likelihood,
+                json.dumps(link.get("season_months")) if link.get("season_months") else None,
+                link.get("depth_min_m"),
+                link.get("depth_max_m"),
+                link.get("source"),
+                link.get("source_record_count"),
+                link.get("last_updated", now)
+            )
 
-                rows.append((
-                    site_id,
-                    species_id,
-                    likelihood,
-                    json.dumps(link.get("season_months")) if link.get("season_months") else None,
-                    link.get("depth_min_m"),
-                    link.get("depth_max_m"),
-                    link.get("source"),
-                    link.get("source_record_count"),
-                    link.get("last_updated", now)
-                ))
+    # Try embedded sites in catalog
+    if catalog:
+        insert_batched(conn, insert_sql, catalog_rows())
 
-                species_site_counts[species_id] = species_site_counts.get(species_id, 0) + 1
+    # Fallback to site_species.json if no embedded sites
+    if not cursor.execute("SELECT EXISTS (SELECT 1 FROM site_species)").fetchone()[0]:
+        insert_batched(conn, insert_sql, link_rows())
+    conn.commit()
 
-    if rows:
-        cursor.executemany(
-            """INSERT INTO site_species (site_id, species_id, likelihood, season_months,
-               depth_min_m, depth_max_m, source, source_record_count, last_updated)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-            rows
-        )
-        conn.commit()
+    # species_id -> number of sites, in first-linked order
+    cursor.execute("""
+        SELECT species_id, COUNT(*) FROM site_species
+        GROUP BY species_id ORDER BY MIN(rowid)
+    """)
+    species_site_counts = dict(cursor.fetchall())
 
-    log(f"  Inserted {len(rows)} site-species links")
+    log(f"  Inserted {sum(species_site_counts.values())} site-species links")
     return species_site_counts
 
 
@@ -1131,44 +1327,248 @@ def calculate_realistic_rarity(conn: sqlite3.Connection, species_site_counts: di
 
 def seed_site_media(conn: sqlite3.Connection):
     """Seed site media table."""
-    data = load_json("site_media")
-    if not data:
+    if seed_data_path("site_media") is None:
         return
 
-    media = data.get("media", [])
     cursor = conn.cursor()
 
     # Get valid site IDs
     cursor.execute("SELECT id FROM sites")
     valid_sites = {row[0] for row in cursor.fetchall()}
 
-    rows = []
-    for m in media:
-        if m.get("siteId") not in valid_sites:
-            continue
-        rows.append((
-            m["id"],
-            m["siteId"],
-            m.get("kind", "photo"),
-            m["url"],
-            m.get("width"),
-            m.get("height"),
-            m.get("license"),
-            m.get("attribution"),
-            m.get("sourceUrl"),
-            m.get("sha256"),
-            m.get("isRedistributable", True)
+    def media_rows() -> Iterator[tuple]:
+        for m in iter_json_items("site_media", "media"):
+            if m.get("siteId") not in valid_sites:
+                continue
+            yield (
+                m["id"],
+                m["siteId"],
+                m.get("kind", "photo"),
+                m["url"],
+                m.get("width"),
+                m.get("height"),
+                m.get("license"),
+                m.get("attribution"),
+                m.get("sourceUrl"),
+                m.get("sha256"),
+                m.get("isRedistributable", True)
+            )
+
+    count = insert_batched(
+        conn,
+        """INSERT INTO site_media (id, site_id, kind, url, width, height, license,
+           attribution, source_url, sha256, is_redistributable)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        media_rows()
+    )
+    conn.commit()
+    log(f"  Inserted {count} site media records")
+
+
+def mercator_xy(lat: float, lon: float) -> tuple[float, float]:
+    """Web Mercator position in [0, 1] world units (y grows southward)."""
+    lat = min(max(lat, -MAX_MERCATOR_LAT), MAX_MERCATOR_LAT)
+    return (lon + 180.0) / 360.0, (1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0
+
+
+def mercator_latlon(x: float, y: float) -> tuple[float, float]:
+    """Inverse of mercator_xy."""
+    return math.degrees(math.atan(math.sinh(math.pi * (1.0 - 2.0 * y)))), x * 360.0 - 180.0
+
+
+def mercator_cells(lats: list[float], lons: list[float], level: int) -> list[tuple[int, int]]:
+    """Web Mercator cell (x, y) of each point on a 2**level x 2**level world grid."""
+    n = 1 << level
+    cells = []
+    for lat, lon in zip(lats, lons):
+        x, y = mercator_xy(lat, lon)
+        cells.append((min(max(int(x * n), 0), n - 1), min(max(int(y * n), 0), n - 1)))
+    return cells
+
+
+def bin_points(lats: list[float], lons: list[float], weights: list[float], level: int) -> list[tuple]:
+    """Sum point weights per Mercator cell at `level`.
+
+    Returns (cell_x, cell_y, weight, mean_lat, mean_lon) for each non-empty
+    cell, ordered by (cell_y, cell_x); the mean position is weighted so the
+    client can draw each cell as a single heatmap point.
+    """
+    if not lats:
+        return []
+    n = 1 << level
+    if HAS_NUMPY:
+        lat = np.asarray(lats, dtype=np.float64)
+        lon = np.asarray(lons, dtype=np.float64)
+        weight = np.asarray(weights, dtype=np.float64)
+        clamped = np.radians(np.clip(lat, -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+        x = np.clip(((lon + 180.0) / 360.0 * n).astype(np.int64), 0, n - 1)
+        y = np.clip(((1.0 - np.arcsinh(np.tan(clamped)) / np.pi) / 2.0 * n).astype(np.int64), 0, n - 1)
+        # Sparse 2D histogram: a dense histogram2d would need 4**level bins
+        keys, inverse = np.unique(y * n + x, return_inverse=True)
+        totals = np.bincount(inverse, weights=weight)
+        mean_lat = np.bincount(inverse, weights=weight * lat) / totals
+        mean_lon = np.bincount(inverse, weights=weight * lon) / totals
+        return list(zip(
+            (keys % n).tolist(), (keys // n).tolist(), totals.tolist(), mean_lat.tolist(), mean_lon.tolist()
         ))
 
-    if rows:
-        cursor.executemany(
-            """INSERT INTO site_media (id, site_id, kind, url, width, height, license,
-               attribution, source_url, sha256, is_redistributable)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-            rows
-        )
-        conn.commit()
-    log(f"  Inserted {len(rows)} site media records")
+    sums: dict[tuple[int, int], list[float]] = {}
+    for (cx, cy), lat, lon, weight in zip(mercator_cells(lats, lons, level), lats, lons, weights):
+        cell = sums.setdefault((cy, cx), [0.0, 0.0, 0.0])
+        cell[0] += weight
+        cell[1] += weight * lat
+        cell[2] += weight * lon
+    return [
+        (cx, cy, total, lat_sum / total, lon_sum / total)
+        for (cy, cx), (total, lat_sum, lon_sum) in sorted(sums.items())
+    ]
+
+
+def build_heatmap_grids(conn: sqlite3.Connection):
+    """Aggregate site, dive and sighting density into per-zoom heatmap cells.
+
+    Dives are placed at their site (or pending GPS fix) and sightings at
+    their dive, weighted by count. The bundled database ships without user
+    dives, so those layers are only populated when the DB already has some.
+    Points are read in id order: the cell means are float sums, so a fixed
+    summation order keeps unchanged cells bit-identical between full and
+    incremental builds.
+    """
+    layers = {
+        "sites": "SELECT latitude, longitude, 1 FROM sites ORDER BY id",
+        "dives": """
+            SELECT COALESCE(s.latitude, d.pendingLatitude), COALESCE(s.longitude, d.pendingLongitude), 1
+            FROM dives d LEFT JOIN sites s ON s.id = d.siteId
+            ORDER BY d.id
+        """,
+        "sightings": """
+            SELECT COALESCE(s.latitude, d.pendingLatitude), COALESCE(s.longitude, d.pendingLongitude), g.count
+            FROM sightings g
+            JOIN dives d ON d.id = g.diveId
+            LEFT JOIN sites s ON s.id = d.siteId
+            ORDER BY g.id
+        """,
+    }
+    cursor = conn.cursor()
+    summary = []
+    for layer, sql in layers.items():
+        points = [row for row in cursor.execute(sql) if row[0] is not None and row[1] is not None]
+        if not points:
+            continue
+        lats, lons, weights = (list(column) for column in zip(*points))
+        cells = 0
+        for zoom in HEATMAP_ZOOMS:
+            rows = [
+                (layer, zoom, cx, cy, round(weight), lat, lon)
+                for cx, cy, weight, lat, lon in bin_points(lats, lons, weights, zoom + HEATMAP_CELL_BITS)
+            ]
+            cells += insert_batched(conn, """
+                INSERT INTO heatmap_cells (layer, zoom, cell_x, cell_y, weight, latitude, longitude)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+        summary.append(f"{layer} {len(points)} points -> {cells} cells")
+
+    conn.commit()
+    log(f"  Heatmap grids: {'; '.join(summary) or 'no points'}")
+
+
+def cluster_level(points: list[list], radius: float) -> tuple[list[list], list[int]]:
+    """Greedily merge points within `radius` (world units) of a seed point.
+
+    Points are [x, y, count, representative] in rank order; each seed takes
+    every unclaimed point in range, so a cluster's representative is its
+    best-ranked site. Returns (clusters in rank order, cluster index of
+    each input point). Neighbours are found through a grid of radius-sized
+    buckets, as supercluster does with its KD-tree.
+    """
+    buckets: dict[tuple[int, int], list[int]] = {}
+    for i, (x, y, _, _) in enumerate(points):
+        buckets.setdefault((int(x / radius), int(y / radius)), []).append(i)
+
+    parent = [-1] * len(points)
+    clusters = []
+    radius_sq = radius * radius
+    for i, (x, y, _, representative) in enumerate(points):
+        if parent[i] >= 0:
+            continue
+        bx, by = int(x / radius), int(y / radius)
+        members = [
+            j
+            for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+            for j in buckets.get((bx + dx, by + dy), ())
+            if parent[j] < 0 and (points[j][0] - x) ** 2 + (points[j][1] - y) ** 2 <= radius_sq
+        ]
+        count = sum(points[j][2] for j in members)
+        for j in members:
+            parent[j] = len(clusters)
+        clusters.append([
+            sum(points[j][0] * points[j][2] for j in members) / count,
+            sum(points[j][1] * points[j][2] for j in members) / count,
+            count,
+            representative,
+        ])
+    return clusters, parent
+
+
+def cluster_id(zoom: int, representative_site_id: str) -> int:
+    """Stable cluster id: a 63-bit hash of (zoom, representative site).
+
+    A cluster's representative is unique within its zoom, so the id only
+    changes when the cluster itself does, and seed DB patches stay small.
+    """
+    digest = hashlib.sha256(f"{zoom}/{representative_site_id}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") >> 1
+
+
+def build_site_clusters(conn: sqlite3.Connection):
+    """Precompute a supercluster-style marker hierarchy for zooms 0..CLUSTER_MAX_ZOOM.
+
+    Each zoom clusters the clusters of the zoom above it, starting from the
+    sites themselves, so every cluster has exactly one parent at zoom - 1.
+    Rows are keyed by zoom and the map tile of the cluster centroid; a
+    cluster of one site is that site's own marker. Ids (and parent ids) come
+    from cluster_id(), not from row order.
+    """
+    points = [
+        [*mercator_xy(lat, lon), 1, site_id]
+        for site_id, lat, lon in conn.execute("""
+            SELECT id, latitude, longitude FROM sites
+            ORDER BY COALESCE(curation_score, 0) DESC, COALESCE(popularity_score, 0) DESC,
+                     COALESCE(visitedCount, 0) DESC, name COLLATE NOCASE ASC, id
+        """)
+    ]
+    if not points:
+        log("  No sites to cluster")
+        return
+
+    clusters_by_zoom: dict[int, list[list]] = {}
+    parents_by_zoom: dict[int, list[int]] = {}  # zoom -> parent index (at zoom - 1) per cluster
+    for zoom in range(CLUSTER_MAX_ZOOM, -1, -1):
+        points, parents = cluster_level(points, CLUSTER_RADIUS_PX / (CLUSTER_TILE_PX * (1 << zoom)))
+        clusters_by_zoom[zoom] = points
+        if zoom < CLUSTER_MAX_ZOOM:
+            parents_by_zoom[zoom + 1] = parents
+
+    rows = []
+    for zoom in range(CLUSTER_MAX_ZOOM + 1):
+        n = 1 << zoom
+        parents = parents_by_zoom.get(zoom)
+        for i, (x, y, count, representative) in enumerate(clusters_by_zoom[zoom]):
+            lat, lon = mercator_latlon(x, y)
+            parent_id = cluster_id(zoom - 1, clusters_by_zoom[zoom - 1][parents[i]][3]) if parents else None
+            rows.append((
+                zoom, min(int(x * n), n - 1), min(int(y * n), n - 1), cluster_id(zoom, representative),
+                parent_id, lat, lon, count, representative,
+            ))
+
+    insert_batched(conn, """
+        INSERT INTO site_clusters (zoom, tile_x, tile_y, id, parent_id, latitude, longitude,
+                                   site_count, representative_site_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    conn.commit()
+    log(f"  Site clusters: {len(clusters_by_zoom[0])} at zoom 0, "
+        f"{len(clusters_by_zoom[CLUSTER_MAX_ZOOM])} at zoom {CLUSTER_MAX_ZOOM}, {len(rows)} rows")
 
 
 def build_fts_indexes(conn: sqlite3.Connection):
@@ -1220,57 +1620,196 @@ def vacuum_database(conn: sqlite3.Connection, db_path: Path):
     log(f"  Database compacted: {size_mb:.2f} MB")
 
 
-def main():
-    output_path = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_OUTPUT
+def apply_pragmas(conn: sqlite3.Connection, pragmas: list[tuple[str, object]]):
+    """Apply a list of (pragma, value) connection settings."""
+    for name, value in pragmas:
+        conn.execute(f"PRAGMA {name} = {value}")
 
-    log(f"Generating seed database: {output_path}")
 
-    # Ensure output directory exists
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+def file_sha256(path: Path) -> str:
+    """Hash a file in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
 
-    # Remove existing database
-    if output_path.exists():
-        output_path.unlink()
-        log(f"  Removed existing database")
 
-    # Connect and create
-    conn = sqlite3.connect(str(output_path))
-    conn.execute("PRAGMA foreign_keys = ON")
-    conn.execute("PRAGMA journal_mode = WAL")
+def compute_input_hashes() -> dict[str, str]:
+    """Content hashes for every SeedData input and the generator itself."""
+    hashes = {GENERATOR_INPUT: file_sha256(Path(__file__))}
+    for inputs, _, _ in SEED_STAGES.values():
+        for name in inputs:
+            path = seed_data_path(name)
+            hashes[name] = f"{path.name}:{file_sha256(path)}" if path else "missing"
+    return hashes
+
 
+def read_build_hashes(conn: sqlite3.Connection) -> dict[str, str]:
+    """Input hashes recorded by the previous build ({} if none were recorded)."""
     try:
-        # Create schema
-        create_schema(conn)
+        rows = conn.execute("SELECT input_name, sha256 FROM seed_build_metadata").fetchall()
+    except sqlite3.OperationalError:
+        return {}
+    return dict(rows)
 
-        # Seed data in dependency order
+
+def record_build_hashes(conn: sqlite3.Connection, hashes: dict[str, str]):
+    """Store input hashes so the next --incremental run can diff against them."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS seed_build_metadata (
+            input_name TEXT PRIMARY KEY,
+            sha256 TEXT NOT NULL,
+            built_at TEXT NOT NULL
+        )
+    """)
+    now = datetime.now().isoformat()
+    conn.execute("DELETE FROM seed_build_metadata")
+    conn.executemany(
+        "INSERT INTO seed_build_metadata (input_name, sha256, built_at) VALUES (?, ?, ?)",
+        [(name, digest, now) for name, digest in sorted(hashes.items())]
+    )
+    conn.commit()
+
+
+def stages_to_rebuild(changed_inputs: set[str]) -> list[str]:
+    """Stages whose inputs changed, plus everything downstream, in seed order."""
+    dirty: set[str] = set()
+    for stage, (inputs, _, upstream) in SEED_STAGES.items():
+        if changed_inputs.intersection(inputs) or dirty.intersection(upstream):
+            dirty.add(stage)
+    # Rarity is recomputed over the catalog values, so relinking reloads species too
+    if "site_species" in dirty and "species" not in dirty:
+        dirty.add("species")
+    return [stage for stage in SEED_STAGES if stage in dirty]
+
+
+def clear_stage_tables(conn: sqlite3.Connection, stages: list[str]):
+    """Delete rows from the tables of the given stages, downstream first."""
+    for stage in reversed(stages):
+        for table in reversed(SEED_STAGES[stage][1]):
+            conn.execute(f"DELETE FROM {table}")
+    conn.commit()
+
+
+def seed_stages(conn: sqlite3.Connection, stages: list[str]):
+    """Run the seed steps for the given stages in dependency order."""
+    if {"countries", "region_groups", "regions", "areas"}.intersection(stages):
         log("Seeding geographic hierarchy...")
+    if "countries" in stages:
         seed_countries(conn)
+    if "region_groups" in stages:
         seed_region_groups(conn)
+    if "regions" in stages:
         seed_regions(conn)
+    if "areas" in stages:
         seed_areas(conn)
 
+    if "species_families" in stages:
         log("Seeding species families...")
         seed_species_families(conn)
 
+    if "sites" in stages:
         log("Seeding sites...")
         seed_sites(conn)
 
+    if "species" in stages:
         log("Seeding species...")
-        species_count = seed_species(conn)
+        seed_species(conn)
 
+    if "site_species" in stages:
         log("Seeding site-species links...")
         species_site_counts = seed_site_species_links(conn)
 
         log("Calculating realistic rarity distribution...")
         calculate_realistic_rarity(conn, species_site_counts)
 
+    if "site_media" in stages:
         log("Seeding site media...")
         seed_site_media(conn)
 
+    if "heatmap_grids" in stages:
+        log("Building heatmap grids...")
+        build_heatmap_grids(conn)
+
+    if "site_clusters" in stages:
+        log("Building site clusters...")
+        build_site_clusters(conn)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the pre-seeded UmiLog SQLite database")
+    parser.add_argument("output", nargs="?", type=Path, default=DEFAULT_OUTPUT, help="Output database path")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Update an existing database, reseeding only tables whose inputs changed"
+    )
+    args = parser.parse_args()
+    output_path = args.output
+
+    log(f"Generating seed database: {output_path}")
+
+    # Ensure output directory exists
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    input_hashes = compute_input_hashes()
+    stages = list(SEED_STAGES)
+    full_build = True
+
+    if args.incremental and output_path.exists():
+        conn = sqlite3.connect(str(output_path))
+        previous_hashes = read_build_hashes(conn)
+        if previous_hashes.get(GENERATOR_INPUT) == input_hashes[GENERATOR_INPUT]:
+            changed = {name for name, digest in input_hashes.items() if previous_hashes.get(name) != digest}
+            stages = stages_to_rebuild(changed)
+            full_build = False
+            log(f"  Incremental build: changed inputs {sorted(changed) or 'none'}")
+        else:
+            log("  No matching build metadata, falling back to full rebuild")
+        conn.close()
+
+        if not full_build and not stages:
+            log("Seed database is up to date")
+            return
+
+    # Remove existing database
+    if full_build and output_path.exists():
+        output_path.unlink()
+        log(f"  Removed existing database")
+
+    # Connect and create
+    conn = sqlite3.connect(str(output_path))
+    conn.execute("PRAGMA foreign_keys = ON")
+    if full_build:
+        apply_pragmas(conn, BULK_LOAD_PRAGMAS)
+    else:
+        conn.execute("PRAGMA journal_mode = WAL")
+
+    try:
+        deferred_schema: list[str] = []
+        if full_build:
+            # Create tables; indexes and FTS triggers wait until the data is in
+            create_schema(conn, deferred_schema)
+        else:
+            log(f"Rebuilding stages: {', '.join(stages)}")
+            # Forget the old hashes first so an interrupted run forces a full rebuild next time
+            conn.execute("DELETE FROM seed_build_metadata")
+            clear_stage_tables(conn, stages)
+
+        # Seed data in dependency order
+        seed_stages(conn, stages)
+
+        if deferred_schema:
+            log("Building indexes...")
+            create_deferred_schema(conn, deferred_schema)
+
         log("Building FTS indexes...")
         build_fts_indexes(conn)
 
+        record_build_hashes(conn, input_hashes)
+
         log("Optimizing database...")
+        apply_pragmas(conn, APP_PRAGMAS)
         vacuum_database(conn, output_path)
 
         # Final stats
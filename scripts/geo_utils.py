@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""Shared geographic helpers for the UmiLog data pipeline.
+
+Scalar haversine for one-off checks, a NumPy distance matrix and
+close-pair search for bulk work, a lat/lon grid index for incremental
+radius and nearest-neighbour lookups, and a packed R-tree for batch
+bounding-box queries.
+
+Only the array helpers (haversine_matrix, close_pairs, STRTree) need
+NumPy; it is imported when they are first used. Scripts outside scripts/
+import this module by adding the scripts/ directory to sys.path.
+"""
+
+from __future__ import annotations
+
+import math
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any, Iterator, Optional, Sequence
+
+if TYPE_CHECKING:
+    import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+HALF_CIRCUMFERENCE_KM = math.pi * EARTH_RADIUS_KM  # no two points are further apart
+
+
+def _numpy():
+    """Lazy import numpy."""
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("numpy is required. Install with: pip install numpy")
+    return numpy
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in km."""
+    p1 = math.radians(lat1)
+    p2 = math.radians(lat2)
+    dp = math.radians(lat2 - lat1)
+    dl = math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def _radians(values: Sequence[float] | np.ndarray) -> np.ndarray:
+    np = _numpy()
+    return np.radians(np.asarray(values, dtype=np.float64))
+
+
+def haversine_matrix(
+    lats1: Sequence[float] | np.ndarray,
+    lons1: Sequence[float] | np.ndarray,
+    lats2: Sequence[float] | np.ndarray,
+    lons2: Sequence[float] | np.ndarray,
+) -> np.ndarray:
+    """Pairwise distances in km, shape (len(lats1), len(lats2))."""
+    np = _numpy()
+    p1 = _radians(lats1)[:, None]
+    l1 = _radians(lons1)[:, None]
+    p2 = _radians(lats2)[None, :]
+    l2 = _radians(lons2)[None, :]
+    a = np.sin((p2 - p1) / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin((l2 - l1) / 2) ** 2
+    a = np.clip(a, 0.0, 1.0)
+    return 2 * EARTH_RADIUS_KM * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def close_pairs(
+    lats: Sequence[float] | np.ndarray,
+    lons: Sequence[float] | np.ndarray,
+    radius_km: float,
+) -> list[tuple[int, int, float]]:
+    """All (i, j, distance_km) with i < j and distance <= radius_km, in (i, j) order."""
+    if len(lats) < 2:
+        return []
+    np = _numpy()
+    matrix = haversine_matrix(lats, lons, lats, lons)
+    left, right = np.nonzero(np.triu(matrix <= radius_km, k=1))
+    return [(int(i), int(j), float(matrix[i, j])) for i, j in zip(left, right)]
+
+
+class SpatialGridIndex:
+    """Lat/lon grid of points bucketed into cells roughly `cell_km` on a side.
+
+    Rows are fixed-height latitude bands; a radius query widens the column
+    span by the spherical-cap longitude extent at the query latitude, so any
+    point within the radius (`cell_km` by default) is guaranteed to be a
+    candidate. Lookups are cheapest for radii near `cell_km`.
+    """
+
+    def __init__(self, cell_km: float):
+        self.cell_km = cell_km
+        self.cell_deg = math.degrees(cell_km / EARTH_RADIUS_KM)
+        self.columns = math.ceil(360 / self.cell_deg)
+        self.cells: dict[tuple[int, int], list[tuple[int, float, float, Any]]] = defaultdict(list)
+        self.size = 0
+
+    def _cell(self, lat: float, lon: float) -> tuple[int, int]:
+        row = math.floor((lat + 90) / self.cell_deg)
+        col = math.floor((lon + 180) / self.cell_deg) % self.columns
+        return row, col
+
+    def insert(self, order: int, lat: float, lon: float, item: Any) -> None:
+        self.cells[self._cell(lat, lon)].append((order, lat, lon, item))
+        self.size += 1
+
+    def _entries(self, lat: float, lon: float, radius_km: float) -> Iterator[tuple[int, float, float, Any]]:
+        row, col = self._cell(lat, lon)
+        radius = radius_km / EARTH_RADIUS_KM
+        rows = math.ceil(math.degrees(radius) / self.cell_deg)
+        cos_lat = math.cos(math.radians(lat))
+        sin_r = math.sin(radius)
+        if radius >= math.pi / 2 or cos_lat <= sin_r:
+            cols = range(self.columns)
+        else:
+            dlon = math.degrees(math.asin(sin_r / cos_lat))
+            span = math.ceil(dlon / self.cell_deg) + 1
+            if 2 * span + 1 >= self.columns:
+                cols = range(self.columns)
+            else:
+                cols = {(col + offset) % self.columns for offset in range(-span, span + 1)}
+        row_range = range(row - rows, row + rows + 1)
+        if len(row_range) * len(cols) > len(self.cells):
+            # Wide search over a sparse grid: filter the occupied cells instead
+            for (r, c), entries in list(self.cells.items()):
+                if r in row_range and c in cols:
+                    yield from entries
+            return
+        for r in row_range:
+            for c in cols:
+                yield from self.cells.get((r, c), ())
+
+    def candidates(self, lat: float, lon: float, radius_km: Optional[float] = None) -> Iterator[tuple[int, Any]]:
+        """Yield (order, item) for every point that may lie within radius_km (default `cell_km`)."""
+        for order, _, _, item in self._entries(lat, lon, self.cell_km if radius_km is None else radius_km):
+            yield order, item
+
+    def within_radius(self, lat: float, lon: float,
+                      radius_km: Optional[float] = None) -> list[tuple[float, int, Any]]:
+        """(distance_km, order, item) for every point within radius_km (default `cell_km`), nearest first."""
+        radius_km = self.cell_km if radius_km is None else radius_km
+        hits = []
+        for order, point_lat, point_lon, item in self._entries(lat, lon, radius_km):
+            distance = haversine_km(lat, lon, point_lat, point_lon)
+            if distance <= radius_km:
+                hits.append((distance, order, item))
+        hits.sort(key=lambda hit: hit[:2])
+        return hits
+
+    def nearest(self, lat: float, lon: float, k: int = 1,
+                max_km: Optional[float] = None) -> list[tuple[float, int, Any]]:
+        """Up to k (distance_km, order, item) nearest points, nearest first (ties by order).
+
+        Searches `cell_km` around the point first and doubles the radius
+        until k points are found or max_km (default: the whole globe) is
+        covered.
+        """
+        limit = HALF_CIRCUMFERENCE_KM if max_km is None else min(max_km, HALF_CIRCUMFERENCE_KM)
+        if k <= 0 or not self.size:
+            return []
+        radius_km = min(self.cell_km, limit)
+        while True:
+            hits = self.within_radius(lat, lon, radius_km)
+            # Every point nearer than the k-th hit is inside this radius too
+            if len(hits) >= k or radius_km >= limit:
+                return hits[:k]
+            radius_km = min(radius_km * 2, limit)
+
+
+class STRTree:
+    """Static R-tree over (min_x, min_y, max_x, max_y) boxes, packed by Sort-Tile-Recursive.
+
+    Nodes hold up to `node_capacity` children. query() walks the tree one
+    level at a time for a whole batch of query boxes, so the per-query cost
+    is a handful of NumPy operations rather than a Python loop over items.
+    """
+
+    def __init__(self, boxes: Sequence[Sequence[float]] | np.ndarray, node_capacity: int = 16):
+        np = _numpy()
+        self.boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        self.node_capacity = node_capacity
+        # Item ids in packed order; leaf nodes cover contiguous runs of it
+        self.items = self._pack(self.boxes)
+        self.levels: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+
+        level_boxes = self.boxes[self.items]
+        while True:
+            starts = np.arange(0, len(level_boxes), node_capacity)
+            counts = np.minimum(node_capacity, len(level_boxes) - starts)
+            bounds = np.column_stack([
+                np.minimum.reduceat(level_boxes[:, 0], starts),
+                np.minimum.reduceat(level_boxes[:, 1], starts),
+                np.maximum.reduceat(level_boxes[:, 2], starts),
+                np.maximum.reduceat(level_boxes[:, 3], starts),
+            ]) if len(level_boxes) else np.empty((0, 4))
+            # Children stay contiguous, so nodes can be reordered freely for the next pack
+            order = self._pack(bounds)
+            self.levels.append((bounds[order], starts[order], counts[order]))
+            if len(bounds) <= 1:
+                break
+            level_boxes = bounds[order]
+
+    def _pack(self, boxes: np.ndarray) -> np.ndarray:
+        """STR order: sort by x centre into vertical slices, then by y centre within each slice."""
+        np = _numpy()
+        n = len(boxes)
+        if n == 0:
+            return np.empty(0, dtype=np.int64)
+        cx = (boxes[:, 0] + boxes[:, 2]) / 2
+        cy = (boxes[:, 1] + boxes[:, 3]) / 2
+        leaves = math.ceil(n / self.node_capacity)
+        slice_size = math.ceil(math.sqrt(leaves)) * self.node_capacity
+        by_x = np.argsort(cx, kind="stable")
+        slice_of = np.empty(n, dtype=np.int64)
+        slice_of[by_x] = np.arange(n) // slice_size
+        return np.lexsort((cy, slice_of))
+
+    def query(self, query_boxes: Sequence[Sequence[float]] | np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """(query_index, item_index) for every query box / item box pair that intersect.
+
+        Descends node by node, carrying the subset of queries that reached
+        each node and testing it against all of the node's children at once.
+        """
+        np = _numpy()
+        query_boxes = np.asarray(query_boxes, dtype=np.float64).reshape(-1, 4)
+        found_queries: list[np.ndarray] = []
+        found_items: list[np.ndarray] = []
+        stack = [(len(self.levels) - 1, 0, np.arange(len(query_boxes)))] if len(self.boxes) else []
+        while stack:
+            level, node, queries = stack.pop()
+            _, starts, counts = self.levels[level]
+            first = int(starts[node])
+            children = range(first, first + int(counts[node]))
+            if level == 0:
+                child_boxes = self.boxes[self.items[first:children.stop]]
+            else:
+                child_boxes = self.levels[level - 1][0][first:children.stop]
+
+            q = query_boxes[queries]
+            hits = ((q[:, None, 0] <= child_boxes[None, :, 2]) & (child_boxes[None, :, 0] <= q[:, None, 2])
+                    & (q[:, None, 1] <= child_boxes[None, :, 3]) & (child_boxes[None, :, 1] <= q[:, None, 3]))
+            for offset, child in enumerate(children):
+                matched = queries[hits[:, offset]]
+                if not len(matched):
+                    continue
+                if level == 0:
+                    found_queries.append(matched)
+                    found_items.append(np.full(len(matched), self.items[child]))
+                else:
+                    stack.append((level - 1, child, matched))
+
+        if not found_queries:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(found_queries), np.concatenate(found_items)
@@ -7,18 +7,29 @@ Processes final_comprehensive_dataset.json to:
 2. Validate geographic data
 3. Remove duplicates
 4. Create optimized regional tiles
-5. Generate manifest and metadata
+5. Build a z/x/y quadtree tile pyramid for viewport loading
+6. Generate manifests and metadata
+
+Tiles are written in the binary columnar format from tile_format.py (.umt).
+Regional tiles are also written as JSON (+ gzip) because the app's seeder
+decodes them; pyramid tiles get JSON copies only with --json-tiles, for
+debugging.
 """
 
 import json
 import math
+import argparse
 import hashlib
 import gzip
+import shutil
 from pathlib import Path
 from collections import defaultdict
 from typing import Dict, List, Tuple, Optional
 from datetime import datetime
 
+from geo_utils import SpatialGridIndex, haversine_km
+from tile_format import write_tile
+
 # Dive site indicators - keywords that suggest valid dive locations
 VALID_DIVE_KEYWORDS = {
     'reef', 'wreck', 'dive', 'site', 'diving', 'scuba',
@@ -88,20 +99,17 @@ def is_valid_dive_site(site: Dict) -> Tuple[bool, str]:
     return False, "no dive indicator"
 
 
-def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Calculate distance between two points using Haversine formula (km)."""
-    R = 6371
-    
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
-    a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    
-    return R * c
+DUPLICATE_RADIUS_KM = 1.0
 
 
 def remove_duplicates(sites: List[Dict]) -> List[Dict]:
-    """Remove duplicate sites using name + location clustering."""
+    """Remove duplicate sites using name + location clustering.
+
+    A site is a duplicate of the earliest kept site (in ID order) with the
+    same case-insensitive name within 1 km. Kept sites are indexed per
+    normalized name in a spatial grid, so each site is only compared against
+    same-name neighbours in adjacent cells instead of every kept site.
+    """
     if not sites:
         return []
     
@@ -110,9 +118,9 @@ def remove_duplicates(sites: List[Dict]) -> List[Dict]:
     
     kept = []
     skipped = []
+    by_name: Dict[str, SpatialGridIndex] = {}
     
     for site in sites:
-        is_duplicate = False
         site_name = (site.get('name') or '').strip()
         site_lat = site.get('latitude')
         site_lon = site.get('longitude')
@@ -120,25 +128,29 @@ def remove_duplicates(sites: List[Dict]) -> List[Dict]:
         if not site_name or site_lat is None or site_lon is None:
             continue
         
-        # Check against already kept sites
-        for kept_site in kept:
-            kept_name = (kept_site.get('name') or '').strip()
-            kept_lat = kept_site.get('latitude')
-            kept_lon = kept_site.get('longitude')
-            
-            # Exact name match AND very close location (< 1km)
-            if kept_name.lower() == site_name.lower():
-                dist = calculate_distance(site_lat, site_lon, kept_lat, kept_lon)
-                if dist < 1.0:
-                    is_duplicate = True
-                    skipped.append({
-                        'name': site_name,
-                        'reason': f'duplicate of {kept_name}',
-                        'distance_km': round(dist, 2)
-                    })
-                    break
+        name_key = site_name.lower()
+        grid = by_name.get(name_key)
+        if grid is None:
+            grid = by_name[name_key] = SpatialGridIndex(DUPLICATE_RADIUS_KM)
+        
+        # Earliest kept site with the same name and very close location (< 1km)
+        match = None
+        for order, kept_site in grid.candidates(site_lat, site_lon):
+            if match is not None and order > match[0]:
+                continue
+            dist = haversine_km(site_lat, site_lon, kept_site['latitude'], kept_site['longitude'])
+            if dist < DUPLICATE_RADIUS_KM:
+                match = (order, kept_site, dist)
         
-        if not is_duplicate:
+        if match is not None:
+            _, kept_site, dist = match
+            skipped.append({
+                'name': site_name,
+                'reason': f"duplicate of {(kept_site.get('name') or '').strip()}",
+                'distance_km': round(dist, 2)
+            })
+        else:
+            grid.insert(len(kept), site_lat, site_lon, site)
             kept.append(site)
     
     print(f"Deduplication: {len(sites)} → {len(kept)} sites (removed {len(skipped)})")
@@ -250,8 +262,22 @@ def filter_dataset(input_file: Path) -> Tuple[List[Dict], List[Dict], List[Dict]
     return cleaned_sites, logs, sightings
 
 
-def create_regional_tiles(sites: List[Dict], output_dir: Path) -> Dict:
-    """Create regionally-bucketed tile files."""
+def write_tile_json(tile_path: Path, tile_data: Dict) -> Tuple[int, int]:
+    """Write a tile as JSON plus a .json.gz copy; returns (uncompressed, compressed) bytes."""
+    tile_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(tile_path, 'w') as f:
+        json.dump(tile_data, f, indent=2)
+    
+    gz_path = tile_path.with_suffix('.json.gz')
+    with open(tile_path, 'rb') as f_in:
+        with gzip.open(gz_path, 'wb') as f_out:
+            f_out.writelines(f_in)
+    
+    return tile_path.stat().st_size, gz_path.stat().st_size
+
+
+def create_regional_tiles(sites: List[Dict], output_dir: Path, write_json: bool = True) -> Dict:
+    """Create regionally-bucketed tile files (.umt, plus JSON when write_json)."""
     print(f"\n=== Creating regional tiles ===")
     
     output_dir.mkdir(parents=True, exist_ok=True)
@@ -269,13 +295,15 @@ def create_regional_tiles(sites: List[Dict], output_dir: Path) -> Dict:
         'summary': {
             'total_sites': len(sites),
             'total_regions': len(by_region),
+            'total_size_binary_mb': 0,
             'total_size_uncompressed_mb': 0,
             'total_size_compressed_mb': 0
         }
     }
     
     for region, region_sites in sorted(by_region.items()):
-        tile_name = region.lower().replace(' & ', '-').replace(' ', '-') + '.json'
+        tile_stem = region.lower().replace(' & ', '-').replace(' ', '-')
+        tile_name = tile_stem + '.json'
         tile_path = output_dir / tile_name
         
         tile_data = {
@@ -287,41 +315,35 @@ def create_regional_tiles(sites: List[Dict], output_dir: Path) -> Dict:
             }
         }
         
-        # Write uncompressed
-        with open(tile_path, 'w') as f:
-            json.dump(tile_data, f, indent=2)
-        
-        uncompressed_size = tile_path.stat().st_size
-        
-        # Write compressed
-        gz_path = tile_path.with_suffix('.json.gz')
-        with open(tile_path, 'rb') as f_in:
-            with gzip.open(gz_path, 'wb') as f_out:
-                f_out.writelines(f_in)
-        
-        compressed_size = gz_path.stat().st_size
-        
-        manifest['tiles'].append({
-            'name': tile_name,
+        binary_name = tile_stem + '.umt'
+        binary_size = write_tile(output_dir / binary_name, region_sites,
+                                 {'region': region, **tile_data['metadata']})
+        entry = {
+            'name': tile_name if write_json else binary_name,
+            'binary': binary_name,
             'region': region,
             'count': len(region_sites),
-            'size_uncompressed_kb': round(uncompressed_size / 1024, 1),
-            'size_compressed_kb': round(compressed_size / 1024, 1),
+            'size_binary_kb': round(binary_size / 1024, 1),
             'bounds': tile_data['metadata']['bounds']
-        })
+        }
+        manifest['summary']['total_size_binary_mb'] += binary_size
         
-        manifest['summary']['total_size_uncompressed_mb'] += uncompressed_size
-        manifest['summary']['total_size_compressed_mb'] += compressed_size
+        if write_json:
+            uncompressed_size, compressed_size = write_tile_json(tile_path, tile_data)
+            entry['size_uncompressed_kb'] = round(uncompressed_size / 1024, 1)
+            entry['size_compressed_kb'] = round(compressed_size / 1024, 1)
+            manifest['summary']['total_size_uncompressed_mb'] += uncompressed_size
+            manifest['summary']['total_size_compressed_mb'] += compressed_size
+            print(f"  {region}: {len(region_sites)} sites " +
+                  f"({round(uncompressed_size/1024, 1)}KB → {round(compressed_size/1024, 1)}KB gzip, " +
+                  f"{round(binary_size/1024, 1)}KB binary)")
+        else:
+            print(f"  {region}: {len(region_sites)} sites ({round(binary_size/1024, 1)}KB binary)")
         
-        print(f"  {region}: {len(region_sites)} sites " +
-              f"({round(uncompressed_size/1024, 1)}KB → {round(compressed_size/1024, 1)}KB)")
+        manifest['tiles'].append(entry)
     
-    manifest['summary']['total_size_uncompressed_mb'] = round(
-        manifest['summary']['total_size_uncompressed_mb'] / (1024 * 1024), 1
-    )
-    manifest['summary']['total_size_compressed_mb'] = round(
-        manifest['summary']['total_size_compressed_mb'] / (1024 * 1024), 1
-    )
+    for key in ('total_size_binary_mb', 'total_size_uncompressed_mb', 'total_size_compressed_mb'):
+        manifest['summary'][key] = round(manifest['summary'][key] / (1024 * 1024), 1)
     
     # Write manifest
     manifest_path = output_dir / 'manifest.json'
@@ -332,6 +354,172 @@ def create_regional_tiles(sites: List[Dict], output_dir: Path) -> Dict:
     return manifest
 
 
+# Tile pyramid: Web Mercator z/x/y (slippy map) tiles, split until each holds
+# at most TILE_MAX_SITES sites or reaches TILE_MAX_ZOOM
+TILE_MAX_SITES = 200
+TILE_MAX_ZOOM = 14
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def tile_xy(lat: float, lon: float, zoom: int) -> Tuple[int, int]:
+    """Web Mercator tile containing a coordinate; poles are clamped to the map edge."""
+    n = 1 << zoom
+    lat = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))
+    x = int((lon + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_bounds(z: int, x: int, y: int) -> Dict:
+    """Geographic extent of tile z/x/y."""
+    n = 1 << z
+    
+    def lat_of(row: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+    
+    return {
+        'min_lat': lat_of(y + 1),
+        'max_lat': lat_of(y),
+        'min_lon': x / n * 360.0 - 180.0,
+        'max_lon': (x + 1) / n * 360.0 - 180.0
+    }
+
+
+def build_quadtree(sites: List[Dict], max_sites: int = TILE_MAX_SITES,
+                   max_zoom: int = TILE_MAX_ZOOM) -> List[Tuple[int, int, int, List[Dict]]]:
+    """Partition sites into leaf tiles of an adaptive quadtree.
+    
+    Starting from the whole world (0/0/0), any tile holding more than
+    max_sites sites is split into its four children, so dense areas get
+    deep, small tiles and sparse oceans stay at low zoom. Tiles at max_zoom
+    are never split and may exceed the cap. Returns non-empty leaves as
+    (z, x, y, sites) in quadtree (depth-first) order; sites keep input order.
+    """
+    # Each site's tile at max_zoom; its ancestor at zoom z is (x >> shift, y >> shift)
+    keyed = [(tile_xy(site['latitude'], site['longitude'], max_zoom), site) for site in sites]
+    leaves = []
+    
+    def split(z: int, x: int, y: int, members: List):
+        if len(members) <= max_sites or z == max_zoom:
+            leaves.append((z, x, y, [site for _, site in members]))
+            return
+        shift = max_zoom - z - 1
+        children = defaultdict(list)
+        for (tx, ty), site in members:
+            children[(tx >> shift, ty >> shift)].append(((tx, ty), site))
+        for cx, cy in sorted(children, key=lambda c: (c[1], c[0])):
+            split(z + 1, cx, cy, children[(cx, cy)])
+    
+    if keyed:
+        split(0, 0, 0, keyed)
+    return leaves
+
+
+def create_tile_pyramid(sites: List[Dict], output_dir: Path, max_sites: int = TILE_MAX_SITES,
+                        max_zoom: int = TILE_MAX_ZOOM, write_json: bool = False) -> Dict:
+    """Write adaptive quadtree tiles to output_dir/{z}/{x}/{y}.umt with a bbox manifest.
+    
+    write_json adds a debug {z}/{x}/{y}.json (+ .gz) copy of each tile.
+    
+    The manifest lists every leaf tile with its tile extent ('bounds') and
+    the extent of its sites ('data_bounds'). Leaves never overlap, so a
+    client loads a viewport by fetching the tiles whose bounds intersect it
+    (see tiles_in_viewport).
+    
+    Zoom directories left by an earlier run are removed first, so the bundle
+    only ever holds the tiles this manifest lists.
+    """
+    print(f"\n=== Creating tile pyramid (max {max_sites} sites/tile, max zoom {max_zoom}) ===")
+    
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for stale in output_dir.iterdir():
+        if stale.is_dir() and stale.name.isdigit():
+            shutil.rmtree(stale)
+    located = [s for s in sites if s.get('latitude') is not None and s.get('longitude') is not None]
+    leaves = build_quadtree(located, max_sites, max_zoom)
+    
+    manifest = {
+        'version': '1.0',
+        'scheme': 'xyz',
+        'generated_at': datetime.utcnow().isoformat() + 'Z',
+        'max_sites_per_tile': max_sites,
+        'max_zoom': max_zoom,
+        'tiles': [],
+        'summary': {
+            'total_sites': len(located),
+            'total_tiles': len(leaves),
+            'max_tile_zoom': max((z for z, _, _, _ in leaves), default=0),
+            'total_size_mb': 0
+        }
+    }
+    
+    total_size = 0
+    for z, x, y, tile_sites in leaves:
+        tile_name = f"{z}/{x}/{y}.umt"
+        bounds = tile_bounds(z, x, y)
+        metadata = {
+            'z': z,
+            'x': x,
+            'y': y,
+            'count': len(tile_sites),
+            'bounds': bounds,
+            'data_bounds': calculate_bounds(tile_sites)
+        }
+        size = write_tile(output_dir / tile_name, tile_sites, metadata)
+        total_size += size
+        
+        entry = {
+            'name': tile_name,
+            'z': z,
+            'x': x,
+            'y': y,
+            'count': len(tile_sites),
+            'size_kb': round(size / 1024, 1),
+            'bounds': bounds,
+            'data_bounds': metadata['data_bounds']
+        }
+        if write_json:
+            json_name = f"{z}/{x}/{y}.json"
+            tile_data = {'z': z, 'x': x, 'y': y, 'sites': tile_sites, 'metadata': metadata}
+            write_tile_json(output_dir / json_name, tile_data)
+            entry['json'] = json_name
+        manifest['tiles'].append(entry)
+    
+    manifest['summary']['total_size_mb'] = round(total_size / (1024 * 1024), 2)
+    
+    manifest_path = output_dir / 'manifest.json'
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    
+    counts = [len(tile_sites) for _, _, _, tile_sites in leaves]
+    if counts:
+        print(f"  {len(leaves)} tiles, zoom {min(z for z, _, _, _ in leaves)}-"
+              f"{manifest['summary']['max_tile_zoom']}, "
+              f"{min(counts)}-{max(counts)} sites per tile")
+    print(f"Manifest written to {manifest_path}")
+    return manifest
+
+
+def tiles_in_viewport(manifest: Dict, min_lat: float, min_lon: float,
+                      max_lat: float, max_lon: float) -> List[Dict]:
+    """Manifest entries whose tile bounds intersect a viewport.
+    
+    A viewport crossing the antimeridian is given with min_lon > max_lon.
+    """
+    if min_lon > max_lon:
+        spans = [(min_lon, 180.0), (-180.0, max_lon)]
+    else:
+        spans = [(min_lon, max_lon)]
+    
+    return [
+        tile for tile in manifest['tiles']
+        if tile['bounds']['min_lat'] <= max_lat and tile['bounds']['max_lat'] >= min_lat
+        and any(tile['bounds']['min_lon'] <= east and tile['bounds']['max_lon'] >= west
+                for west, east in spans)
+    ]
+
+
 def calculate_bounds(sites: List[Dict]) -> Dict:
     """Calculate geographic bounds for a set of sites."""
     if not sites:
@@ -404,11 +592,17 @@ def save_cleaned_dataset(sites: List[Dict], logs: List[Dict], sightings: List[Di
 
 def main():
     """Main entry point."""
+    parser = argparse.ArgumentParser(description="Clean the comprehensive dataset and build seed tiles")
+    parser.add_argument("--json-tiles", action="store_true",
+                        help="Also write JSON copies of the pyramid tiles for debugging")
+    args = parser.parse_args()
+    
     base_dir = Path(__file__).parent.parent
     data_dir = base_dir / 'Resources' / 'SeedData'
     input_file = data_dir / 'final_comprehensive_dataset.json'
     output_dir = data_dir / 'optimized'
     tiles_dir = output_dir / 'tiles'
+    pyramid_dir = output_dir / 'pyramid'
     
     if not input_file.exists():
         print(f"Error: {input_file} not found")
@@ -420,13 +614,19 @@ def main():
     # Save cleaned versions
     save_cleaned_dataset(sites, logs, sightings, output_dir)
     
-    # Create regional tiles
+    # Create regional tiles (JSON kept: DatabaseSeeder decodes it)
     manifest = create_regional_tiles(sites, tiles_dir)
     
+    # Create viewport tile pyramid
+    pyramid = create_tile_pyramid(sites, pyramid_dir, write_json=args.json_tiles)
+    
     print(f"\n=== Summary ===")
     print(f"Processed: {len(sites)} sites, {len(logs)} logs, {len(sightings)} sightings")
     print(f"Output directory: {output_dir}")
     print(f"Regional tiles: {len(manifest['tiles'])}")
+    print(f"Pyramid tiles: {len(pyramid['tiles'])} (max zoom {pyramid['summary']['max_tile_zoom']}, "
+          f"{pyramid['summary']['total_size_mb']}MB)")
+    print(f"Total binary: {manifest['summary']['total_size_binary_mb']}MB")
     print(f"Total uncompressed: {manifest['summary']['total_size_uncompressed_mb']}MB")
     print(f"Total compressed: {manifest['summary']['total_size_compressed_mb']}MB")
     print(f"Compression ratio: {round(100 * (1 - manifest['summary']['total_size_compressed_mb'] / manifest['summary']['total_size_uncompressed_mb']), 1)}%")
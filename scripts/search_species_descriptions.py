@@ -10,21 +10,25 @@ Saves progress incrementally so you can resume if interrupted.
 """
 
 import json
-import time
 import re
-import urllib.request
-import urllib.parse
+import sys
 from pathlib import Path
 from typing import Optional
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "data" / "scripts"))
+from http_cache import cached_get_json  # noqa: E402
+
 # Configuration
 INPUT_FILE = Path("/Users/finn/dev/umilog/data/export/species_catalog_full.json")
 OUTPUT_FILE = Path("/Users/finn/dev/umilog/data/export/species_descriptions_searched.json")
 PROGRESS_FILE = Path("/Users/finn/dev/umilog/data/export/search_progress.json")
 
-# Rate limiting (be nice to free APIs)
+# Rate limiting (be nice to free APIs); cached responses skip the delay
 DELAY_BETWEEN_REQUESTS = 0.5  # seconds
 
+WIKIPEDIA_API = "https://en.wikipedia.org/w/api.php"
+WORMS_API = "https://www.marinespecies.org/rest"
+
 
 def wikipedia_search(scientific_name: str) -> Optional[str]:
     """
@@ -32,20 +36,22 @@ def wikipedia_search(scientific_name: str) -> Optional[str]:
     Uses the free Wikipedia API - no key needed.
     """
     try:
-        # First, search for the page
-        search_url = (
-            f"https://en.wikipedia.org/w/api.php?"
-            f"action=query&list=search&srsearch={urllib.parse.quote(scientific_name)}"
-            f"&format=json&srlimit=1"
-        )
+        # First, search for the page. Params match site_descriptions_search.py
+        # so both scripts share cached Wikipedia responses.
+        search_params = {
+            "action": "query",
+            "list": "search",
+            "srsearch": scientific_name,
+            "format": "json",
+            "srlimit": 3
+        }
 
         # Add proper User-Agent to avoid 403 errors
         headers = {
             "User-Agent": "UmiLog Species Catalog/1.0 (https://github.com/umilog; contact@example.com) Python/3"
         }
-        req = urllib.request.Request(search_url, headers=headers)
-        with urllib.request.urlopen(req, timeout=10) as response:
-            data = json.loads(response.read().decode())
+        data = cached_get_json(WIKIPEDIA_API, search_params, headers=headers, timeout=10,
+                               delay=DELAY_BETWEEN_REQUESTS)
 
         if not data.get("query", {}).get("search"):
             return None
@@ -54,15 +60,16 @@ def wikipedia_search(scientific_name: str) -> Optional[str]:
         title = data["query"]["search"][0]["title"]
 
         # Now get the extract (summary) of the page
-        extract_url = (
-            f"https://en.wikipedia.org/w/api.php?"
-            f"action=query&titles={urllib.parse.quote(title)}"
-            f"&prop=extracts&exintro=1&explaintext=1&format=json"
-        )
-
-        req = urllib.request.Request(extract_url, headers=headers)
-        with urllib.request.urlopen(req, timeout=10) as response:
-            data = json.loads(response.read().decode())
+        extract_params = {
+            "action": "query",
+            "titles": title,
+            "prop": "extracts",
+            "exintro": "true",
+            "explaintext": "true",
+            "format": "json"
+        }
+        data = cached_get_json(WIKIPEDIA_API, extract_params, headers=headers, timeout=10,
+                               delay=DELAY_BETWEEN_REQUESTS)
 
         pages = data.get("query", {}).get("pages", {})
         for page_id, page_data in pages.items():
@@ -85,15 +92,12 @@ def worms_search(scientific_name: str) -> Optional[dict]:
     """
     try:
         # Search by scientific name
-        url = (
-            f"https://www.marinespecies.org/rest/AphiaRecordsByMatchNames?"
-            f"scientificnames[]={urllib.parse.quote(scientific_name)}&marine_only=true"
+        data = cached_get_json(
+            f"{WORMS_API}/AphiaRecordsByMatchNames",
+            {"scientificnames[]": scientific_name, "marine_only": "true"},
+            headers={"Accept": "application/json"}, timeout=10, delay=DELAY_BETWEEN_REQUESTS
         )
 
-        req = urllib.request.Request(url, headers={"Accept": "application/json"})
-        with urllib.request.urlopen(req, timeout=10) as response:
-            data = json.loads(response.read().decode())
-
         if data and isinstance(data, list) and len(data) > 0:
             if isinstance(data[0], list) and len(data[0]) > 0:
                 record = data[0][0]
@@ -417,8 +421,6 @@ def search_species(species: dict) -> dict:
     else:
         result["body_class"] = "unknown"
 
-    time.sleep(DELAY_BETWEEN_REQUESTS)
-
     # 2. Get description from Wikipedia (richer descriptions)
     print(f"  Searching Wikipedia for {scientific_name}...")
     wiki_text = wikipedia_search(scientific_name)
@@ -438,8 +440,6 @@ def search_species(species: dict) -> dict:
         else:
             print(f"    -> No Wikipedia data found")
 
-    time.sleep(DELAY_BETWEEN_REQUESTS)
-
     return result
 
 
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Delta patches between two seed database builds.
+
+`diff` compares the catalog tables (the tables written by generate_seed_db's
+seed stages, plus seed_build_metadata) of two builds row by row, matching
+rows on their primary key, and writes a gzip-compressed JSON patch of
+deletes, changed columns and inserts per table. `apply` replays a patch on
+a copy of the older build and checks that every catalog table then hashes
+exactly like the newer one.
+
+Both builds must share the catalog schema; a schema change still needs a
+full database. FTS and R*Tree indexes are not patched directly: the
+schema's triggers keep them in sync as rows change.
+
+Usage:
+    python3 scripts/seed_db_patch.py diff OLD.db NEW.db -o seed.patch.json.gz
+        [--from-version V] [--to-version V]
+    python3 scripts/seed_db_patch.py apply BASE.db seed.patch.json.gz -o OUT.db
+        [--in-place] [--skip-base-check]
+
+Patch layout (format_version 1):
+    {
+      "format": "umilog-seed-patch", "format_version": 1, "created_at": ...,
+      "schema": sha256 of the catalog table DDL,
+      "from": {"version": ..., "digests": {table: sha256}},
+      "to":   {"version": ..., "digests": {table: sha256}},
+      "tables": {
+        table: {"columns": [...], "key": [...],
+                "delete": [[key values]], "update": [[[key values], {column: value}]],
+                "insert": [[row values]]}
+      }
+    }
+"""
+
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import shutil
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from generate_seed_db import SEED_STAGES, log
+
+PATCH_FORMAT = "umilog-seed-patch"
+PATCH_FORMAT_VERSION = 1
+
+# Dependency order: inserts run forward, deletes in reverse
+CATALOG_TABLES = [table for _, tables, _ in SEED_STAGES.values() for table in tables] + ["seed_build_metadata"]
+# Build provenance (input hashes, build time): patched and verified, but two
+# builds of the same inputs differ here, so it is not part of the base check
+PROVENANCE_TABLES = {"seed_build_metadata"}
+
+
+def encode_value(value):
+    """JSON-safe column value (BLOBs as {"b64": ...})."""
+    if isinstance(value, bytes):
+        return {"b64": base64.b64encode(value).decode("ascii")}
+    return value
+
+
+def decode_value(value):
+    if isinstance(value, dict):
+        return base64.b64decode(value["b64"])
+    return value
+
+
+def catalog_tables(conn: sqlite3.Connection) -> list[str]:
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    return [table for table in CATALOG_TABLES if table in existing]
+
+
+def schema_digest(conn: sqlite3.Connection) -> str:
+    digest = hashlib.sha256()
+    for table in catalog_tables(conn):
+        sql = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()[0]
+        digest.update(f"{table}\n{' '.join(sql.split())}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def table_layout(conn: sqlite3.Connection, table: str) -> tuple[list[str], list[str]]:
+    """(columns, primary key columns); tables without a declared key match on every column."""
+    info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+    columns = [row[1] for row in info]
+    key = [row[1] for row in sorted(info, key=lambda row: row[5]) if row[5]]
+    return columns, key or columns
+
+
+def iter_rows(conn: sqlite3.Connection, table: str, columns: list[str], key: list[str]):
+    """Rows of `table` ordered by its key, with JSON-safe values."""
+    select = f"SELECT {', '.join(columns)} FROM {table} ORDER BY {', '.join(key)}"
+    for row in conn.execute(select):
+        yield [encode_value(value) for value in row]
+
+
+def table_digest(conn: sqlite3.Connection, table: str) -> str:
+    columns, key = table_layout(conn, table)
+    digest = hashlib.sha256()
+    for row in iter_rows(conn, table, columns, key):
+        digest.update(json.dumps(row, separators=(",", ":")).encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def diff_table(old: sqlite3.Connection, new: sqlite3.Connection, table: str) -> dict | None:
+    """Deletes, column updates and inserts turning `old`'s table into `new`'s (None if equal)."""
+    columns, key = table_layout(new, table)
+    key_index = [columns.index(name) for name in key]
+
+    def keyed(conn):
+        return {tuple(row[i] for i in key_index): row for row in iter_rows(conn, table, columns, key)}
+
+    old_rows = keyed(old)
+    new_rows = keyed(new)
+
+    deletes = [list(k) for k in old_rows if k not in new_rows]
+    updates = []
+    inserts = []
+    for k, row in new_rows.items():
+        previous = old_rows.get(k)
+        if previous is None:
+            inserts.append(row)
+        elif previous != row:
+            updates.append([list(k), {
+                name: value for name, value, before in zip(columns, row, previous) if value != before
+            }])
+
+    if not (deletes or updates or inserts):
+        return None
+    return {"columns": columns, "key": key, "delete": deletes, "update": updates, "insert": inserts}
+
+
+def create_patch(old_path: Path, new_path: Path, from_version: str | None, to_version: str | None) -> dict:
+    old = sqlite3.connect(f"file:{old_path}?mode=ro", uri=True)
+    new = sqlite3.connect(f"file:{new_path}?mode=ro", uri=True)
+    try:
+        if schema_digest(old) != schema_digest(new):
+            raise ValueError("catalog schema differs between builds; ship the full database instead")
+
+        tables = {}
+        for table in catalog_tables(new):
+            changes = diff_table(old, new, table)
+            if changes:
+                tables[table] = changes
+                log(f"  {table}: -{len(changes['delete'])} ~{len(changes['update'])} +{len(changes['insert'])}")
+
+        return {
+            "format": PATCH_FORMAT,
+            "format_version": PATCH_FORMAT_VERSION,
+            "created_at": datetime.now().isoformat(),
+            "schema": schema_digest(new),
+            "from": {"version": from_version, "digests": {t: table_digest(old, t) for t in catalog_tables(old)}},
+            "to": {"version": to_version, "digests": {t: table_digest(new, t) for t in catalog_tables(new)}},
+            "tables": tables,
+        }
+    finally:
+        old.close()
+        new.close()
+
+
+def write_patch(patch: dict, path: Path) -> int:
+    data = gzip.compress(json.dumps(patch, separators=(",", ":"), ensure_ascii=False).encode("utf-8"), 9)
+    path.write_bytes(data)
+    return len(data)
+
+
+def read_patch(path: Path) -> dict:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        patch = json.load(f)
+    if patch.get("format") != PATCH_FORMAT or patch.get("format_version") != PATCH_FORMAT_VERSION:
+        raise ValueError(f"{path}: not a version {PATCH_FORMAT_VERSION} seed patch")
+    return patch
+
+
+def apply_patch(conn: sqlite3.Connection, patch: dict, check_base: bool = True):
+    """Apply `patch` in one transaction, then verify the result against the target digests.
+
+    Raises ValueError (and rolls back) when the base or the result does not match.
+    """
+    if schema_digest(conn) != patch["schema"]:
+        raise ValueError("database schema does not match the patch")
+    if check_base:
+        stale = [
+            t for t, digest in patch["from"]["digests"].items()
+            if t not in PROVENANCE_TABLES and table_digest(conn, t) != digest
+        ]
+        if stale:
+            raise ValueError(f"database is not the patch base (differs in {', '.join(stale)})")
+
+    order = [table for table in CATALOG_TABLES if table in patch["tables"]]
+    try:
+        for table in reversed(order):
+            changes = patch["tables"][table]
+            where = " AND ".join(f"{name} = ?" for name in changes["key"])
+            conn.executemany(
+                f"DELETE FROM {table} WHERE {where}",
+                ([decode_value(v) for v in key] for key in changes["delete"]),
+            )
+        for table in order:
+            changes = patch["tables"][table]
+            where = " AND ".join(f"{name} = ?" for name in changes["key"])
+            for key, values in changes["update"]:
+                assignments = ", ".join(f"{name} = ?" for name in values)
+                conn.execute(
+                    f"UPDATE {table} SET {assignments} WHERE {where}",
+                    [decode_value(v) for v in values.values()] + [decode_value(v) for v in key],
+                )
+            columns = changes["columns"]
+            conn.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                ([decode_value(v) for v in row] for row in changes["insert"]),
+            )
+
+        violations = conn.execute("PRAGMA foreign_key_check").fetchall()
+        if violations:
+            raise ValueError(f"patched database has {len(violations)} foreign key violations")
+        mismatched = [t for t, digest in patch["to"]["digests"].items() if table_digest(conn, t) != digest]
+        if mismatched:
+            raise ValueError(f"patched tables do not match the target build: {', '.join(mismatched)}")
+    except Exception:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create and apply seed database delta patches")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    diff = commands.add_parser("diff", help="Write the patch turning OLD into NEW")
+    diff.add_argument("old", type=Path)
+    diff.add_argument("new", type=Path)
+    diff.add_argument("-o", "--output", type=Path, required=True, help="Patch file (.json.gz)")
+    diff.add_argument("--from-version", help="Seed data version label of OLD")
+    diff.add_argument("--to-version", help="Seed data version label of NEW")
+
+    apply = commands.add_parser("apply", help="Apply a patch and verify the result")
+    apply.add_argument("base", type=Path)
+    apply.add_argument("patch", type=Path)
+    apply.add_argument("-o", "--output", type=Path, help="Patched copy (default: BASE with .patched suffix)")
+    apply.add_argument("--in-place", action="store_true", help="Patch BASE itself")
+    apply.add_argument("--skip-base-check", action="store_true",
+                       help="Apply even if BASE differs from the patch's source build")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "diff":
+            log(f"Diffing {args.old} -> {args.new}")
+            patch = create_patch(args.old, args.new, args.from_version, args.to_version)
+            size = write_patch(patch, args.output)
+            log(f"Patch written to {args.output}: {size / 1024:.1f} KB "
+                f"({size / args.new.stat().st_size * 100:.2f}% of the new database)")
+            return 0
+
+        patch = read_patch(args.patch)
+        target = args.base if args.in_place else (args.output or args.base.with_suffix(".patched.db"))
+        if target != args.base:
+            shutil.copyfile(args.base, target)
+        log(f"Applying {args.patch} to {target} "
+            f"({patch['from']['version'] or 'unversioned'} -> {patch['to']['version'] or 'unversioned'})")
+        conn = sqlite3.connect(str(target))
+        try:
+            apply_patch(conn, patch, check_base=not args.skip_base_check)
+        finally:
+            conn.close()
+        log("Patch applied; catalog tables match the target build")
+        return 0
+    except (ValueError, sqlite3.Error) as e:
+        log(f"Error: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,7 +9,6 @@ import json
 import random
 from datetime import datetime, timezone
 from typing import List, Dict, Tuple
-from math import radians, cos, sin, asin, sqrt
 
 # Real dive site names and details by region for authenticity
 DIVE_SITES_DB = {
@@ -87,15 +86,6 @@ DIVE_SITES_DB = {
     ],
 }
 
-def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Calculate distance between two coordinates in km."""
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a))
-    return 6371 * c
-
 def is_valid_coordinate(lat: float, lon: float) -> bool:
     """Check if coordinates are within valid ranges."""
     return -90 <= lat <= 90 and -180 <= lon <= 180
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""Compact columnar binary tiles (.umt) for UmiLog site data.
+
+A tile stores N records column by column instead of as JSON objects:
+
+    header      magic "UMT1", version, column count, row count,
+                string count, metadata string index
+    columns     per column: name (string index), type, data offset, length
+    strings     (string count + 1) uint32 offsets, then UTF-8 bytes
+    data        one fixed-width array per column, 8-byte aligned
+
+All integers are little-endian. Column types:
+
+    coord   int32, degrees * COORD_SCALE (1e-7 deg, ~1 cm); used for
+            latitude/longitude so coordinates can be read as a block
+    int     int32 (larger integers fall back to json)
+    float   float64 (mixed int/float columns decode as float)
+    bool    uint8
+    string  uint32 index into the string table (each string stored once)
+    json    uint32 index of a JSON-encoded value (lists, dicts, mixed types)
+
+Nulls are stored as a per-type sentinel (INT32_MIN, NaN, 255, 0xFFFFFFFF).
+A record decodes without keys whose value is None or that it never had.
+
+TileReader memory-maps a tile: coordinates() and column() read one array
+without touching the others, and strings are decoded on first use.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import mmap
+import struct
+from pathlib import Path
+from typing import Any, Iterator, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError("numpy is required. Install with: pip install numpy")
+
+MAGIC = b"UMT1"
+VERSION = 1
+COORD_SCALE = 10_000_000
+COORD_COLUMNS = ("latitude", "longitude")
+
+COL_COORD = 1
+COL_INT = 2
+COL_FLOAT = 3
+COL_BOOL = 4
+COL_STRING = 5
+COL_JSON = 6
+
+_DTYPES = {
+    COL_COORD: np.dtype("<i4"),
+    COL_INT: np.dtype("<i4"),
+    COL_FLOAT: np.dtype("<f8"),
+    COL_BOOL: np.dtype("u1"),
+    COL_STRING: np.dtype("<u4"),
+    COL_JSON: np.dtype("<u4"),
+}
+_TYPE_NAMES = {
+    COL_COORD: "coord", COL_INT: "int", COL_FLOAT: "float",
+    COL_BOOL: "bool", COL_STRING: "string", COL_JSON: "json",
+}
+
+INT_NULL = -(1 << 31)
+BOOL_NULL = 255
+INDEX_NULL = 0xFFFFFFFF
+
+_HEADER = struct.Struct("<4sHHIII")
+_COLUMN = struct.Struct("<IB3xII")
+_SPAN = struct.Struct("<II")
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _column_type(name: str, values: Sequence[Any]) -> int:
+    """Narrowest column type that holds every non-null value exactly."""
+    present = [v for v in values if v is not None]
+    if name in COORD_COLUMNS and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        return COL_COORD
+    if not present:
+        return COL_STRING
+    kinds = {type(v) for v in present}
+    if kinds == {bool}:
+        return COL_BOOL
+    if kinds == {int}:
+        return COL_INT if all(INT_NULL < v < (1 << 31) for v in present) else COL_JSON
+    if kinds <= {int, float} and bool not in kinds:
+        return COL_FLOAT
+    if kinds == {str}:
+        return COL_STRING
+    return COL_JSON
+
+
+class _StringTable:
+    def __init__(self):
+        self.index: dict[str, int] = {}
+        self.values: list[bytes] = []
+
+    def add(self, text: str) -> int:
+        position = self.index.get(text)
+        if position is None:
+            position = self.index[text] = len(self.values)
+            self.values.append(text.encode("utf-8"))
+        return position
+
+    def encode(self) -> bytes:
+        offsets = np.zeros(len(self.values) + 1, dtype="<u4")
+        offsets[1:] = np.cumsum([len(v) for v in self.values], dtype=np.int64)
+        return offsets.tobytes() + b"".join(self.values)
+
+
+def encode_tile(records: Sequence[dict], metadata: dict | None = None) -> bytes:
+    """Serialize records (and optional tile-level metadata) to .umt bytes."""
+    names: dict[str, None] = {}
+    for record in records:
+        for key in record:
+            names.setdefault(key, None)
+
+    strings = _StringTable()
+    meta_index = strings.add(json.dumps(metadata, separators=(",", ":"))) if metadata is not None else INDEX_NULL
+
+    columns = []
+    for name in names:
+        values = [record.get(name) for record in records]
+        kind = _column_type(name, values)
+        if kind == COL_COORD:
+            data = [INT_NULL if v is None else round(v * COORD_SCALE) for v in values]
+        elif kind == COL_INT:
+            data = [INT_NULL if v is None else v for v in values]
+        elif kind == COL_FLOAT:
+            data = [math.nan if v is None else float(v) for v in values]
+        elif kind == COL_BOOL:
+            data = [BOOL_NULL if v is None else int(v) for v in values]
+        elif kind == COL_STRING:
+            data = [INDEX_NULL if v is None else strings.add(v) for v in values]
+        else:
+            data = [
+                INDEX_NULL if v is None else strings.add(json.dumps(v, ensure_ascii=False, separators=(",", ":")))
+                for v in values
+            ]
+        columns.append((strings.add(name), kind, np.asarray(data, dtype=_DTYPES[kind]).tobytes()))
+
+    string_blob = strings.encode()
+    offset = _align(_HEADER.size + _COLUMN.size * len(columns) + len(string_blob))
+    directory = []
+    body = []
+    for name_index, kind, data in columns:
+        directory.append(_COLUMN.pack(name_index, kind, offset, len(data)))
+        body.append(data + b"\0" * (_align(len(data)) - len(data)))
+        offset += _align(len(data))
+
+    header = _HEADER.pack(MAGIC, VERSION, len(columns), len(records), len(strings.values), meta_index)
+    prefix = header + b"".join(directory) + string_blob
+    return prefix + b"\0" * (_align(len(prefix)) - len(prefix)) + b"".join(body)
+
+
+def write_tile(path: Path, records: Sequence[dict], metadata: dict | None = None) -> int:
+    """Write records to a .umt file; returns its size in bytes."""
+    data = encode_tile(records, metadata)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return len(data)
+
+
+class TileReader:
+    """Memory-mapped .umt tile.
+
+    Use as a context manager (or call close()). Arrays returned by
+    coordinates() and column() are copies, so they stay valid after close.
+    """
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            size = f.seek(0, 2)
+            if size < _HEADER.size:
+                raise ValueError(f"{path}: too short for a tile")
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n_columns, self.count, n_strings, meta_index = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path}: not a version {VERSION} tile")
+
+        directory_end = _HEADER.size + _COLUMN.size * n_columns
+        self._offsets_start = directory_end
+        self._string_base = directory_end + 4 * (n_strings + 1)
+        self._strings: dict[int, str] = {}
+
+        self._columns: dict[str, tuple[int, int, int]] = {}
+        for i in range(n_columns):
+            name_index, kind, offset, length = _COLUMN.unpack_from(self._mm, _HEADER.size + i * _COLUMN.size)
+            self._columns[self.string(name_index)] = (kind, offset, length)
+        self.metadata = json.loads(self.string(meta_index)) if meta_index != INDEX_NULL else None
+
+    def __enter__(self) -> TileReader:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    @property
+    def columns(self) -> dict[str, str]:
+        """Column name -> type name, in storage order."""
+        return {name: _TYPE_NAMES[kind] for name, (kind, _, _) in self._columns.items()}
+
+    def string(self, index: int) -> str:
+        text = self._strings.get(index)
+        if text is None:
+            start, end = _SPAN.unpack_from(self._mm, self._offsets_start + 4 * index)
+            text = self._strings[index] = self._mm[self._string_base + start:self._string_base + end].decode("utf-8")
+        return text
+
+    def _raw(self, name: str, rows: Sequence[int] | None = None) -> tuple[int, np.ndarray]:
+        kind, offset, _ = self._columns[name]
+        raw = np.frombuffer(self._mm, dtype=_DTYPES[kind], count=self.count, offset=offset)
+        return kind, raw.copy() if rows is None else raw[np.asarray(rows, dtype=np.int64)]
+
+    def coordinates(self) -> tuple[np.ndarray, np.ndarray]:
+        """(latitudes, longitudes) as float64 arrays; missing values are NaN."""
+        return self.column_array("latitude"), self.column_array("longitude")
+
+    def column_array(self, name: str) -> np.ndarray:
+        """A numeric column as a NumPy array (coords scaled to degrees, nulls as NaN for coord/float)."""
+        kind, raw = self._raw(name)
+        if kind == COL_COORD:
+            values = raw / COORD_SCALE
+            values[raw == INT_NULL] = np.nan
+            return values
+        if kind in (COL_STRING, COL_JSON):
+            raise TypeError(f"column {name!r} is not numeric; use column()")
+        return raw
+
+    def column(self, name: str, rows: Sequence[int] | None = None) -> list[Any]:
+        """A column (all rows, or the given row indices) decoded to Python values, None for nulls."""
+        kind, raw = self._raw(name, rows)
+        if kind == COL_COORD:
+            return [None if v == INT_NULL else v / COORD_SCALE for v in raw.tolist()]
+        if kind == COL_INT:
+            return [None if v == INT_NULL else v for v in raw.tolist()]
+        if kind == COL_FLOAT:
+            return [None if math.isnan(v) else v for v in raw.tolist()]
+        if kind == COL_BOOL:
+            return [None if v == BOOL_NULL else bool(v) for v in raw.tolist()]
+        # String and JSON columns: decode each distinct index once
+        unique, inverse = np.unique(raw, return_inverse=True)
+        decode = self.string if kind == COL_STRING else (lambda i: json.loads(self.string(i)))
+        decoded = [None if v == INDEX_NULL else decode(v) for v in unique.tolist()]
+        return [decoded[i] for i in inverse.tolist()]
+
+    def within(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> np.ndarray:
+        """Row indices whose coordinate lies in a box (min_lon > max_lon wraps the antimeridian)."""
+        lats, lons = self.coordinates()
+        in_lat = (lats >= min_lat) & (lats <= max_lat)
+        if min_lon <= max_lon:
+            in_lon = (lons >= min_lon) & (lons <= max_lon)
+        else:
+            in_lon = (lons >= min_lon) | (lons <= max_lon)
+        return np.nonzero(in_lat & in_lon)[0]
+
+    def records(self, rows: Sequence[int] | None = None) -> list[dict]:
+        """Decode records (all, or the given row indices) to dicts."""
+        names = list(self._columns)
+        if not names:
+            return [{} for _ in range(self.count if rows is None else len(rows))]
+        columns = [self.column(name, rows) for name in names]
+        records = [dict(zip(names, row)) for row in zip(*columns)]
+        sparse = [name for name, values in zip(names, columns) if None in values]
+        for record in records:
+            for name in sparse:
+                if record[name] is None:
+                    del record[name]
+        return records
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self.records())
+
+
+def read_tile(path: Path) -> tuple[list[dict], dict | None]:
+    """Load every record of a tile; returns (records, metadata)."""
+    with TileReader(path) as reader:
+        return reader.records(), reader.metadata